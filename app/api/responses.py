@@ -0,0 +1,38 @@
+# app/api/responses.py
+"""
+Fast JSON response class for Mongo documents.
+orjson serializes datetime/UUID/numpy natively; `_default` covers the BSON
+types it doesn't know, so raw documents never need a Python-side walk.
+"""
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+from fastapi.responses import ORJSONResponse
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, Decimal128):
+        return str(obj.to_decimal())
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class MongoJSONResponse(ORJSONResponse):
+    """Default response class: orjson + ObjectId/Decimal128 support."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+from typing import Literal, Optional
+
+from bson import ObjectId
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, status
+
+from app.db.write_path import mongo_datetime
+from app.services.mood_analytics import read_rollups, rebuild_user_rollups
+
+router = APIRouter()
+
+# Default window and hard cap, in buckets
+DEFAULT_BUCKETS = {"day": 30, "week": 12}
+MAX_BUCKETS = {"day": 366, "week": 260}
+
+
+@router.get("/analytics")
+async def get_analytics(
+    user_id: str,
+    period: Literal["day", "week"] = "day",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    top_tags: int = Query(10, ge=1, le=100),
+):
+    """
+    Mood distribution, top context tags and average replay score per day/week bucket,
+    plus totals over the window. Served from precomputed rollups: one read per bucket at most.
+    """
+    try:
+        object_id = ObjectId(user_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid user_id format")
+
+    bucket = timedelta(days=1 if period == "day" else 7)
+    # Rollups are keyed by naive UTC; an offset in the query string is converted, not compared
+    until = mongo_datetime(until or datetime.utcnow())
+    since = mongo_datetime(since) if since else until - DEFAULT_BUCKETS[period] * bucket
+    if since >= until:
+        raise HTTPException(status_code=400, detail="since must be before until")
+    if (until - since) > MAX_BUCKETS[period] * bucket:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BUCKETS[period]} {period} buckets per request")
+    return await read_rollups(object_id, period, since, until, top_tags)
+
+
+@router.post("/analytics/rebuild", status_code=status.HTTP_202_ACCEPTED)
+async def rebuild_analytics(user_id: str, background_tasks: BackgroundTasks):
+    """Recompute the user's rollups from their mood history in the background."""
+    try:
+        object_id = ObjectId(user_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid user_id format")
+    background_tasks.add_task(rebuild_user_rollups, object_id)
+    return {"status": "scheduled", "user_id": user_id}
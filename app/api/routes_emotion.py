@@ -1,60 +1,127 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+from typing import Dict, List, Optional, Set, Tuple
+
+from fastapi import APIRouter, HTTPException, Query, Response
 from app.models.schemas import TextRequest
 from app.services.emotion_service import analyze_emotion, detect_mood_and_events
 from app.db.mongo_client import db
+from app.db.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, build_projection, fetch_page
 from bson import ObjectId
+from bson.errors import InvalidId
 from fastapi import HTTPException
 from fastapi import Body
-from app.models.schemas import MoodCreateRequest
-from app.services.indexing_service import index_user_data
-from app.services.replay_service import build_replay  # assuming your replay logic is here
+from app.models.schemas import MoodCreateRequest, MoodOut, MoodWithReplayOut
+from app.services.indexing_service import bulk_index_user_data, index_user_data
+from app.services.replay_service import (
+    build_replay, build_replays_batched, replay_context_for, replay_document_for, template_replay,
+)
+from app.db.geo import with_geo
+from app.db.write_path import insert_mood, insert_moods, insert_replay, insert_replays, mongo_datetime
+from app.services.admission import Overloaded, admission, in_llm_pool
+from app.services.metrics import stage
+from app.services.vector_lifecycle import delete_vectors
+from app.services.replay_candidates import delete_candidates, upsert_candidates
+from app.services.replay_context import invalidate_replay_context
+from app.services.mood_analytics import REPLAY_ROLLUP_FIELDS, ROLLUP_FIELDS, forget_moods, record_moods
 
 
 
 
 router = APIRouter()
 
+MAX_BULK_MOODS = 100
+
+# Replay generation for stored moods, kept alive past a client disconnect
+_detached: Set[asyncio.Task] = set()
+
+
+def _detach(coro) -> asyncio.Task:
+    task = asyncio.get_running_loop().create_task(coro)
+    _detached.add(task)
+    task.add_done_callback(_detached.discard)
+    return task
+
 @router.post("/analyze")
 async def analyze(req: TextRequest):
     return analyze_emotion(req.text)
 
 @router.post("/detect-mood/text")
-def detect_mood_route(req: TextRequest):
-    return detect_mood_and_events(req.text)
-
-def serialize_mongo_doc(doc):
-    doc["_id"] = str(doc["_id"])
-    if "user" in doc and isinstance(doc["user"], ObjectId):
-        doc["user"] = str(doc["user"])
-    return doc
-
-# Helper function to serialize MongoDB ObjectIds into strings
-def serialize_mongo_rep(doc):
-    if isinstance(doc, list):
-        return [serialize_mongo_rep(item) for item in doc]
-    elif isinstance(doc, dict):
-        return {k: serialize_mongo_rep(v) for k, v in doc.items()}
-    elif isinstance(doc, ObjectId):
-        return str(doc)
-    else:
-        return doc
-
-
-@router.get("/moods")
-async def get_user_moods(user_id: str):
+def detect_mood_route(req: TextRequest, timeline: bool = False):
+    """timeline=true adds a per-sentence emotion timeline to the response."""
+    return detect_mood_and_events(req.text, include_timeline=timeline)
+
+# Fields returned by GET /moods (narrow further with ?fields=a,b)
+MOOD_LIST_FIELDS = [
+    "user", "user_text", "audio_file", "mood", "ai_response", "is_shown", "longitude", "latitude",
+    "events", "context_tags", "replay_opportunity_score", "create_date",
+]
+
+
+@router.get("/moods", response_model=List[MoodOut], response_model_exclude_unset=True)
+async def get_user_moods(
+    user_id: str,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+):
+    """
+    Newest-first mood history, one page at a time.
+    The next page's cursor is returned in the X-Next-Cursor header (absent on the last page).
+    """
     try:
         object_id = ObjectId(user_id)
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid user_id format")
 
-    moods_cursor = db.moods.find({"user": object_id}).sort("create_date", -1)
-    moods = await moods_cursor.to_list(100)
+    try:
+        moods, next_cursor = await fetch_page(
+            db.moods, {"user": object_id}, build_projection(MOOD_LIST_FIELDS, fields), limit, cursor
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+    print(f"[INFO] Retrieved {len(moods)} moods for user_id: {user_id}")
+    return moods
+
 
-    serialized = [serialize_mongo_doc(m) for m in moods]
 
-    print(f"[INFO] Retrieved {len(serialized)} moods for user_id: {user_id}")
-    return serialized
+@router.delete("/moods/{mood_id}")
+async def delete_mood(mood_id: str, user_id: str):
+    """Delete a mood, the replays generated from it, and their vectors."""
+    try:
+        mood_object_id = ObjectId(mood_id)
+        user_object_id = ObjectId(user_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid mood_id or user_id format")
+
+    mood = await db.moods.find_one_and_delete({"_id": mood_object_id, "user": user_object_id}, projection=ROLLUP_FIELDS)
+    if not mood:
+        raise HTTPException(status_code=404, detail="Mood not found or doesn't belong to user")
+
+    replays = await db.replays.find(
+        {"moods": mood_object_id, "user": user_object_id}, REPLAY_ROLLUP_FIELDS
+    ).to_list(None)
+    replay_ids = [r["_id"] for r in replays]
+    if replay_ids:
+        await db.replays.delete_many({"_id": {"$in": replay_ids}})
+        for replay_id in replay_ids:
+            invalidate_replay_context(user_object_id, replay_id)
+    await delete_candidates([mood_object_id])
+    try:
+        await forget_moods([mood], replays)
+    except Exception as e:
+        print(f"❌ Analytics rollup update failed for mood {mood_id}: {e}")
+
+    vectors = 0
+    try:
+        vectors = await delete_vectors([mood_object_id, *replay_ids])
+    except Exception as e:
+        print(f"❌ Vector delete failed for mood {mood_id}: {e}")
 
+    return {"deleted": {"moods": 1, "replays": len(replay_ids), "vectors": vectors}}
 
 
 @router.get("/collections")
@@ -64,62 +131,120 @@ async def list_collections():
     return {"collections": collections}
 
 
-@router.post("/mood-detect")
-async def create_mood_with_replay(mood_data: MoodCreateRequest):
-    try:
-        user_object_id = ObjectId(mood_data.user)
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid user_id format")
+def _new_mood_document(mood_data: MoodCreateRequest) -> dict:
+    """Mood as it will be stored (and read back): client-side _id, Mongo-precision dates."""
+    mood = mood_data.dict()
+    mood["_id"] = ObjectId()
+    mood["user"] = ObjectId(mood_data.user)
+    mood["create_date"] = mongo_datetime(mood.get("create_date"))
+    return with_geo(mood)
 
-    # Insert mood
-    mood_dict = mood_data.dict()
-    mood_dict["user"] = user_object_id
-    mood_result = await db.moods.insert_one(mood_dict)
-    created_mood = await db.moods.find_one({"_id": mood_result.inserted_id})
-
-    # Build replay using same logic as /replay
-    context = {
-        "mood_today": created_mood.get("mood"),
-        "user_location": {
-            "lat": created_mood.get("latitude"),
-            "lng": created_mood.get("longitude"),
-        },
-        "today_date": created_mood.get("create_date"),
-    }
-    replay_generated = build_replay(created_mood, context)  # returns ai_response, context_tags, location, replay_opportunity_score
-
-    replay_payload = {
-        "user_response": created_mood.get("user_text", ""),
-        "mood": created_mood.get("mood"),
-        "gem_response": replay_generated.get("ai_response"),
-        "user": user_object_id,
-        "is_shown": created_mood.get("is_shown"),
-        "longitude": created_mood.get("longitude"),
-        "latitude": created_mood.get("latitude"),
-        "events": created_mood.get("events", []),
-        "context_tags": replay_generated.get("context_tags", []),
-        "replay_opportunity_score": str(replay_generated.get("replay_opportunity_score", "0")),
-        "moods": created_mood["_id"],
-        "location": replay_generated.get("location"),
-        "create_date": created_mood.get("create_date"),
-    }
 
-    replay_result = await db.replays.insert_one(replay_payload)
-    created_replay = await db.replays.find_one({"_id": replay_result.inserted_id})
+async def _after_mood_write(user_id: str, moods: List[dict], replays: List[dict], bulk: bool = False) -> None:
+    try:
+        await upsert_candidates(moods)
+    except Exception as e:
+        print(f"❌ Replay candidate update failed: {e}")
 
     try:
-        await index_user_data(
-            user_id=str(user_object_id),
-            moods=[created_mood],
-            replays=[created_replay]
-        )
+        await record_moods(moods, replays)
+    except Exception as e:
+        print(f"❌ Analytics rollup update failed: {e}")
+
+    try:
+        with stage("mood_detect.index"):
+            if bulk:
+                await bulk_index_user_data(user_id, moods, replays)
+            else:
+                await index_user_data(user_id=user_id, moods=moods, replays=replays)
     except Exception as e:
         print(f"❌ Indexing failed: {e}")
 
+
+async def _replay_for_stored_mood(created_mood: dict) -> dict:
+    user_id = str(created_mood["user"])
+    try:
+        # Build replay using same logic as /replay
+        context = replay_context_for(created_mood)
+        replay_generated = await admission("mood_detect").run(in_llm_pool, build_replay, created_mood, context)  # returns ai_response, context_tags, location, replay_opportunity_score
+    except Overloaded:
+        # Shed from the LLM queue: the entry still gets the template replay, never a 503
+        replay_generated = template_replay(created_mood, "overloaded")
+    except Exception:
+        await _after_mood_write(user_id, [created_mood], [])
+        raise
+
+    created_replay = replay_document_for(created_mood, replay_generated)
+    created_replay["_id"] = ObjectId()
+    with stage("mood_detect.insert_replay"):
+        await insert_replay(created_replay)
+
+    await _after_mood_write(user_id, [created_mood], [created_replay])
     return {
-        "mood": serialize_mongo_doc(created_mood),
-        "replay": serialize_mongo_rep(created_replay)
+        "mood": created_mood,
+        "replay": created_replay
     }
 
 
+@router.post("/mood-detect", response_model=MoodWithReplayOut, response_model_exclude_unset=True)
+async def create_mood_with_replay(mood_data: MoodCreateRequest):
+    try:
+        created_mood = _new_mood_document(mood_data)
+    except InvalidId:
+        raise HTTPException(status_code=400, detail="Invalid user_id format")
+
+    # The entry is stored before the multi-second LLM call; the replay, its write and
+    # the follow-ups run detached, so a client disconnect doesn't cut them short either
+    with stage("mood_detect.insert"):
+        await insert_mood(created_mood)
+    return await asyncio.shield(_detach(_replay_for_stored_mood(created_mood)))
+
+
+async def _replays_for_stored_moods(moods: List[dict]) -> List[dict]:
+    try:
+        generated = await admission("mood_detect").run(in_llm_pool, build_replays_batched, moods)
+    except Overloaded:
+        generated = [template_replay(m, "overloaded") for m in moods]
+    except Exception:
+        await _after_writes_by_user(moods, [])
+        raise
+
+    replays = []
+    for mood, replay_generated in zip(moods, generated):
+        replay = replay_document_for(mood, replay_generated)
+        replay["_id"] = ObjectId()
+        replays.append(replay)
+    with stage("mood_detect.insert_replay"):
+        await insert_replays(replays)
+
+    await _after_writes_by_user(moods, replays)
+    return [{"mood": m, "replay": r} for m, r in zip(moods, replays)]
+
+
+async def _after_writes_by_user(moods: List[dict], replays: List[dict]) -> None:
+    replays_by_mood = {r["moods"]: r for r in replays}
+    by_user: Dict[ObjectId, Tuple[List[dict], List[dict]]] = {}
+    for mood in moods:
+        user_moods, user_replays = by_user.setdefault(mood["user"], ([], []))
+        user_moods.append(mood)
+        if mood["_id"] in replays_by_mood:
+            user_replays.append(replays_by_mood[mood["_id"]])
+    for user_object_id, (user_moods, user_replays) in by_user.items():
+        await _after_mood_write(str(user_object_id), user_moods, user_replays, bulk=True)
+
+
+@router.post("/mood-detect/bulk", response_model=List[MoodWithReplayOut], response_model_exclude_unset=True)
+async def create_moods_with_replays(entries: List[MoodCreateRequest] = Body(...)):
+    """Multi-entry sync: moods stored first, then replays from batched LLM calls (one insert_many each)."""
+    if not entries:
+        return []
+    if len(entries) > MAX_BULK_MOODS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_MOODS} entries per request")
+    try:
+        moods = [_new_mood_document(entry) for entry in entries]
+    except InvalidId:
+        raise HTTPException(status_code=400, detail="Invalid user_id format")
 
+    with stage("mood_detect.insert"):
+        await insert_moods(moods)
+    return await asyncio.shield(_detach(_replays_for_stored_moods(moods)))
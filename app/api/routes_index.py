@@ -1,22 +1,30 @@
 from fastapi import APIRouter, HTTPException, status
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from bson import ObjectId
 from bson.errors import InvalidId
+import os
 import random
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
 import re
 import logging
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 
+from app.db.geo import NEARBY_DEFAULT_RADIUS_M, NEARBY_MAX_RADIUS_M, nearby_source_ids
+from app.db.vector_store_config import SEARCH_TOP_K
 from app.db.mongo_client import db
 from app.db.llama_index_client import index, llm
 from app.services.indexing_service import index_user_data
-from llama_index.core.vector_stores import MetadataFilter, MetadataFilters
+from app.services.vector_lifecycle import index_stats
+from llama_index.core.vector_stores import FilterOperator, MetadataFilter, MetadataFilters
 from llama_index.core.prompts import PromptTemplate
+from llama_index.core.schema import QueryBundle
 
 from app.services.crisis_guard import guard_message, DetectOutput
+from app.services.admission import admission, in_llm_pool
+from app.services.query_embedding import query_embedder
+from app.services.replay_context import load_replay_context
+from app.services.metrics import CRISIS_MATCHES, LLM_FALLBACKS, stage
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -26,11 +34,16 @@ logger = logging.getLogger(__name__)
 user_chat_sessions: Dict[str, Dict] = {}
 MAX_HISTORY_LENGTH = 10  # Keep last 10 messages
 SESSION_TIMEOUT = timedelta(minutes=30)  # Session expires after 30 minutes of inactivity
+SEARCH_GEO_PREFILTER_LIMIT = int(os.getenv("SEARCH_GEO_PREFILTER_LIMIT", "500"))  # max nearby memories handed to the retriever
 
 # --- Models ---
 class SearchRequest(BaseModel):
     user_id: str
     query: str
+    # Optional geo pre-filter: only memories within radius_m of (latitude, longitude)
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
+    radius_m: Optional[float] = Field(None, gt=0, le=NEARBY_MAX_RADIUS_M)
 
 class IndexRequest(BaseModel):
     user_id: str
@@ -261,72 +274,20 @@ Your response:
                 return f"Hello {user_name} 🌼 I'm here for you. What would you like to share today?"
             return response
         
-        loop = asyncio.get_running_loop()
-        with ThreadPoolExecutor(max_workers=1) as executor:
-            response = await loop.run_in_executor(executor, call_llm_sync)
-            return response
+        return await in_llm_pool(call_llm_sync)
     except Exception as e:
         logger.error(f"LLM fallback failed: {e}")
         return f"Hello {user_name} 🌼 I'm here for you. What would you like to share today?"
 
 # --- Routes ---
 
-@router.post("/search-memories")
-async def search_memories(request: SearchRequest):
-    """Search user memories using semantic search with crisis guard"""
-    try:
-        logger.info(f"Search query from {request.user_id}: {request.query}")
-        
-        # Validate user ID
-        try:
-            user_id_obj = ObjectId(request.user_id)
-        except InvalidId:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid user ID format"
-            )
-        
-        # Get user document
-        user_doc = await db.users.find_one(
-            {"_id": user_id_obj}, 
-            {"username": 1, "country": 1}
-        )
-        user_name = user_doc.get("username", "friend") if user_doc else "friend"
-        country_iso2 = user_doc.get("country", "IN") if user_doc else "IN"
-        
-        # Step 1: Run crisis guard detection
-        crisis_result: DetectOutput = guard_message(
-            user_message=request.query,
-            user_id=request.user_id,
-            country_iso2=country_iso2,
-            remote_helplines=None
-        )
-        
-        if crisis_result.matched:
-            logger.warning(f"Crisis detected: {crisis_result.category} for user {request.user_id}")
-            return {
-                "result": crisis_result.response,
-                "crisis": True,
-                "helplines": crisis_result.helplines,
-                "category": crisis_result.category
-            }
-        
-        # Add user message to chat history
-        add_to_history(request.user_id, "user", request.query)
-        
-        # Step 2: Handle casual queries using new pattern-based approach
-        intent, response = handle_opening_message(request.query, user_name)
-        
-        if intent != "OTHER":
-            # Add assistant response to history
-            add_to_history(request.user_id, "assistant", response)
-            return {"result": response}
-        
-        # Get chat history for context
-        chat_history = format_chat_history(request.user_id)
-        
-        # Step 3: Create prompt template with dynamic user_name and chat history
-        prompt_template = PromptTemplate("""
+async def _search_with_llm(request: SearchRequest, user_name: str) -> Dict:
+    """Retrieval + LLM part of /search-memories (runs under admission control)."""
+    # Get chat history for context
+    chat_history = format_chat_history(request.user_id)
+    
+    # Step 3: Create prompt template with dynamic user_name and chat history
+    prompt_template = PromptTemplate("""
                                  
 You are **Antaratma** — the user's gentle inner voice and companion, speaking warmly with {user_name}.  
 You must always sound as if you truly remember their moments.  
@@ -366,56 +327,141 @@ User's Question:
 {query_str}
 
 """)
+    
+    # Step 4: Prepare filters for vector search
+    filters = MetadataFilters(filters=[
+        MetadataFilter(key="user_id", value=request.user_id)
+    ])
+    
+    # Step 5: Perform vector search
+    try:
+        if request.latitude is not None and request.longitude is not None:
+            # Geo pre-filter: $geoNear on the 2dsphere index, then restrict retrieval to those source_ids
+            with stage("search.geo_prefilter"):
+                source_ids = await nearby_source_ids(
+                    ObjectId(request.user_id), request.latitude, request.longitude,
+                    request.radius_m or NEARBY_DEFAULT_RADIUS_M, SEARCH_GEO_PREFILTER_LIMIT,
+                )
+            if not source_ids:
+                logger.info("No memories near the requested location, using interactive fallback")
+                LLM_FALLBACKS.inc(route="search-memories", reason="no_nearby_memories")
+                fallback_response = await generate_interactive_fallback_response(user_name, request.query, chat_history)
+                add_to_history(request.user_id, "assistant", fallback_response)
+                return {"result": fallback_response}
+            filters.filters.append(MetadataFilter(key="source_id", value=source_ids, operator=FilterOperator.IN))
+
+        query_engine = index.as_query_engine(
+            similarity_top_k=SEARCH_TOP_K,
+            filters=filters,
+            text_qa_template=prompt_template,
+            verbose=False,
+            # Pass user_name and chat_history as template variables
+            template_vars={"user_name": user_name, "chat_history": chat_history}
+        )
         
-        # Step 4: Prepare filters for vector search
-        filters = MetadataFilters(filters=[
-            MetadataFilter(key="user_id", value=request.user_id)
-        ])
+        with stage("search.embed"):
+            query_embedding = await query_embedder().embed(request.query)
+        query_bundle = QueryBundle(request.query, embedding=query_embedding)
+        with stage("search.retrieval"):
+            nodes = await asyncio.to_thread(query_engine.retrieve, query_bundle)
+        with stage("search.llm"):
+            response = await in_llm_pool(query_engine.synthesize, query_bundle, nodes)
+        response_text = str(response).strip() if response else ""
         
-        # Step 5: Perform vector search
-        try:
-            query_engine = index.as_query_engine(
-                similarity_top_k=3,
-                filters=filters,
-                text_qa_template=prompt_template,
-                verbose=False,
-                # Pass user_name and chat_history as template variables
-                template_vars={"user_name": user_name, "chat_history": chat_history}
-            )
+        if response_text:
+            response_text = response_text.replace("{user_name}", user_name)
             
-            response = await asyncio.to_thread(query_engine.query, request.query)
-            response_text = str(response).strip() if response else ""
-            
-            if response_text:
-                response_text = response_text.replace("{user_name}", user_name)
-                
-                # Ensure we don't return empty responses
-                if not response_text or response_text.isspace():
-                    logger.info("Vector search returned empty response, using interactive fallback")
-                    fallback_response = await generate_interactive_fallback_response(user_name, request.query, chat_history)
-                    add_to_history(request.user_id, "assistant", fallback_response)
-                    return {"result": fallback_response}
-                
-                # Add assistant response to history
-                add_to_history(request.user_id, "assistant", response_text)
-                return {"result": response_text}
-            else:
+            # Ensure we don't return empty responses
+            if not response_text or response_text.isspace():
                 logger.info("Vector search returned empty response, using interactive fallback")
+                LLM_FALLBACKS.inc(route="search-memories", reason="empty_response")
                 fallback_response = await generate_interactive_fallback_response(user_name, request.query, chat_history)
                 add_to_history(request.user_id, "assistant", fallback_response)
                 return {"result": fallback_response}
-
-        
-        except Exception as e:
-            logger.error(f"Vector search failed: {e}")
+            
+            # Add assistant response to history
+            add_to_history(request.user_id, "assistant", response_text)
+            return {"result": response_text}
+        else:
+            logger.info("Vector search returned empty response, using interactive fallback")
+            LLM_FALLBACKS.inc(route="search-memories", reason="empty_response")
             fallback_response = await generate_interactive_fallback_response(user_name, request.query, chat_history)
             add_to_history(request.user_id, "assistant", fallback_response)
             return {"result": fallback_response}
+
+    
+    except Exception as e:
+        logger.error(f"Vector search failed: {e}")
+        LLM_FALLBACKS.inc(route="search-memories", reason="search_error")
+        fallback_response = await generate_interactive_fallback_response(user_name, request.query, chat_history)
+        add_to_history(request.user_id, "assistant", fallback_response)
+        return {"result": fallback_response}
+
+
+@router.post("/search-memories")
+async def search_memories(request: SearchRequest):
+    """Search user memories using semantic search with crisis guard"""
+    try:
+        logger.info(f"Search query from {request.user_id}: {request.query}")
+        
+        # Validate user ID
+        try:
+            user_id_obj = ObjectId(request.user_id)
+        except InvalidId:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid user ID format"
+            )
+        
+        # Get user document
+        with stage("search.user_lookup"):
+            user_doc = await db.users.find_one(
+                {"_id": user_id_obj}, 
+                {"username": 1, "country": 1}
+            )
+        user_name = user_doc.get("username", "friend") if user_doc else "friend"
+        country_iso2 = user_doc.get("country", "IN") if user_doc else "IN"
+        
+        # Step 1: Run crisis guard detection
+        with stage("search.crisis_guard"):
+            # The cooldown store may do network I/O; keep it off the event loop
+            crisis_result: DetectOutput = await asyncio.to_thread(
+                guard_message,
+                user_message=request.query,
+                user_id=request.user_id,
+                country_iso2=country_iso2,
+                remote_helplines=None
+            )
+        
+        if crisis_result.matched:
+            CRISIS_MATCHES.inc(category=crisis_result.category)
+            logger.warning(f"Crisis detected: {crisis_result.category} for user {request.user_id}")
+            return {
+                "result": crisis_result.response,
+                "crisis": True,
+                "helplines": crisis_result.helplines,
+                "category": crisis_result.category
+            }
+        
+        # Add user message to chat history
+        add_to_history(request.user_id, "user", request.query)
+        
+        # Step 2: Handle casual queries using new pattern-based approach
+        intent, response = handle_opening_message(request.query, user_name)
+        
+        if intent != "OTHER":
+            # Add assistant response to history
+            add_to_history(request.user_id, "assistant", response)
+            return {"result": response}
+        
+        # Steps 3-5 hit the LLM: admission-controlled (503 + Retry-After when saturated)
+        return await admission("search").run(_search_with_llm, request, user_name)
         
     except HTTPException:
         raise
     except Exception as e:
         logger.exception(f"Unexpected search error: {e}")
+        LLM_FALLBACKS.inc(route="search-memories", reason="unexpected_error")
         fallback_response = await generate_interactive_fallback_response("friend", request.query)
         add_to_history(request.user_id, "assistant", fallback_response)
         return {"result": fallback_response}
@@ -462,6 +508,20 @@ async def index_user_data_route(body: IndexRequest):
 
 
 
+@router.get("/index/stats")
+async def index_stats_route(user_id: str | None = None, top: int = 50):
+    """Vector counts per user, orphaned vectors, expired vectors and on-disk size of the index."""
+    try:
+        return await index_stats(user_id=user_id, top=top)
+    except Exception as e:
+        logger.exception(f"Index stats failed: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to compute index stats"
+        )
+
+
+
 @router.post("/chat-about-replay")
 async def chat_about_replay(request: ChatReplayRequest):
     """
@@ -480,43 +540,16 @@ async def chat_about_replay(request: ChatReplayRequest):
                 detail="Invalid ID format"
             )
         
-        # Fetch user document
-        user_doc = await db.users.find_one(
-            {"_id": user_id_obj}, 
-            {"username": 1}
-        )
-        user_name = user_doc.get("username", "friend") if user_doc else "friend"
-        
-        # Fetch replay document
-        replay = await db.replays.find_one(
-            {"_id": replay_id_obj, "user": user_id_obj},
-            {"gem_response": 1, "user_response": 1, "moods": 1, "create_date": 1}
-        )
-        
-        
-        if not replay:
+        # Replay + mood + username in one aggregation, cached for the chat session
+        replay_context = await load_replay_context(user_id_obj, replay_id_obj)
+        if replay_context is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Replay not found or doesn't belong to user"
             )
-        
-        # Fetch associated mood if available
-        mood_text = ""
-        if replay.get("moods"):
-            mood = await db.moods.find_one(
-                {"_id": ObjectId(replay["moods"])},
-                {"user_text": 1}
-            )
-            mood_text = mood.get("user_text", "") if mood else ""
-            
-        # Prepare context with replay details
-        context = f"""
-## Replay Details:
-- Date: {replay.get('create_date', 'Unknown date')}
-- Your original reflection: {mood_text}
-- Your response to guidance: {replay.get('user_response', '')}
-- Previous guidance provided: {replay.get('gem_response', '')}
-"""
+        user_name = replay_context["user_name"]
+        context = replay_context["context"]
+
         # Prepare prompt template
         prompt = PromptTemplate(f"""
 You are **Antaratma** - the user's inner voice having a focused conversation about a specific past reflection.
@@ -543,9 +576,7 @@ Response:
         def generate_response():
             return llm.complete(prompt.format(user_name=user_name, context=context, query=request.query)).text
         
-        loop = asyncio.get_running_loop()
-        with ThreadPoolExecutor(max_workers=1) as executor:
-            response = await loop.run_in_executor(executor, generate_response)
+        response = await admission("chat").run(in_llm_pool, generate_response)
         
         return {"result": response.strip()}
         
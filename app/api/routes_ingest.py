@@ -0,0 +1,39 @@
+from typing import Dict, List
+
+from bson import ObjectId
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+from app.services.ingest_service import ReplayMode, generate_deferred_replays, ingest_ndjson
+
+router = APIRouter(tags=["Ingest"])
+
+
+@router.post("/moods/bulk-import")
+async def bulk_import_moods(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    user_id: str,
+    chunk_size: int = Query(500, ge=1, le=5000),
+    replays: ReplayMode = "deferred",
+):
+    """
+    Import historical moods from an NDJSON body (one BulkMoodEntry per line).
+    Streams back one NDJSON progress line per chunk and a final summary.
+    replays=inline generates replays during the import, deferred after it, none skips them.
+    """
+    try:
+        ObjectId(user_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid user_id format")
+
+    deferred: List[Dict] = []
+    if replays == "deferred":
+        # Runs once the progress stream has finished, when `deferred` is fully populated
+        background_tasks.add_task(generate_deferred_replays, user_id, deferred)
+
+    return StreamingResponse(
+        ingest_ndjson(request.stream(), user_id, chunk_size, replays, deferred),
+        media_type="application/x-ndjson",
+        background=background_tasks,
+    )
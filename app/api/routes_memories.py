@@ -0,0 +1,37 @@
+from datetime import datetime
+from typing import List, Literal, Optional
+
+from bson import ObjectId
+from fastapi import APIRouter, HTTPException, Query
+
+from app.db.geo import GEO_COLLECTIONS, NEARBY_MAX_RADIUS_M, nearby
+from app.models.schemas import NearbyMemoryOut
+
+router = APIRouter()
+
+
+@router.get("/memories/nearby", response_model=List[NearbyMemoryOut], response_model_exclude_unset=True)
+async def get_nearby_memories(
+    user_id: str,
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius_m: Optional[float] = Query(None, gt=0, le=NEARBY_MAX_RADIUS_M),
+    limit: int = Query(20, ge=1, le=100),
+    kind: Optional[Literal["mood", "replay"]] = None,
+    mood: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    """
+    "What did I feel last time I was here": the user's moods/replays closest to (lat, lng),
+    nearest first. Without radius_m this is a pure nearest query. mood takes a comma-separated
+    list; since/until bound create_date.
+    """
+    try:
+        object_id = ObjectId(user_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid user_id format")
+
+    moods = [m.strip() for m in mood.split(",") if m.strip()] if mood else None
+    kinds = (kind,) if kind else tuple(GEO_COLLECTIONS)
+    return await nearby(object_id, lat, lng, radius_m, limit, kinds=kinds, moods=moods, since=since, until=until)
@@ -1,29 +1,29 @@
-from fastapi import APIRouter, HTTPException
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, Response, status
 from bson import ObjectId
+from pymongo import ReturnDocument
 
-from app.models.schemas import ReplayRequest, ReplayCreateRequest
+from app.models.schemas import ReplayRequest, ReplayCreateRequest, ReplayUpdateRequest, ReplayOut, ReplayCandidateOut
 from app.services.replay_service import build_replay
+from app.services.admission import admission, in_llm_pool
 from app.db.mongo_client import db
+from app.db.geo import GEO_FIELD, mood_geo
+from app.db.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, build_projection, fetch_page
+from app.db.write_path import insert_replay, mongo_datetime
 
 from app.services.indexing_service import index_user_data  # or index_single_replay
+from app.services.vector_lifecycle import delete_vectors
+from app.services.replay_candidates import rebuild_user_candidates, top_candidates
+from app.services.replay_context import invalidate_replay_context
+from app.services.mood_analytics import REPLAY_ROLLUP_FIELDS, forget_replays, record_replays
 
 router = APIRouter()
 
 
-# Helper function to serialize MongoDB ObjectIds into strings
-def serialize_mongo_doc(doc):
-    if isinstance(doc, list):
-        return [serialize_mongo_doc(item) for item in doc]
-    elif isinstance(doc, dict):
-        return {k: serialize_mongo_doc(v) for k, v in doc.items()}
-    elif isinstance(doc, ObjectId):
-        return str(doc)
-    else:
-        return doc
-
-
 @router.post("/replay")
-def generate_replay(request: ReplayRequest):
+async def generate_replay(request: ReplayRequest):
     """
     Generates an emotionally reflective replay message using the user input.
     This does not store data in MongoDB.
@@ -39,29 +39,48 @@ def generate_replay(request: ReplayRequest):
         "today_date": sample["create_date"]
     }
 
-    replay = build_replay(sample, context)
+    replay = await admission("replay").run(in_llm_pool, build_replay, sample, context)
     return replay
 
 
-@router.get("/user-replay")
-async def get_user_replays(user_id: str):
+# Fields returned by GET /user-replay (narrow further with ?fields=a,b)
+REPLAY_LIST_FIELDS = [
+    "user", "moods", "gem_response", "user_response", "mood", "is_shown", "longitude", "latitude",
+    "events", "context_tags", "replay_opportunity_score", "location", "create_date", "updatedAt",
+]
+
+
+@router.get("/user-replay", response_model=List[ReplayOut], response_model_exclude_unset=True)
+async def get_user_replays(
+    user_id: str,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+):
     """
-    Retrieves all replay records for a given user from the MongoDB collection.
+    Retrieves a user's replay records, newest first, one page at a time.
+    The next page's cursor is returned in the X-Next-Cursor header (absent on the last page).
     """
     try:
         object_id = ObjectId(user_id)
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid user_id format")
 
-    replays = await db.replays.find({"user": object_id}).sort("create_date", -1).to_list(100)
-    serialized = serialize_mongo_doc(replays)
-
-    print(f"[INFO] Retrieved {len(serialized)} replays for user_id: {user_id}")
-    return serialized
+    try:
+        replays, next_cursor = await fetch_page(
+            db.replays, {"user": object_id}, build_projection(REPLAY_LIST_FIELDS, fields), limit, cursor
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    print(f"[INFO] Retrieved {len(replays)} replays for user_id: {user_id}")
+    return replays
 
 
 
-@router.post("/user-replay")
+@router.post("/user-replay", response_model=ReplayOut, response_model_exclude_unset=True)
 async def create_user_replay(replay_data: ReplayCreateRequest):
     """
     Stores a user-generated replay in MongoDB and indexes it.
@@ -77,8 +96,19 @@ async def create_user_replay(replay_data: ReplayCreateRequest):
     replay_dict["user"] = user_object_id
     replay_dict["moods"] = moods_object_id
 
-    result = await db.replays.insert_one(replay_dict)
-    created_replay = await db.replays.find_one({"_id": result.inserted_id})
+    replay_dict["_id"] = ObjectId()
+    replay_dict["create_date"] = mongo_datetime(replay_dict.get("create_date"))
+    # Replays are placed where their mood was (/memories/nearby, search geo pre-filter)
+    point = await mood_geo(user_object_id, moods_object_id)
+    if point is not None:
+        replay_dict[GEO_FIELD] = point
+    await insert_replay(replay_dict)
+    created_replay = replay_dict  # exactly what was stored; no read-back round trip
+
+    try:
+        await record_replays([created_replay])
+    except Exception as e:
+        print(f"❌ Analytics rollup update failed: {e}")
 
     # Index the new replay
     try:
@@ -91,4 +121,92 @@ async def create_user_replay(replay_data: ReplayCreateRequest):
     except Exception as e:
         print(f"❌ Indexing failed: {e}")
 
-    return serialize_mongo_doc(created_replay)
+    return created_replay
+
+
+@router.patch("/user-replay/{replay_id}", response_model=ReplayOut, response_model_exclude_unset=True)
+async def update_user_replay(replay_id: str, user_id: str, update: ReplayUpdateRequest):
+    """Update a replay's text/tags, drop its cached chat context and re-index it."""
+    try:
+        replay_object_id = ObjectId(replay_id)
+        user_object_id = ObjectId(user_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid replay_id or user_id format")
+
+    changes = update.dict(exclude_unset=True)
+    if not changes:
+        raise HTTPException(status_code=400, detail="Nothing to update")
+    changes["updatedAt"] = mongo_datetime(datetime.utcnow())
+
+    updated = await db.replays.find_one_and_update(
+        {"_id": replay_object_id, "user": user_object_id},
+        {"$set": changes},
+        return_document=ReturnDocument.AFTER,
+    )
+    if not updated:
+        raise HTTPException(status_code=404, detail="Replay not found or doesn't belong to user")
+    invalidate_replay_context(user_object_id, replay_object_id)
+
+    if GEO_FIELD not in updated and updated.get("moods") is not None:
+        # Written before replays inherited their mood's point; fill it in while we're here
+        point = await mood_geo(user_object_id, updated["moods"])
+        if point is not None:
+            await db.replays.update_one({"_id": replay_object_id}, {"$set": {GEO_FIELD: point}})
+            updated[GEO_FIELD] = point
+
+    try:
+        await index_user_data(user_id=str(user_object_id), moods=[], replays=[updated])
+    except Exception as e:
+        print(f"❌ Re-indexing failed for replay {replay_id}: {e}")
+
+    return updated
+
+
+@router.delete("/user-replay/{replay_id}")
+async def delete_user_replay(replay_id: str, user_id: str):
+    """Delete a replay and its vectors."""
+    try:
+        replay_object_id = ObjectId(replay_id)
+        user_object_id = ObjectId(user_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid replay_id or user_id format")
+
+    replay = await db.replays.find_one_and_delete(
+        {"_id": replay_object_id, "user": user_object_id}, projection=REPLAY_ROLLUP_FIELDS
+    )
+    if not replay:
+        raise HTTPException(status_code=404, detail="Replay not found or doesn't belong to user")
+    invalidate_replay_context(user_object_id, replay_object_id)
+    try:
+        await forget_replays([replay])
+    except Exception as e:
+        print(f"❌ Analytics rollup update failed for replay {replay_id}: {e}")
+
+    vectors = 0
+    try:
+        vectors = await delete_vectors([replay_object_id])
+    except Exception as e:
+        print(f"❌ Vector delete failed for replay {replay_id}: {e}")
+
+    return {"deleted": {"replays": 1, "vectors": vectors}}
+
+
+@router.get("/replay-candidates", response_model=List[ReplayCandidateOut], response_model_exclude_unset=True)
+async def get_replay_candidates(user_id: str, limit: int = Query(10, ge=1, le=100)):
+    """Top-N precomputed replay candidates (highest score first); nothing is re-scored here."""
+    try:
+        object_id = ObjectId(user_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid user_id format")
+    return await top_candidates(object_id, limit)
+
+
+@router.post("/replay-candidates/rebuild", status_code=status.HTTP_202_ACCEPTED)
+async def rebuild_replay_candidates(user_id: str, background_tasks: BackgroundTasks):
+    """Re-score the user's whole mood history in the background."""
+    try:
+        object_id = ObjectId(user_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid user_id format")
+    background_tasks.add_task(rebuild_user_candidates, object_id)
+    return {"status": "scheduled", "user_id": user_id}
@@ -1,63 +1,124 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from fastapi import APIRouter, UploadFile, File, Form, Header, HTTPException
 from pydub import AudioSegment
-from vosk import Model, KaldiRecognizer
+from vosk import KaldiRecognizer
 from deep_translator import GoogleTranslator
-import io, wave, json
+import io
+
+from app.services.metrics import registry, stage
+from app.services.speech_models import SAMPLE_RATE, parse_result, speech_models
+from app.services.vad import VAD_ENABLED, speech_segments
 
 router = APIRouter(tags=["Transcription"])
 
-# Use only Hindi small model for multilingual recognition
-model_path = "app/models/speech/hi"
-model = Model(model_path)
+CHUNK_BYTES = 8000  # 4000 frames of 16-bit mono
+
+# Speech segments of one clip are decoded concurrently (Kaldi releases the GIL)
+TRANSCRIBE_DECODE_WORKERS = int(os.getenv("TRANSCRIBE_DECODE_WORKERS", "4"))
+_decode_pool = ThreadPoolExecutor(max_workers=TRANSCRIBE_DECODE_WORKERS, thread_name_prefix="vosk")
+
+AUDIO_SECONDS = registry.counter(
+    "rewind_transcribe_audio_seconds_total", "Audio received for transcription, by VAD outcome", ("part",))
+DECODE_SAVED = registry.counter(
+    "rewind_transcribe_decode_saved_seconds_total", "Estimated decode time avoided by skipping silence")
+
 
 def safe_json_parse(text: str) -> str:
     """
     Safely parse Vosk JSON result, return empty string on failure.
     """
-    try:
-        data = json.loads(text)
-        return data.get("text", "")
-    except json.JSONDecodeError:
-        return ""
+    return parse_result(text).get("text", "")
+
+
+def recognize(model, pcm: bytes) -> str:
+    """Decode 16 kHz mono 16-bit PCM with one recognizer."""
+    rec = KaldiRecognizer(model, SAMPLE_RATE)
+    result_text = []
+    for i in range(0, len(pcm), CHUNK_BYTES):
+        if rec.AcceptWaveform(pcm[i:i + CHUNK_BYTES]):
+            result_text.append(safe_json_parse(rec.Result()))
+    result_text.append(safe_json_parse(rec.FinalResult()))
+    return " ".join([r for r in result_text if r.strip() != ""])
+
+
+def _timed_recognize(model, pcm: bytes) -> Tuple[str, float]:
+    started = time.perf_counter()
+    return recognize(model, pcm), time.perf_counter() - started
+
+
+async def decode_segments(model, pcm: bytes, segments: List[Tuple[int, int]]) -> Tuple[str, float]:
+    """Decode each [start, end) sample range in parallel; returns (text, summed decode seconds)."""
+    loop = asyncio.get_running_loop()
+    results = await asyncio.gather(*(
+        loop.run_in_executor(_decode_pool, _timed_recognize, model, pcm[start * 2:end * 2])
+        for start, end in segments
+    ))
+    return " ".join(t for t, _ in results if t), sum(s for _, s in results)
+
 
 @router.post("/transcribe/")
-async def transcribe(file: UploadFile = File(...)):
+async def transcribe(
+    file: UploadFile = File(...),
+    language: Optional[str] = Form(None),
+    x_speech_language: Optional[str] = Header(None),
+):
+    """
+    language (form field, e.g. hi / en-us) or X-Speech-Language picks the speech model;
+    without a usable hint the language is detected from the start of the clip.
+    """
     if file.content_type.split('/')[0] != "audio":
         raise HTTPException(status_code=400, detail="Invalid audio file")
 
     try:
-        # Convert audio to mono 16kHz WAV
+        # Convert audio to mono 16kHz 16-bit PCM
         audio_bytes = await file.read()
-        audio = AudioSegment.from_file(io.BytesIO(audio_bytes))
-        audio = audio.set_channels(1).set_frame_rate(16000)
-
-        wav_io = io.BytesIO()
-        audio.export(wav_io, format="wav")
-        wav_io.seek(0)
+        with stage("transcribe.decode"):
+            audio = AudioSegment.from_file(io.BytesIO(audio_bytes))
+            audio = audio.set_channels(1).set_frame_rate(SAMPLE_RATE).set_sample_width(2)
+            pcm = audio.raw_data
 
-        wf = wave.open(wav_io, "rb")
-        rec = KaldiRecognizer(model, wf.getframerate())
+        total_samples = len(pcm) // 2
+        with stage("transcribe.vad"):
+            segments = speech_segments(pcm, SAMPLE_RATE) if VAD_ENABLED else [(0, total_samples)]
+        speech_s = sum(end - start for start, end in segments) / SAMPLE_RATE
+        skipped_s = total_samples / SAMPLE_RATE - speech_s
 
-        result_text = []
-        while True:
-            data = wf.readframes(4000)
-            if len(data) == 0:
-                break
-            if rec.AcceptWaveform(data):
-                result_text.append(safe_json_parse(rec.Result()))
+        with stage("transcribe.language"):
+            # Detection listens to speech only, not to a silent lead-in
+            speech_pcm = b"".join(pcm[start * 2:end * 2] for start, end in segments)
+            lang = await asyncio.to_thread(speech_models.choose, language or x_speech_language, speech_pcm)
+            model = await asyncio.to_thread(speech_models.get, lang)
 
-        result_text.append(safe_json_parse(rec.FinalResult()))
+        with stage("transcribe.vosk", language=lang, segments=len(segments)):
+            text, decode_s = await decode_segments(model, pcm, segments)
 
-        # Merge text
-        text = " ".join([r for r in result_text if r.strip() != ""])
+        # Decode cost scales with audio length: what the skipped silence would have cost at this clip's rate
+        saved_s = decode_s / speech_s * skipped_s if speech_s else 0.0
+        AUDIO_SECONDS.inc(speech_s, part="speech")
+        AUDIO_SECONDS.inc(skipped_s, part="skipped")
+        DECODE_SAVED.inc(saved_s)
+        vad = {
+            "audio_s": round(total_samples / SAMPLE_RATE, 2),
+            "speech_s": round(speech_s, 2),
+            "skipped_s": round(skipped_s, 2),
+            "segments": len(segments),
+            "decode_s": round(decode_s, 3),
+            "decode_saved_s": round(saved_s, 3),
+        }
 
         if not text:
             raise HTTPException(status_code=500, detail="Transcription failed: No text recognized")
 
         # Translate to English
-        translation = GoogleTranslator(source='auto', target='en').translate(text)
+        with stage("transcribe.translate"):
+            translation = GoogleTranslator(source='auto', target='en').translate(text)
 
-        return {"transcription_en": translation}
+        return {"transcription_en": translation, "language": lang, "vad": vad}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Transcription failed: {str(e)}")
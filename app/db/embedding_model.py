@@ -1,9 +1,15 @@
 # app/db/embedding_model.py
 
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+from app.services.inference_client import INFERENCE_SOCKET
 
-# Initialize the embedding model
-embed_model = HuggingFaceEmbedding(model_name="sentence-transformers/all-MiniLM-L6-v2")
+# Initialize the embedding model (thin clients don't load one; the inference sidecar hosts the index embedder)
+if INFERENCE_SOCKET:
+    from app.db.vector_store_config import INDEX_EMBED_MODEL
+    from app.services.inference_client import remote_embedding
+    embed_model = remote_embedding(INDEX_EMBED_MODEL)
+else:
+    from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+    embed_model = HuggingFaceEmbedding(model_name="sentence-transformers/all-MiniLM-L6-v2")
 
 # For compatibility, provide an alias if other parts of the codebase expect 'embedder'
 embedder = embed_model
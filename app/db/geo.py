@@ -0,0 +1,99 @@
+# app/db/geo.py
+"""
+GeoJSON points for moods and replays.
+
+Alongside the loose latitude/longitude floats every geotagged document carries
+`geo: {"type": "Point", "coordinates": [lng, lat]}`, backed by a
+{user, geo: 2dsphere} index (see mongo_indexes). Existing documents are
+filled in by `python -m app.scripts.backfill_geo`.
+"""
+import asyncio
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+
+from app.db.mongo_client import db
+
+GEO_FIELD = "geo"
+GEO_COLLECTIONS = {"mood": "moods", "replay": "replays"}
+
+NEARBY_DEFAULT_RADIUS_M = float(os.getenv("NEARBY_DEFAULT_RADIUS_M", "1000"))
+NEARBY_MAX_RADIUS_M = float(os.getenv("NEARBY_MAX_RADIUS_M", "50000"))
+
+# What /memories/nearby returns per hit
+NEARBY_FIELDS = {
+    "user": 1, "mood": 1, "user_text": 1, "gem_response": 1, "user_response": 1, "events": 1,
+    "context_tags": 1, "location": 1, "latitude": 1, "longitude": 1, "create_date": 1,
+}
+
+
+def geo_point(latitude: Any, longitude: Any) -> Optional[Dict]:
+    """GeoJSON point for a lat/lng pair, or None if either is missing or out of range."""
+    try:
+        lat, lng = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        return None
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lng <= 180.0):
+        return None
+    return {"type": "Point", "coordinates": [lng, lat]}
+
+
+def with_geo(doc: Dict) -> Dict:
+    """Set doc["geo"] from its latitude/longitude (in place); untouched if they're unusable."""
+    point = geo_point(doc.get("latitude"), doc.get("longitude"))
+    if point is not None:
+        doc[GEO_FIELD] = point
+    return doc
+
+
+async def mood_geo(user_id: ObjectId, mood_id: ObjectId) -> Optional[Dict]:
+    """The geo point of a user's mood (replays inherit it), or None."""
+    mood = await db.moods.find_one({"_id": mood_id, "user": user_id}, {GEO_FIELD: 1})
+    return (mood or {}).get(GEO_FIELD)
+
+
+def _geo_near(user_id: ObjectId, latitude: float, longitude: float, radius_m: Optional[float], limit: int,
+              moods: Optional[List[str]], since: Optional[datetime], until: Optional[datetime],
+              projection: Dict) -> List[Dict]:
+    query: Dict[str, Any] = {"user": user_id}
+    if moods:
+        query["mood"] = {"$in": moods}
+    if since or until:
+        query["create_date"] = {k: v for k, v in (("$gte", since), ("$lt", until)) if v is not None}
+    geo_near: Dict[str, Any] = {
+        "near": {"type": "Point", "coordinates": [longitude, latitude]},
+        "key": GEO_FIELD,
+        "distanceField": "distance_m",
+        "spherical": True,
+        "query": query,
+    }
+    if radius_m is not None:
+        geo_near["maxDistance"] = radius_m
+    return [{"$geoNear": geo_near}, {"$limit": limit}, {"$project": {**projection, "distance_m": 1}}]
+
+
+async def nearby(user_id: ObjectId, latitude: float, longitude: float, radius_m: Optional[float] = None,
+                 limit: int = 20, kinds=("mood", "replay"), moods: Optional[List[str]] = None,
+                 since: Optional[datetime] = None, until: Optional[datetime] = None,
+                 projection: Optional[Dict] = None) -> List[Dict]:
+    """
+    The user's memories nearest to (latitude, longitude), closest first, each tagged with
+    `kind` and `distance_m`. radius_m=None means "nearest, however far".
+    """
+    pipeline = _geo_near(user_id, latitude, longitude, radius_m, limit, moods, since, until,
+                         NEARBY_FIELDS if projection is None else projection)
+    results = await asyncio.gather(*(
+        db[GEO_COLLECTIONS[kind]].aggregate(pipeline).to_list(limit) for kind in kinds
+    ))
+    hits = [{**doc, "kind": kind} for kind, docs in zip(kinds, results) for doc in docs]
+    hits.sort(key=lambda d: d["distance_m"])
+    return hits[:limit]
+
+
+async def nearby_source_ids(user_id: ObjectId, latitude: float, longitude: float, radius_m: float,
+                            limit: int) -> List[str]:
+    """_ids (as vector `source_id`s) of the user's memories within radius_m: the search geo pre-filter."""
+    hits = await nearby(user_id, latitude, longitude, radius_m, limit, projection={"_id": 1})
+    return [str(hit["_id"]) for hit in hits]
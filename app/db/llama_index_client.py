@@ -7,50 +7,74 @@ from chromadb import PersistentClient
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 
+from app.services.llm_router import HedgedLLM, Provider
+from app.db.vector_store_config import CHROMA_DB_DIR, INDEX_EMBED_MODEL, active_collection_name, create_vector_collection
+
 # Flags for LLM selection
 USE_GROQ = bool(os.getenv("GROQ_API_KEY"))
 USE_GEMINI = bool(os.getenv("GEMINI_API_KEY"))
 
-# LLM setup
-if USE_GROQ:
-    from llama_index.llms.groq import Groq
-    llm = Groq(
-        model="llama3-70b-8192",  # or mixtral, gemma-7b-it
-        api_key=os.getenv("GROQ_API_KEY"),
-    )
-    print("✅ Using Groq: llama3-70b-8192 pricing as per Groq API rates.")
-
-elif USE_GEMINI:
-    from llama_index.llms.gemini import Gemini
-    llm = Gemini(
-        model="gemini-2.5-flash-lite",   # ✅ Explicit model selection for cheapest tier
-        api_key=os.getenv("GEMINI_API_KEY"),
-    )
-    print("✅ Using Gemini 2.5 Flash-Lite at $0.10/M input tokens & $0.40/M output tokens.")
+# Provider preference; the first available one is primary, the rest are hedges/failover
+LLM_PROVIDER_ORDER = [p.strip() for p in os.getenv("LLM_PROVIDER_ORDER", "groq,gemini").split(",") if p.strip()]
 
-else:
+
+def _build_provider(name: str):
+    if name == "groq" and USE_GROQ:
+        from llama_index.llms.groq import Groq
+        print("✅ Using Groq: llama3-70b-8192 pricing as per Groq API rates.")
+        return Provider("groq", Groq(
+            model="llama3-70b-8192",  # or mixtral, gemma-7b-it
+            api_key=os.getenv("GROQ_API_KEY"),
+        ))
+    if name == "gemini" and USE_GEMINI:
+        from llama_index.llms.gemini import Gemini
+        print("✅ Using Gemini 2.5 Flash-Lite at $0.10/M input tokens & $0.40/M output tokens.")
+        return Provider("gemini", Gemini(
+            model="gemini-2.5-flash-lite",   # ✅ Explicit model selection for cheapest tier
+            api_key=os.getenv("GEMINI_API_KEY"),
+        ))
+    return None
+
+
+# LLM setup
+providers = []
+for provider_name in LLM_PROVIDER_ORDER:
+    try:
+        provider = _build_provider(provider_name)
+    except Exception as e:
+        print(f"❌ Failed to initialize LLM provider {provider_name}: {e}")
+        continue
+    if provider:
+        providers.append(provider)
+
+if not providers:
     raise Exception("❌ No GROQ_API_KEY or GEMINI_API_KEY found in environment.")
 
-# Local embeddings (free)
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
-embed_model = HuggingFaceEmbedding(model_name="BAAI/bge-small-en-v1.5")
+llm = HedgedLLM(providers)
+
+# Local embeddings (free), or the inference sidecar's copy when INFERENCE_SOCKET is set
+from app.services.inference_client import INFERENCE_SOCKET, remote_embedding
+if INFERENCE_SOCKET:
+    embed_model = remote_embedding(INDEX_EMBED_MODEL)
+else:
+    from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+    embed_model = HuggingFaceEmbedding(model_name=INDEX_EMBED_MODEL)
 
 # Apply settings globally
 Settings.llm = llm
 Settings.embed_model = embed_model
 
 # ChromaDB setup (local)
-CHROMA_DB_DIR = os.getenv("CHROMA_DB_DIR", "./chroma_db")
-collection_name = os.getenv("CHROMA_COLLECTION", "rewind-ai")
+collection_name = active_collection_name()  # pointer file (set by reindex) or CHROMA_COLLECTION
 
 chroma_client = PersistentClient(path=CHROMA_DB_DIR)
-collection = chroma_client.get_or_create_collection(collection_name)
+collection = create_vector_collection(chroma_client, collection_name)  # HNSW_* settings
 vector_store = ChromaVectorStore(chroma_collection=collection)
 
 # Build the index
 index = VectorStoreIndex.from_vector_store(vector_store=vector_store)
 
-print(f"✅ LlamaIndex initialized using {'GROQ' if USE_GROQ else 'Gemini'} with ChromaDB.")
+print(f"✅ LlamaIndex initialized using {llm.model_names()} with ChromaDB.")
 
 
 
@@ -12,6 +12,17 @@ MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "rewind")
 client = AsyncIOMotorClient(MONGO_URI)
 db = client[MONGO_DB_NAME]
 
+_sync_client = None
+
+
+def get_sync_db():
+    """Blocking pymongo handle (lazily created) for code that runs in worker threads."""
+    global _sync_client
+    if _sync_client is None:
+        from pymongo import MongoClient
+        _sync_client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=2000)
+    return _sync_client[MONGO_DB_NAME]
+
 # Async ping check
 async def verify_connection():
     try:
@@ -20,5 +31,9 @@ async def verify_connection():
     except Exception as e:
         print(f"❌ MongoDB connection failed: {e}")
 
-# Call it on module import via background task
-asyncio.create_task(verify_connection())
+# Call it on module import via background task (when imported inside the server's loop;
+# offline scripts import this outside any loop)
+try:
+    asyncio.get_running_loop().create_task(verify_connection())
+except RuntimeError:
+    pass
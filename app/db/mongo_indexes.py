@@ -0,0 +1,82 @@
+# app/db/mongo_indexes.py
+"""
+Index provisioning for the collections the API queries.
+Created (idempotently) and verified at startup.
+"""
+from typing import Any, Dict, List, Tuple, Union
+
+from pymongo import ASCENDING, DESCENDING, GEOSPHERE
+from pymongo.errors import OperationFailure
+
+from app.db.mongo_client import db
+from app.db.vector_maintenance import VECTOR_DELETES_TTL_DAYS
+
+INDEX_OPTIONS_CONFLICT = 85
+
+# collection -> [(index name, keys)]
+INDEX_SPECS: Dict[str, List[Tuple[str, List[Tuple[str, Union[int, str]]]]]] = {
+    "moods": [
+        # History listing / keyset pagination: {user} sorted by create_date desc, _id as tie-breaker
+        ("user_create_date", [("user", ASCENDING), ("create_date", DESCENDING), ("_id", DESCENDING)]),
+        # /memories/nearby + search geo pre-filter ($geoNear scoped to one user)
+        ("user_geo", [("user", ASCENDING), ("geo", GEOSPHERE)]),
+    ],
+    "replays": [
+        ("user_create_date", [("user", ASCENDING), ("create_date", DESCENDING), ("_id", DESCENDING)]),
+        # replay -> mood back-references
+        ("moods", [("moods", ASCENDING)]),
+        ("user_geo", [("user", ASCENDING), ("geo", GEOSPHERE)]),
+    ],
+    "replay_candidates": [
+        # Top-N read: {user} sorted by score desc, newest first among equals
+        ("user_score", [("user", ASCENDING), ("score", DESCENDING), ("create_date", DESCENDING)]),
+        # Stale-candidate sweep after a rebuild
+        ("user_refreshed_at", [("user", ASCENDING), ("refreshed_at", ASCENDING)]),
+    ],
+    "mood_rollups": [
+        # /analytics: one user's day or week buckets in date order
+        ("user_period_start", [("user", ASCENDING), ("period", ASCENDING), ("start", ASCENDING)]),
+    ],
+    "vector_deletes": [
+        # Reindex catch-up: deletes recorded since the run started (TTL, see INDEX_OPTIONS)
+        ("deleted_at", [("deleted_at", ASCENDING)]),
+    ],
+}
+
+# (collection, index name) -> extra create_index options
+INDEX_OPTIONS: Dict[Tuple[str, str], Dict[str, Any]] = {
+    # Tombstones only matter to a reindex in progress; without a TTL they'd pile up forever
+    ("vector_deletes", "deleted_at"): {"expireAfterSeconds": int(VECTOR_DELETES_TTL_DAYS * 86400)},
+}
+
+
+async def _ensure_index(collection, name: str, keys, options: Dict[str, Any]) -> None:
+    try:
+        await collection.create_index(keys, name=name, **options)
+    except OperationFailure as e:
+        if e.code != INDEX_OPTIONS_CONFLICT or "expireAfterSeconds" not in options:
+            raise
+        # Same keys, different TTL (or none yet): change it in place instead of rebuilding
+        await db.command("collMod", collection.name,
+                         index={"name": name, "expireAfterSeconds": options["expireAfterSeconds"]})
+
+
+async def ensure_indexes() -> Dict[str, List[str]]:
+    """Create missing indexes and return the ones that failed verification."""
+    missing: Dict[str, List[str]] = {}
+    for collection_name, specs in INDEX_SPECS.items():
+        collection = db[collection_name]
+        for name, keys in specs:
+            try:
+                await _ensure_index(collection, name, keys, INDEX_OPTIONS.get((collection_name, name), {}))
+            except Exception as e:
+                print(f"❌ Failed to create index {collection_name}.{name}: {e}")
+
+        existing = await collection.index_information()
+        for name, keys in specs:
+            info = existing.get(name)
+            options = INDEX_OPTIONS.get((collection_name, name), {})
+            if (not info or [tuple(k) for k in info.get("key", [])] != keys
+                    or any(info.get(k) != v for k, v in options.items())):
+                missing.setdefault(collection_name, []).append(name)
+    return missing
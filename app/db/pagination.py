@@ -0,0 +1,105 @@
+# app/db/pagination.py
+"""
+Keyset (cursor) pagination over (create_date desc, _id desc).
+The cursor is an opaque token encoding the last document's sort key, so each
+page is an index range scan of `limit` entries no matter how deep it is.
+
+Legacy documents may carry create_date as a string (or a number, or nothing).
+Mongo sorts those by type first - dates, then strings, then numbers, then
+null/missing - and by value within a type, so the cursor records the type and
+the raw value and the next page continues within that type before moving on.
+"""
+import base64
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# Cursor kinds in descending sort order, and everything that sorts after each one
+_DATE, _STRING, _NUMBER, _NULL = "d", "s", "n", "z"
+_AFTER_KIND = {
+    _DATE: {"create_date": {"$not": {"$type": "date"}}},
+    _STRING: {"$or": [{"create_date": {"$type": "number"}}, {"create_date": None}]},
+    _NUMBER: {"create_date": None},
+}
+
+
+def _sort_key(value: Any) -> Tuple[str, Any]:
+    if isinstance(value, datetime):
+        return _DATE, value
+    if isinstance(value, str):
+        return _STRING, value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return _NUMBER, value
+    return _NULL, None
+
+
+def encode_cursor(doc: Dict[str, Any]) -> str:
+    kind, value = _sort_key(doc.get("create_date"))
+    payload = value.isoformat() if kind == _DATE else "" if value is None else str(value)
+    raw = f"{kind}:{payload}|{doc['_id']}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, Any, ObjectId]:
+    """(kind, create_date value, _id); raises ValueError on a malformed cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key, oid = base64.urlsafe_b64decode(padded.encode()).decode().rsplit("|", 1)
+        kind, payload = key.split(":", 1)
+        value = {
+            _DATE: datetime.fromisoformat, _STRING: str, _NUMBER: float, _NULL: lambda _: None,
+        }[kind](payload)
+        return kind, value, ObjectId(oid)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def keyset_filter(base: Dict[str, Any], cursor: Optional[str]) -> Dict[str, Any]:
+    if not cursor:
+        return base
+    kind, value, oid = decode_cursor(cursor)
+    if kind == _NULL:
+        # Last in the sort order: only the remaining null/missing ones, by _id
+        after = {"create_date": None, "_id": {"$lt": oid}}
+    else:
+        # $lte only matches values of the cursor's own type (Mongo's type bracketing), so
+        # this stays a bounded index scan; the $nor drops the already-served ties.
+        after = {"$or": [
+            {
+                "create_date": {"$lte": value},
+                "$nor": [{"create_date": value, "_id": {"$gte": oid}}],
+            },
+            _AFTER_KIND[kind],
+        ]}
+    if "$or" in base:
+        return {"$and": [base, after]}
+    return {**base, **after}
+
+
+def build_projection(allowed: List[str], requested: Optional[str]) -> Dict[str, int]:
+    """Project the allowed fields, or the requested subset of them (comma list)."""
+    fields = allowed
+    if requested:
+        wanted = {f.strip() for f in requested.split(",") if f.strip()}
+        fields = [f for f in allowed if f in wanted]
+    projection = {f: 1 for f in fields}
+    projection["create_date"] = 1  # needed for the cursor
+    return projection
+
+
+async def fetch_page(collection, base: Dict[str, Any], projection: Dict[str, int],
+                     limit: int, cursor: Optional[str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Return (docs, next_cursor); next_cursor is None on the last page."""
+    query = keyset_filter(base, cursor)
+    docs = await (
+        collection.find(query, projection)
+        .sort([("create_date", -1), ("_id", -1)])
+        .limit(limit + 1)
+        .to_list(limit + 1)
+    )
+    next_cursor = encode_cursor(docs[limit - 1]) if len(docs) > limit else None
+    return docs[:limit], next_cursor
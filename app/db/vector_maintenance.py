@@ -0,0 +1,94 @@
+# app/db/vector_maintenance.py
+"""
+Chroma-level helpers for vector lifecycle work (deletes, retention, stats,
+compaction). Only needs a chromadb collection, so the API and offline
+scripts share it.
+
+VECTOR_RETENTION_DAYS  drop vectors older than this many days (0 = keep forever).
+                       Mongo documents are untouched; only the index forgets them.
+VECTOR_DELETES_TTL_DAYS  how long vector_deletes tombstones are kept (TTL index) for
+                       a reindex catch-up; must outlast the longest reindex run.
+"""
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from app.services.index_documents import CREATED_TS_KEY
+
+VECTOR_RETENTION_DAYS = float(os.getenv("VECTOR_RETENTION_DAYS", "0"))
+VECTOR_DELETES_TTL_DAYS = float(os.getenv("VECTOR_DELETES_TTL_DAYS", "14"))
+PAGE_SIZE = 5000
+
+
+def retention_cutoff(days: float = VECTOR_RETENTION_DAYS) -> Optional[int]:
+    """Epoch seconds before which vectors expire, or None when retention is off."""
+    if days <= 0:
+        return None
+    return int(time.time() - days * 86400)
+
+
+def vector_created_ts(metadata: Dict) -> Optional[int]:
+    """created_ts, falling back to the ISO `date` string on vectors indexed before it existed."""
+    ts = metadata.get(CREATED_TS_KEY)
+    if isinstance(ts, (int, float)):
+        return int(ts)
+    try:
+        parsed = datetime.fromisoformat(str(metadata.get("date")))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+def iter_collection(collection, include: List[str], page_size: int = PAGE_SIZE) -> Iterator[Dict[str, list]]:
+    """Page through a whole collection; yields chroma get() results."""
+    offset = 0
+    while True:
+        page = collection.get(include=include, limit=page_size, offset=offset)
+        if not page["ids"]:
+            return
+        yield page
+        offset += len(page["ids"])
+
+
+def delete_by_source_ids(collection, source_ids: Iterable[str]) -> int:
+    """Remove every vector (all chunks) whose source_id is in `source_ids`."""
+    ids = [str(s) for s in source_ids]
+    if not ids:
+        return 0
+    matches = collection.get(where={"source_id": {"$in": ids}}, include=[])["ids"]
+    if matches:
+        collection.delete(ids=matches)
+    return len(matches)
+
+
+def purge_expired(collection, cutoff: Optional[int]) -> int:
+    """
+    Delete vectors older than `cutoff` by vector_created_ts, the same test /index/stats
+    uses, so legacy vectors that only carry `date` expire too. Scans, then deletes by id
+    (deleting while paging would shift the offsets).
+    """
+    if cutoff is None:
+        return 0
+    expired: List[str] = []
+    for page in iter_collection(collection, include=["metadatas"]):
+        for vector_id, metadata in zip(page["ids"], page["metadatas"]):
+            ts = vector_created_ts(metadata or {})
+            if ts is not None and ts < cutoff:
+                expired.append(vector_id)
+    for start in range(0, len(expired), PAGE_SIZE):
+        collection.delete(ids=expired[start:start + PAGE_SIZE])
+    return len(expired)
+
+
+def directory_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
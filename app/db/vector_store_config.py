@@ -0,0 +1,97 @@
+# app/db/vector_store_config.py
+"""
+Vector-store settings shared by the API and offline tools (reindex).
+The collection the API serves from is resolved through an ACTIVE_COLLECTION
+pointer file in the Chroma directory, so a rebuilt collection can be swapped
+in atomically (os.replace) without touching env config.
+
+HNSW settings apply when a collection is created (API start on an empty
+store, reindex, compact_index). space / M / construction ef are fixed for a
+collection's lifetime - changing them means rebuilding it with
+`python -m app.scripts.compact_index` (no re-embedding) - while search ef is
+updated in place at startup. Defaults are Chroma's own. This relies on the
+collection `configuration` API (get_or_create_collection(configuration=...),
+collection.configuration, collection.modify(configuration=...)) of chromadb 1.x.
+
+HNSW_SPACE=l2|cosine|ip  HNSW_M=16  HNSW_CONSTRUCTION_EF=100  HNSW_SEARCH_EF=100
+SEARCH_TOP_K=3 (memories retrieved per /search-memories query)
+"""
+import os
+from typing import Any, Dict, Optional
+
+CHROMA_DB_DIR = os.getenv("CHROMA_DB_DIR", "./chroma_db")
+CHROMA_COLLECTION = os.getenv("CHROMA_COLLECTION", "rewind-ai")
+INDEX_EMBED_MODEL = os.getenv("INDEX_EMBED_MODEL", "BAAI/bge-small-en-v1.5")
+
+ACTIVE_COLLECTION_FILE = os.path.join(CHROMA_DB_DIR, "ACTIVE_COLLECTION")
+
+HNSW_SPACE = os.getenv("HNSW_SPACE", "l2")
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_CONSTRUCTION_EF = int(os.getenv("HNSW_CONSTRUCTION_EF", "100"))
+HNSW_SEARCH_EF = int(os.getenv("HNSW_SEARCH_EF", "100"))
+SEARCH_TOP_K = int(os.getenv("SEARCH_TOP_K", "3"))
+
+# Set at creation only; anything else in the hnsw block can be modified later
+HNSW_FIXED_KEYS = ("space", "max_neighbors", "ef_construction")
+
+
+def hnsw_configuration(space: str = HNSW_SPACE, m: int = HNSW_M, construction_ef: int = HNSW_CONSTRUCTION_EF,
+                       search_ef: int = HNSW_SEARCH_EF) -> Dict[str, Any]:
+    """Chroma collection `configuration` for the given HNSW settings."""
+    return {"hnsw": {"space": space, "max_neighbors": m, "ef_construction": construction_ef, "ef_search": search_ef}}
+
+
+def _without_hnsw_metadata(metadata: Optional[Dict]) -> Optional[Dict]:
+    # Legacy "hnsw:*" metadata keys would conflict with the explicit configuration
+    cleaned = {k: v for k, v in (metadata or {}).items() if not k.startswith("hnsw:")}
+    return cleaned or None
+
+
+def create_vector_collection(chroma, name: str, metadata: Optional[Dict] = None,
+                             configuration: Optional[Dict[str, Any]] = None):
+    """
+    Get `name`, or create it with the configured HNSW settings; reconcile search ef if it exists.
+    One get_or_create call, so processes starting together on an empty store don't race to create it.
+    """
+    configuration = configuration or hnsw_configuration()
+    collection = chroma.get_or_create_collection(
+        name, metadata=_without_hnsw_metadata(metadata), configuration=configuration)
+
+    wanted = configuration["hnsw"]
+    current = (collection.configuration or {}).get("hnsw") or {}
+    drift = {k: (current.get(k), wanted[k]) for k in HNSW_FIXED_KEYS if current.get(k) != wanted[k]}
+    if drift:
+        print(f"⚠️ Collection '{name}' was built with different HNSW settings {drift} (current, configured); "
+              f"rebuild it with app.scripts.compact_index to apply them")
+    if current.get("ef_search") != wanted["ef_search"]:
+        try:
+            collection.modify(configuration={"hnsw": {"ef_search": wanted["ef_search"]}})
+            print(f"✅ HNSW search ef for '{name}': {current.get('ef_search')} -> {wanted['ef_search']}")
+        except Exception as e:
+            print(f"⚠️ Could not update HNSW search ef for '{name}': {e}")
+    return collection
+
+
+def active_collection_name() -> str:
+    """Collection named by the pointer file, else CHROMA_COLLECTION."""
+    try:
+        with open(ACTIVE_COLLECTION_FILE) as f:
+            name = f.read().strip()
+        if name:
+            return name
+    except FileNotFoundError:
+        pass
+    return CHROMA_COLLECTION
+
+
+def set_active_collection(name: str) -> Optional[str]:
+    """Atomically point the API at `name`; returns the previously active collection."""
+    previous = active_collection_name()
+    os.makedirs(CHROMA_DB_DIR, exist_ok=True)
+    tmp_path = f"{ACTIVE_COLLECTION_FILE}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, ACTIVE_COLLECTION_FILE)
+    return previous
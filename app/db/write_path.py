@@ -0,0 +1,68 @@
+# app/db/write_path.py
+"""
+Single-round-trip writes for moods and replays.
+
+_ids are generated client-side and the response documents are the ones we
+inserted, so nothing is read back. A new mood is written before its replay is
+generated (the LLM call takes seconds, and the user's entry must survive a
+disconnect or a failed generation), the replay in a second write afterwards.
+
+MONGO_WRITE_CONCERN = server default if unset, else e.g. 1 | majority
+MONGO_WRITE_JOURNAL = true | false (unset = server default)
+"""
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from pymongo.write_concern import WriteConcern
+
+from app.db.mongo_client import db
+
+MONGO_WRITE_CONCERN = os.getenv("MONGO_WRITE_CONCERN", "")
+MONGO_WRITE_JOURNAL = os.getenv("MONGO_WRITE_JOURNAL", "")
+
+
+def _write_concern() -> Optional[WriteConcern]:
+    if not MONGO_WRITE_CONCERN and not MONGO_WRITE_JOURNAL:
+        return None
+    w: Any = MONGO_WRITE_CONCERN or None
+    if isinstance(w, str) and w.isdigit():
+        w = int(w)
+    j = MONGO_WRITE_JOURNAL.lower() in ("1", "true", "yes") if MONGO_WRITE_JOURNAL else None
+    return WriteConcern(w=w, j=j)
+
+
+WRITE_CONCERN = _write_concern()
+
+
+def _collection(name: str):
+    collection = db[name]
+    return collection.with_options(write_concern=WRITE_CONCERN) if WRITE_CONCERN else collection
+
+
+def mongo_datetime(value: Any) -> Any:
+    """What Mongo will hand back for `value`: naive UTC, millisecond precision."""
+    if not isinstance(value, datetime):
+        return value
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.replace(microsecond=value.microsecond // 1000 * 1000)
+
+
+async def insert_mood(mood: Dict) -> None:
+    """Insert a mood that already carries its _id."""
+    await _collection("moods").insert_one(mood)
+
+
+async def insert_moods(moods: List[Dict]) -> None:
+    if moods:
+        await _collection("moods").insert_many(moods, ordered=True)
+
+
+async def insert_replay(replay: Dict) -> None:
+    await _collection("replays").insert_one(replay)
+
+
+async def insert_replays(replays: List[Dict]) -> None:
+    if replays:
+        await _collection("replays").insert_many(replays, ordered=True)
@@ -1,14 +1,19 @@
 from dotenv import load_dotenv
 load_dotenv()
 
-from fastapi import FastAPI
+import asyncio
+import time
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.routing import Match
 
 # Trigger loading of models and clients
 from app.db import embedding_model  # Loads embedding model
 from app.db.chroma_client import chroma_client
 from app.db import llama_index_client  # Initializes LlamaIndex
 from app.db.mongo_client import verify_connection  # MongoDB check
+from app.db.mongo_indexes import ensure_indexes
 
 # Routers
 from app.api.routes_emotion import router as emotion_router
@@ -17,6 +22,21 @@ from app.api.routes_replay import router as replay_router
 from app.api.routes_transcribe import router as transcribe_router
 
 from app.api.routes_index import router as index_router
+from app.api.routes_ingest import router as ingest_router
+from app.api.routes_memories import router as memories_router
+from app.api.routes_analytics import router as analytics_router
+from app.api.routes_metrics import router as metrics_router
+from app.api.responses import MongoJSONResponse
+
+from app.services.metrics import (
+    HTTP_LATENCY, HTTP_REQUESTS, IN_FLIGHT, REQUEST_ID_HEADER,
+    new_request_id, reset_request_id, set_request_id,
+)
+from app.services.tracing import span
+from app.services.emotion_service import warm_up_cache
+from app.services.speech_models import speech_models
+from app.services.profiling import LOOP_WATCHDOG_MS, LoopWatchdog, profile_request, should_profile
+from app.services.vector_lifecycle import VECTOR_RETENTION_DAYS, retention_loop
 
 
 
@@ -24,7 +44,8 @@ app = FastAPI(
     title="Rewind Emotion Assistant API",
     description="API for detecting emotion, extracting memory context, and generating AI reflections",
     version="1.0.0",
-    root_path="/ai"  # <--- Add this line
+    root_path="/ai",  # <--- Add this line
+    default_response_class=MongoJSONResponse,
 )
 
 
@@ -35,10 +56,62 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Request-ID", "Retry-After"],
 )
 
 
+def _route_template(request: Request) -> str:
+    """Resolve the route path template up front so metric labels stay low-cardinality."""
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return getattr(route, "path", request.url.path)
+    return "unmatched"
+
+
+# Correlation ID + request-level metrics
+@app.middleware("http")
+async def request_metrics(request: Request, call_next):
+    request_id = new_request_id(request.headers.get(REQUEST_ID_HEADER))
+    token = set_request_id(request_id)
+    route = _route_template(request)
+    IN_FLIGHT.inc(route=route)
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        with span(f"{request.method} {route}", request_id=request_id):
+            if should_profile(request.headers):
+                async with profile_request(request_id, route):
+                    response = await call_next(request)
+            else:
+                response = await call_next(request)
+        status_code = response.status_code
+        response.headers[REQUEST_ID_HEADER] = request_id
+        return response
+    finally:
+        IN_FLIGHT.dec(route=route)
+        HTTP_LATENCY.observe(time.perf_counter() - start, method=request.method, route=route)
+        HTTP_REQUESTS.inc(method=request.method, route=route, status=str(status_code))
+        reset_request_id(token)
+
+
 # Startup Checks
+def _warm_emotion_cache():
+    try:
+        warmed = warm_up_cache()
+        print(f"✅ Emotion cache warmed with {warmed} phrases.")
+    except Exception as e:
+        print(f"⚠️ Emotion cache warm-up failed: {e}")
+
+
+def _warm_speech_models():
+    try:
+        loaded = speech_models.warm()
+        print(f"✅ Speech models warmed: {', '.join(loaded) or 'none'}.")
+    except Exception as e:
+        print(f"⚠️ Speech model warm-up failed: {e}")
+
+
 @app.on_event("startup")
 async def startup_event():
     # ✅ MongoDB
@@ -48,6 +121,16 @@ async def startup_event():
     except Exception as e:
         print(f"❌ MongoDB connection failed during startup: {e}")
 
+    # ✅ MongoDB indexes
+    try:
+        missing = await ensure_indexes()
+        if missing:
+            print(f"⚠️ MongoDB indexes missing after provisioning: {missing}")
+        else:
+            print("✅ MongoDB indexes verified.")
+    except Exception as e:
+        print(f"❌ MongoDB index provisioning failed: {e}")
+
     # ✅ ChromaDB
     if chroma_client:
         try:
@@ -67,6 +150,23 @@ async def startup_event():
     except Exception as e:
         print(f"❌ Error loading embedding model: {e}")
 
+    # ✅ Emotion result cache warm-up (background, so startup isn't held up)
+    asyncio.get_running_loop().run_in_executor(None, _warm_emotion_cache)
+
+    # ✅ Speech models (SPEECH_WARMUP_LANGUAGES; others load on first use)
+    asyncio.get_running_loop().run_in_executor(None, _warm_speech_models)
+
+    # ✅ Event-loop lag watchdog (LOOP_WATCHDOG_MS)
+    if LOOP_WATCHDOG_MS > 0:
+        app.state.loop_watchdog = LoopWatchdog()
+        app.state.loop_watchdog.start()
+        print(f"✅ Event-loop watchdog enabled: stalls over {LOOP_WATCHDOG_MS:g}ms are logged with a stack.")
+
+    # ✅ Vector retention (VECTOR_RETENTION_DAYS)
+    if VECTOR_RETENTION_DAYS > 0:
+        app.state.retention_task = asyncio.create_task(retention_loop())
+        print(f"✅ Vector retention enabled: {VECTOR_RETENTION_DAYS:g} days.")
+
     # ✅ LlamaIndex
     try:
         if llama_index_client.index:
@@ -82,6 +182,10 @@ app.include_router(emotion_router, prefix="/api")
 app.include_router(replay_router, prefix="/api")
 app.include_router(index_router, prefix="/api")
 app.include_router(transcribe_router, prefix="/api")
+app.include_router(ingest_router, prefix="/api")
+app.include_router(memories_router, prefix="/api")
+app.include_router(analytics_router, prefix="/api")
+app.include_router(metrics_router)
 
 # app.include_router(healing_router, prefix="/api")  # Optional
 
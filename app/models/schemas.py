@@ -1,6 +1,11 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel, BeforeValidator, ConfigDict, Field
+from typing import Annotated, Any, List, Optional, Union
 from datetime import datetime
+from bson import ObjectId
+
+
+# ObjectId in, hex string out
+PyObjectId = Annotated[str, BeforeValidator(lambda v: str(v) if isinstance(v, ObjectId) else v)]
 
 
 class TextRequest(BaseModel):
@@ -41,3 +46,106 @@ class ReplayCreateRequest(BaseModel):
     moods: str  # String, will be converted to ObjectId
     create_date: Optional[datetime] = Field(default_factory=datetime.utcnow)
     updatedAt: Optional[datetime] = Field(default_factory=datetime.utcnow)
+
+
+class ReplayUpdateRequest(BaseModel):
+    """Partial update of a stored replay; only the fields sent are changed."""
+    gem_response: Optional[str] = None
+    user_response: Optional[str] = None
+    context_tags: Optional[List[str]] = None
+    location: Optional[str] = None
+    is_shown: Optional[bool] = None
+
+
+
+class BulkMoodEntry(BaseModel):
+    """One NDJSON line of a bulk import; anything missing is inferred from user_text."""
+    user_text: str
+    mood: Optional[str] = None
+    audio_file: Optional[str] = None
+    ai_response: Optional[str] = None
+    is_shown: Optional[bool] = True
+    longitude: Optional[float] = None
+    latitude: Optional[float] = None
+    events: Optional[List[str]] = None
+    context_tags: Optional[List[str]] = None
+    replay_opportunity_score: Optional[str] = None
+    create_date: Optional[datetime] = Field(default_factory=datetime.utcnow)
+
+# --------- Responses --------- #
+# Fields are optional because list endpoints can project a subset (?fields=);
+# routes use response_model_exclude_unset so absent fields stay absent.
+
+class MoodOut(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    id: PyObjectId = Field(alias="_id")
+    user: Optional[PyObjectId] = None
+    user_text: Optional[str] = None
+    audio_file: Optional[str] = None
+    mood: Optional[str] = None
+    ai_response: Optional[str] = None
+    is_shown: Optional[bool] = None
+    longitude: Optional[float] = None
+    latitude: Optional[float] = None
+    events: Optional[List[Any]] = None
+    context_tags: Optional[List[str]] = None
+    replay_opportunity_score: Optional[Union[str, float]] = None
+    create_date: Optional[Union[datetime, str]] = None
+
+
+class ReplayOut(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    id: PyObjectId = Field(alias="_id")
+    user: Optional[PyObjectId] = None
+    moods: Optional[PyObjectId] = None
+    gem_response: Optional[str] = None
+    user_response: Optional[str] = None
+    mood: Optional[str] = None
+    is_shown: Optional[bool] = None
+    longitude: Optional[float] = None
+    latitude: Optional[float] = None
+    events: Optional[List[Any]] = None
+    context_tags: Optional[List[str]] = None
+    replay_opportunity_score: Optional[Union[str, float]] = None
+    location: Optional[str] = None
+    create_date: Optional[Union[datetime, str]] = None
+    updatedAt: Optional[Union[datetime, str]] = None
+
+
+class MoodWithReplayOut(BaseModel):
+    mood: MoodOut
+    replay: ReplayOut
+
+
+class ReplayCandidateOut(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    id: PyObjectId = Field(alias="_id")  # the mood's _id
+    user: Optional[PyObjectId] = None
+    score: float
+    mood: Optional[str] = None
+    preview: Optional[str] = None
+    events: Optional[List[Any]] = None
+    context_tags: Optional[List[str]] = None
+    create_date: Optional[Union[datetime, str]] = None
+
+
+class NearbyMemoryOut(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    id: PyObjectId = Field(alias="_id")
+    kind: str  # "mood" | "replay"
+    distance_m: float
+    user: Optional[PyObjectId] = None
+    mood: Optional[str] = None
+    user_text: Optional[str] = None
+    gem_response: Optional[str] = None
+    user_response: Optional[str] = None
+    events: Optional[List[Any]] = None
+    context_tags: Optional[List[str]] = None
+    location: Optional[str] = None
+    longitude: Optional[float] = None
+    latitude: Optional[float] = None
+    create_date: Optional[Union[datetime, str]] = None
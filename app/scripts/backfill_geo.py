@@ -0,0 +1,95 @@
+# app/scripts/backfill_geo.py
+"""
+Add GeoJSON `geo` points to moods and replays written before they existed.
+
+    python -m app.scripts.backfill_geo               # moods, then replays
+    python -m app.scripts.backfill_geo --dry-run     # count only
+
+Moods get a point from their latitude/longitude. Replays use their own
+coordinates, or inherit their mood's point (POST /user-replay replays carry
+none). Idempotent: only documents without `geo` are touched, so it can be
+re-run or interrupted at any time.
+"""
+import argparse
+from typing import Dict, List
+
+from pymongo import MongoClient, UpdateOne
+
+from app.db.geo import GEO_FIELD, geo_point
+from app.scripts.reindex import MONGO_DB_NAME, MONGO_URI
+
+MISSING = {GEO_FIELD: {"$exists": False}}
+
+
+def _flush(collection, ops: List[UpdateOne], dry_run: bool) -> int:
+    if ops and not dry_run:
+        collection.bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+def backfill_moods(db, batch_size: int, dry_run: bool) -> Dict[str, int]:
+    counts = {"scanned": 0, "updated": 0}
+    ops: List[UpdateOne] = []
+    cursor = db.moods.find({**MISSING, "latitude": {"$ne": None}, "longitude": {"$ne": None}},
+                           {"latitude": 1, "longitude": 1}, batch_size=batch_size)
+    for mood in cursor:
+        counts["scanned"] += 1
+        point = geo_point(mood.get("latitude"), mood.get("longitude"))
+        if point is not None:
+            ops.append(UpdateOne({"_id": mood["_id"]}, {"$set": {GEO_FIELD: point}}))
+        if len(ops) >= batch_size:
+            counts["updated"] += _flush(db.moods, ops, dry_run)
+            ops = []
+    counts["updated"] += _flush(db.moods, ops, dry_run)
+    return counts
+
+
+def backfill_replays(db, batch_size: int, dry_run: bool) -> Dict[str, int]:
+    counts = {"scanned": 0, "updated": 0}
+    cursor = db.replays.find(MISSING, {"latitude": 1, "longitude": 1, "moods": 1}, batch_size=batch_size)
+    page: List[Dict] = []
+
+    def apply(page: List[Dict]) -> int:
+        mood_ids = [r["moods"] for r in page if r.get("moods") is not None]
+        mood_points = {
+            m["_id"]: m[GEO_FIELD] for m in db.moods.find(
+                {"_id": {"$in": mood_ids}, GEO_FIELD: {"$exists": True}}, {GEO_FIELD: 1})
+        } if mood_ids else {}
+        ops = []
+        for replay in page:
+            point = geo_point(replay.get("latitude"), replay.get("longitude")) or mood_points.get(replay.get("moods"))
+            if point is not None:
+                ops.append(UpdateOne({"_id": replay["_id"]}, {"$set": {GEO_FIELD: point}}))
+        return _flush(db.replays, ops, dry_run)
+
+    for replay in cursor:
+        counts["scanned"] += 1
+        page.append(replay)
+        if len(page) >= batch_size:
+            counts["updated"] += apply(page)
+            page = []
+    if page:
+        counts["updated"] += apply(page)
+    return counts
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Backfill GeoJSON points on moods and replays")
+    p.add_argument("--batch-size", type=int, default=1000)
+    p.add_argument("--dry-run", action="store_true", help="count only; write nothing")
+    return p.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    db = MongoClient(MONGO_URI)[MONGO_DB_NAME]
+    # Moods first so replays without coordinates can inherit their mood's point
+    moods = backfill_moods(db, args.batch_size, args.dry_run)
+    print(f"📍 moods: {moods['updated']} of {moods['scanned']} scanned {'would be ' if args.dry_run else ''}updated")
+    replays = backfill_replays(db, args.batch_size, args.dry_run)
+    print(f"📍 replays: {replays['updated']} of {replays['scanned']} scanned {'would be ' if args.dry_run else ''}updated")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,115 @@
+# app/scripts/compact_index.py
+"""
+Compact the active vector collection.
+
+    python -m app.scripts.compact_index              # copy live vectors, swap, keep old for rollback
+    python -m app.scripts.compact_index --dry-run    # only report what would be dropped
+
+Chroma's HNSW graph keeps deleted elements around, so after many deletes a
+collection is bigger and slower than its live contents. This copies every
+vector whose source document still exists in Mongo (and isn't past
+VECTOR_RETENTION_DAYS) into a fresh collection with its stored embedding -
+no re-embedding - then swaps ACTIVE_COLLECTION to it like the reindex does.
+"""
+import argparse
+from datetime import datetime
+from typing import Dict, List, Set
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from chromadb import PersistentClient
+from pymongo import MongoClient
+
+from app.db.vector_maintenance import directory_size, iter_collection, retention_cutoff, vector_created_ts
+from app.db.vector_store_config import (
+    CHROMA_COLLECTION, CHROMA_DB_DIR, active_collection_name, create_vector_collection, set_active_collection,
+)
+from app.scripts.reindex import MONGO_DB_NAME, MONGO_URI
+
+MONGO_COLLECTIONS = {"mood": "moods", "replay": "replays"}
+
+
+def existing_source_ids(db, metadatas: List[Dict]) -> Set[str]:
+    """source_ids in this page that still exist in Mongo."""
+    wanted: Dict[str, List[ObjectId]] = {}
+    for metadata in metadatas:
+        try:
+            object_id = ObjectId(str(metadata.get("source_id")))
+        except (InvalidId, TypeError):
+            continue
+        wanted.setdefault(MONGO_COLLECTIONS.get(metadata.get("type"), "moods"), []).append(object_id)
+    found: Set[str] = set()
+    for collection_name, ids in wanted.items():
+        found.update(str(d["_id"]) for d in db[collection_name].find({"_id": {"$in": ids}}, {"_id": 1}))
+    return found
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Rebuild the active vector collection without orphans/expired vectors")
+    p.add_argument("--target", help="new collection name (default: <base>-<timestamp>)")
+    p.add_argument("--page-size", type=int, default=2000)
+    p.add_argument("--dry-run", action="store_true", help="count only; write nothing")
+    p.add_argument("--no-swap", action="store_true", help="build only; don't switch ACTIVE_COLLECTION")
+    p.add_argument("--drop-old", action="store_true", help="delete the previously active collection after the swap")
+    return p.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    db = MongoClient(MONGO_URI)[MONGO_DB_NAME]
+    chroma = PersistentClient(path=CHROMA_DB_DIR)
+    source_name = active_collection_name()
+    source = chroma.get_collection(source_name)
+    cutoff = retention_cutoff()
+    size_before = directory_size(CHROMA_DB_DIR)
+
+    target = None
+    if not args.dry_run:
+        target_name = args.target or f"{CHROMA_COLLECTION}-{datetime.utcnow():%Y%m%d%H%M%S}"
+        # A rebuild is where new HNSW_SPACE / HNSW_M / HNSW_CONSTRUCTION_EF settings take effect
+        target = create_vector_collection(chroma, target_name, metadata=source.metadata)
+        print(f"📥 Compacting '{source_name}' into '{target_name}'")
+
+    counts = {"scanned": 0, "kept": 0, "orphans": 0, "expired": 0}
+    for page in iter_collection(source, include=["embeddings", "metadatas", "documents"], page_size=args.page_size):
+        metadatas = [m or {} for m in page["metadatas"]]
+        alive = existing_source_ids(db, metadatas)
+        keep = []
+        for i, metadata in enumerate(metadatas):
+            counts["scanned"] += 1
+            if str(metadata.get("source_id")) not in alive:
+                counts["orphans"] += 1
+                continue
+            ts = vector_created_ts(metadata)
+            if cutoff is not None and ts is not None and ts < cutoff:
+                counts["expired"] += 1
+                continue
+            keep.append(i)
+        counts["kept"] += len(keep)
+        if target is not None and keep:
+            target.upsert(
+                ids=[page["ids"][i] for i in keep],
+                embeddings=[page["embeddings"][i] for i in keep],
+                metadatas=[metadatas[i] for i in keep],
+                documents=[page["documents"][i] for i in keep],
+            )
+        print(f"⏱️ {counts}")
+
+    print(f"✅ Compaction scan of '{source_name}': {counts}")
+    if target is None:
+        return 0
+    if args.no_swap:
+        print("ℹ️ --no-swap: ACTIVE_COLLECTION unchanged")
+        return 0
+
+    previous = set_active_collection(target.name)
+    print(f"🔁 ACTIVE_COLLECTION: '{previous}' -> '{target.name}' (restart API workers to pick it up)")
+    if args.drop_old and previous and previous != target.name:
+        chroma.delete_collection(previous)
+        print(f"🗑️ Dropped old collection '{previous}'")
+    print(f"💾 Chroma directory: {size_before / 1e6:.1f} MB -> {directory_size(CHROMA_DB_DIR) / 1e6:.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
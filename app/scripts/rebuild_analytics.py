@@ -0,0 +1,51 @@
+# app/scripts/rebuild_analytics.py
+"""
+Recompute mood analytics rollups from the mood and replay history.
+
+    python -m app.scripts.rebuild_analytics                  # every user
+    python -m app.scripts.rebuild_analytics --user <id>      # one user
+
+The API keeps rollups current with $inc upserts; this is for the initial
+backfill, after bulk edits made outside the API, or if drift is suspected.
+Each user's rollups are recomputed in full and replaced, and buckets that no
+longer have any moods are dropped - by mood_analytics.rebuild_user_rollups, the
+same code POST /analytics/rebuild runs. Moods written for a user while their
+rebuild runs can be missed; re-run for that user if so.
+"""
+import argparse
+import asyncio
+from typing import List
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.scripts.reindex import MONGO_DB_NAME, MONGO_URI
+from app.services.mood_analytics import rebuild_user_rollups
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Rebuild per-user day/week mood rollups")
+    p.add_argument("--user", action="append", help="user _id (repeatable; default: every user with moods)")
+    p.add_argument("--batch-size", type=int, default=5000)
+    return p.parse_args(argv)
+
+
+async def rebuild(user_ids: List[str], batch_size: int) -> int:
+    db = AsyncIOMotorClient(MONGO_URI)[MONGO_DB_NAME]
+    users: List[ObjectId] = [ObjectId(u) for u in user_ids] if user_ids else await db.moods.distinct("user")
+    total = 0
+    for n, user_id in enumerate(users, 1):
+        total += await rebuild_user_rollups(user_id, batch_size, database=db)
+        if n % 100 == 0:
+            print(f"📊 {n}/{len(users)} users, {total} rollups")
+    print(f"✅ Rebuilt {total} rollups for {len(users)} users")
+    return 0
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    return asyncio.run(rebuild(args.user, args.batch_size))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,327 @@
+# app/scripts/reindex.py
+"""
+Full-corpus reindex into a fresh Chroma collection.
+
+    python -m app.scripts.reindex --workers 4            # start (or --resume a crashed run)
+    python -m app.scripts.reindex --resume
+
+Streams every user's moods and replays from Mongo, fans format_for_indexing +
+batched embedding out over a process pool, and upserts the vectors into a new
+collection. Progress is checkpointed per user (in order), so a resumed run
+skips finished users and idempotently re-upserts the partially written one.
+Moods and replays the API writes meanwhile land in the old collection, so
+before the swap a catch-up pass re-embeds everything created or updated since
+the run started and applies the vector deletes recorded since then
+(vector_deletes). When done, ACTIVE_COLLECTION is swapped to the new
+collection in one atomic rename; API workers pick it up on restart, and
+`--catch-up-since <swap time>` afterwards covers writes made before the
+restart. The old collection is kept for rollback unless --drop-old is given.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+from bson import ObjectId
+from chromadb import PersistentClient
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+load_dotenv()
+
+from app.db.vector_maintenance import VECTOR_DELETES_TTL_DAYS, delete_by_source_ids
+from app.db.vector_store_config import (
+    CHROMA_COLLECTION, CHROMA_DB_DIR, INDEX_EMBED_MODEL, active_collection_name, create_vector_collection,
+    set_active_collection,
+)
+
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "rewind")
+CHECKPOINT_PATH = os.path.join(CHROMA_DB_DIR, "reindex_checkpoint.json")
+CATCH_UP_SKEW_S = 60  # writes in flight when the run started, clock skew between hosts
+
+MOOD_FIELDS = {"user_text": 1, "mood": 1, "ai_response": 1, "latitude": 1, "longitude": 1,
+               "create_date": 1, "context_tags": 1, "replay_opportunity_score": 1}
+REPLAY_FIELDS = {"gem_response": 1, "user_response": 1, "location": 1, "create_date": 1,
+                 "context_tags": 1, "replay_opportunity_score": 1, "moods": 1}
+
+
+# ------------------------------ Workers ------------------------------
+_embedder = None
+_splitter = None
+
+
+def _init_worker(model_name: str, threads: int) -> None:
+    global _embedder, _splitter
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    from llama_index.core.node_parser import SentenceSplitter
+    from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+    _embedder = HuggingFaceEmbedding(model_name=model_name)
+    _splitter = SentenceSplitter()
+
+
+def _embed_unit(user_id: str, moods: List[Dict], replays: List[Dict]) -> Tuple[int, Dict[str, list]]:
+    """Format + split + embed one batch of a user's documents; returns Chroma upsert columns."""
+    from llama_index.core.schema import MetadataMode
+    from llama_index.core.vector_stores.utils import node_to_metadata_dict
+    from app.services.index_documents import format_for_indexing
+
+    docs = format_for_indexing(user_id, moods, replays)
+    nodes = _splitter.get_nodes_from_documents(docs)
+    texts = [n.get_content(metadata_mode=MetadataMode.EMBED) for n in nodes]
+    embeddings = _embedder.get_text_embedding_batch(texts) if texts else []
+
+    columns: Dict[str, list] = {"ids": [], "embeddings": [], "metadatas": [], "documents": []}
+    seen: Dict[str, int] = {}
+    for node, embedding in zip(nodes, embeddings):
+        # Deterministic ids so a resumed run overwrites instead of duplicating
+        n = seen.get(node.ref_doc_id, 0)
+        seen[node.ref_doc_id] = n + 1
+        node.id_ = f"{node.ref_doc_id}:{n}"
+        metadata = node_to_metadata_dict(node, remove_text=True, flat_metadata=True)
+        columns["ids"].append(node.node_id)
+        columns["embeddings"].append(embedding)
+        columns["metadatas"].append({k: ("" if v is None else v) for k, v in metadata.items()})
+        columns["documents"].append(node.get_content(metadata_mode=MetadataMode.NONE))
+    return len(docs), columns
+
+
+# ----------------------------- Checkpoint ----------------------------
+def load_checkpoint(path: str) -> Optional[Dict]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_checkpoint(path: str, state: Dict) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+# ------------------------------ Mongo --------------------------------
+def iter_user_ids(db, after: Optional[str]) -> Iterator[ObjectId]:
+    """Every user with moods or replays, in _id order (streamed, disk-backed group)."""
+    pipeline = [
+        {"$project": {"user": 1}},
+        {"$unionWith": {"coll": "replays", "pipeline": [{"$project": {"user": 1}}]}},
+        {"$group": {"_id": "$user"}},
+        {"$sort": {"_id": 1}},
+    ]
+    if after:
+        pipeline.append({"$match": {"_id": {"$gt": ObjectId(after)}}})
+    for row in db.moods.aggregate(pipeline, allowDiskUse=True):
+        if row["_id"] is not None:
+            yield row["_id"]
+
+
+def iter_user_units(db, user_id: ObjectId, batch_size: int) -> Iterator[Tuple[List[Dict], List[Dict]]]:
+    """A user's moods then replays, cut into batches of at most batch_size documents."""
+    for collection, fields in ((db.moods, MOOD_FIELDS), (db.replays, REPLAY_FIELDS)):
+        batch: List[Dict] = []
+        for doc in collection.find({"user": user_id}, fields).batch_size(batch_size):
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                yield (batch, []) if collection is db.moods else ([], batch)
+                batch = []
+        if batch:
+            yield (batch, []) if collection is db.moods else ([], batch)
+
+
+def catch_up(db, pool, target, since: datetime, batch_size: int) -> Tuple[int, int]:
+    """
+    Re-embed moods/replays created or updated since `since` into `target` and
+    drop the vectors of documents deleted since then. Returns (docs, vectors deleted).
+    """
+    changed = {"$or": [{"create_date": {"$gte": since}}, {"updatedAt": {"$gte": since}}]}
+    tasks = []
+    for collection, fields in ((db.moods, MOOD_FIELDS), (db.replays, REPLAY_FIELDS)):
+        per_user: Dict[ObjectId, List[Dict]] = {}
+        for doc in collection.find(changed, {**fields, "user": 1}):
+            if doc.get("user") is not None:
+                per_user.setdefault(doc["user"], []).append(doc)
+        for user_id, docs in per_user.items():
+            for i in range(0, len(docs), batch_size):
+                batch = docs[i:i + batch_size]
+                unit = (batch, []) if collection is db.moods else ([], batch)
+                tasks.append((pool.submit(_embed_unit, str(user_id), *unit), [str(d["_id"]) for d in batch]))
+
+    rewritten = 0
+    for future, source_ids in tasks:
+        n_docs, columns = future.result()
+        delete_by_source_ids(target, source_ids)  # an edited document may now split into fewer chunks
+        if columns["ids"]:
+            target.upsert(**columns)
+        rewritten += n_docs
+
+    tombstones = db.vector_deletes.find({"deleted_at": {"$gte": since}}, {"source_id": 1})
+    deleted_ids = {row["source_id"] for row in tombstones}
+    return rewritten, delete_by_source_ids(target, deleted_ids)
+
+
+# ------------------------------- Main --------------------------------
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Rebuild the vector index into a fresh collection")
+    p.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    p.add_argument("--threads-per-worker", type=int, default=None, help="torch intra-op threads per worker")
+    p.add_argument("--batch-size", type=int, default=256, help="documents per worker task")
+    p.add_argument("--embed-model", default=INDEX_EMBED_MODEL)
+    p.add_argument("--target", help="new collection name (default: <base>-<timestamp>)")
+    p.add_argument("--resume", action="store_true", help="continue the run recorded in the checkpoint")
+    p.add_argument("--checkpoint", default=CHECKPOINT_PATH)
+    p.add_argument("--no-swap", action="store_true", help="build only; don't switch ACTIVE_COLLECTION")
+    p.add_argument("--drop-old", action="store_true", help="delete the previously active collection after the swap")
+    p.add_argument("--catch-up-since", type=datetime.fromisoformat, metavar="ISO_UTC",
+                   help="no rebuild: re-apply writes made since this time to the active collection")
+    return p.parse_args(argv)
+
+
+def _pool(args, threads: int) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=_init_worker, initargs=(args.embed_model, threads))
+
+
+def run_catch_up_only(args) -> int:
+    since = args.catch_up_since
+    if since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    if since < datetime.utcnow() - timedelta(days=VECTOR_DELETES_TTL_DAYS):
+        print(f"⚠️ Tombstones expire after VECTOR_DELETES_TTL_DAYS={VECTOR_DELETES_TTL_DAYS:g}; "
+              f"deletes older than that are no longer known and won't be dropped")
+    db = MongoClient(MONGO_URI)[MONGO_DB_NAME]
+    name = active_collection_name()
+    target = PersistentClient(path=CHROMA_DB_DIR).get_collection(name)
+    threads = args.threads_per_worker or max(1, (os.cpu_count() or 2) // args.workers)
+    with _pool(args, threads) as pool:
+        rewritten, removed = catch_up(db, pool, target, args.catch_up_since, args.batch_size)
+    print(f"✅ Caught up '{name}': {rewritten} documents re-embedded, {removed} deleted vectors dropped")
+    return 0
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.catch_up_since:
+        return run_catch_up_only(args)
+    state = load_checkpoint(args.checkpoint) if args.resume else None
+    if args.resume and not state:
+        print(f"❌ No checkpoint at {args.checkpoint}")
+        return 1
+    if state and state.get("embed_model") != args.embed_model:
+        print(f"❌ Checkpoint was built with {state.get('embed_model')}, not {args.embed_model}")
+        return 1
+    if not state:
+        state = {
+            "target": args.target or f"{CHROMA_COLLECTION}-{datetime.utcnow():%Y%m%d%H%M%S}",
+            "embed_model": args.embed_model,
+            "last_user_id": None,
+            "docs_done": 0,
+            "started_at": datetime.utcnow().isoformat(),
+        }
+        save_checkpoint(args.checkpoint, state)
+
+    db = MongoClient(MONGO_URI)[MONGO_DB_NAME]
+    chroma = PersistentClient(path=CHROMA_DB_DIR)
+    target = create_vector_collection(chroma, state["target"])  # HNSW_* settings
+    print(f"📥 Reindexing into '{state['target']}' with {args.workers} workers"
+          f"{' (resuming after user ' + state['last_user_id'] + ')' if state['last_user_id'] else ''}")
+
+    total_estimate = db.moods.estimated_document_count() + db.replays.estimated_document_count()
+    threads = args.threads_per_worker or max(1, (os.cpu_count() or 2) // args.workers)
+    max_in_flight = args.workers * 2
+
+    order: Deque[ObjectId] = deque()   # users in submission order
+    remaining: Dict[ObjectId, int] = {}  # outstanding tasks per user
+    in_flight = {}
+    started = time.perf_counter()
+    docs_this_run = 0
+    last_report = 0.0
+
+    def report(force: bool = False) -> None:
+        nonlocal last_report
+        now = time.perf_counter()
+        if not force and now - last_report < 5:
+            return
+        last_report = now
+        rate = docs_this_run / max(now - started, 1e-6)
+        left = max(total_estimate - state["docs_done"], 0)
+        eta = f"{left / rate / 60:.1f} min" if rate > 0 else "?"
+        print(f"⏱️ {state['docs_done']}/{total_estimate} docs  {rate:.1f} docs/s  ETA {eta}")
+
+    def drain(block_until_below: int) -> None:
+        nonlocal docs_this_run
+        while len(in_flight) > block_until_below:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                user_id = in_flight.pop(future)
+                n_docs, columns = future.result()
+                if columns["ids"]:
+                    target.upsert(**columns)
+                remaining[user_id] -= 1
+                state["docs_done"] += n_docs
+                docs_this_run += n_docs
+            advanced = False
+            while order and remaining[order[0]] == 0:
+                finished = order.popleft()
+                del remaining[finished]
+                state["last_user_id"] = str(finished)
+                advanced = True
+            if advanced:
+                save_checkpoint(args.checkpoint, state)
+            report()
+
+    with _pool(args, threads) as pool:
+        for user_id in iter_user_ids(db, state["last_user_id"]):
+            remaining[user_id] = 0
+            for moods, replays in iter_user_units(db, user_id, args.batch_size):
+                drain(max_in_flight - 1)
+                in_flight[pool.submit(_embed_unit, str(user_id), moods, replays)] = user_id
+                remaining[user_id] += 1
+            # Only once all of a user's tasks are queued can it count towards the checkpoint
+            order.append(user_id)
+        drain(0)
+        # Users with nothing to embed never complete a task; flush them too
+        while order and remaining[order[0]] == 0:
+            state["last_user_id"] = str(order.popleft())
+
+        since = datetime.fromisoformat(state["started_at"]) - timedelta(seconds=CATCH_UP_SKEW_S)
+        rewritten, removed = catch_up(db, pool, target, since, args.batch_size)
+        print(f"🔄 Catch-up: {rewritten} documents written and {removed} vectors deleted during the run")
+
+    state["completed_at"] = datetime.utcnow().isoformat()
+    save_checkpoint(args.checkpoint, state)
+    report(force=True)
+    print(f"✅ Reindex complete: {target.count()} vectors in '{state['target']}'")
+
+    if args.no_swap:
+        print("ℹ️ --no-swap: ACTIVE_COLLECTION unchanged")
+        return 0
+    swapped_at = datetime.utcnow() - timedelta(seconds=CATCH_UP_SKEW_S)
+    previous = set_active_collection(state["target"])
+    print(f"🔁 ACTIVE_COLLECTION: '{previous}' -> '{state['target']}' (restart API workers to pick it up, then run\n"
+          f"   python -m app.scripts.reindex --catch-up-since {swapped_at.isoformat(timespec='seconds')})")
+    # Tombstones older than this run are covered by the new collection
+    db.vector_deletes.delete_many({"deleted_at": {"$lt": since}})
+    if args.drop_old and previous and previous != state["target"]:
+        try:
+            chroma.delete_collection(previous)
+            print(f"🗑️ Dropped old collection '{previous}'")
+        except Exception as e:
+            print(f"⚠️ Could not drop '{previous}': {e}")
+    os.remove(args.checkpoint)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
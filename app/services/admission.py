@@ -0,0 +1,186 @@
+# app/services/admission.py
+"""
+Admission control for LLM-bound work.
+
+Each route gets a limiter: at most CONCURRENCY requests in the LLM stage, up
+to QUEUE more waiting (for at most QUEUE_TIMEOUT_S), and a DEADLINE_S for the
+admitted work. Anything beyond that is shed immediately with 503 + Retry-After
+instead of piling up threads and sockets. Only the LLM part of a route is
+wrapped, so crisis-guard and template replies never wait here.
+
+Blocking work of an admitted stage goes through in_llm_pool (not
+asyncio.to_thread): a dedicated pool of ADMISSION_LLM_WORKERS threads, so LLM
+calls can't starve the default executor that retrieval and Mongo offloads use.
+A request that misses its deadline gets its 503 right away, but its slot stays
+taken until its pool threads actually return, so abandoned calls count against
+CONCURRENCY instead of piling up behind it.
+
+Defaults: ADMISSION_CONCURRENCY, ADMISSION_QUEUE, ADMISSION_QUEUE_TIMEOUT_S,
+ADMISSION_DEADLINE_S, ADMISSION_RETRY_AFTER_S; per route override with
+ADMISSION_<ROUTE>_<SETTING>, e.g. ADMISSION_SEARCH_CONCURRENCY=8.
+"""
+import asyncio
+import contextvars
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import HTTPException
+
+from app.services.metrics import registry
+
+ADMITTED = registry.gauge(
+    "rewind_admission_in_flight", "Requests admitted to an LLM stage", ("route",))
+QUEUED = registry.gauge(
+    "rewind_admission_queued", "Requests waiting for an LLM stage slot", ("route",))
+REJECTED = registry.counter(
+    "rewind_admission_rejected_total", "Requests shed by admission control", ("route", "reason"))
+ABANDONED = registry.gauge(
+    "rewind_admission_abandoned", "Slots still held by LLM threads of requests past their deadline", ("route",))
+
+ADMISSION_LLM_WORKERS = int(os.getenv("ADMISSION_LLM_WORKERS", "64"))
+LLM_POOL = ThreadPoolExecutor(max_workers=ADMISSION_LLM_WORKERS, thread_name_prefix="llm-stage")
+
+
+def _setting(route: str, name: str, default: str) -> float:
+    return float(os.getenv(f"ADMISSION_{route.upper()}_{name}", os.getenv(f"ADMISSION_{name}", default)))
+
+
+class Overloaded(HTTPException):
+    def __init__(self, route: str, retry_after_s: float):
+        super().__init__(
+            status_code=503,
+            detail=f"{route} is busy, please retry shortly",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after_s)))},
+        )
+
+
+class _Lease:
+    """An admitted request's slot: released once the request and all its pool threads are done."""
+
+    def __init__(self, limiter: "AdmissionLimiter"):
+        self.limiter = limiter
+        self.holders = 1  # the admitted coroutine itself
+        self.abandoned = False
+
+    def hold(self) -> None:
+        self.holders += 1
+
+    def done(self) -> None:
+        self.holders -= 1
+        if self.holders == 0:
+            if self.abandoned:
+                ABANDONED.dec(route=self.limiter.route)
+            self.limiter._release()
+
+
+_lease: contextvars.ContextVar[Optional[_Lease]] = contextvars.ContextVar("admission_lease", default=None)
+
+
+async def in_llm_pool(func: Callable[..., Any], *args: Any) -> Any:
+    """asyncio.to_thread on the LLM pool; inside an admitted stage the thread holds the slot until it returns."""
+    loop = asyncio.get_running_loop()
+    future = LLM_POOL.submit(contextvars.copy_context().run, func, *args)
+    lease = _lease.get()
+    if lease is not None:
+        lease.hold()
+        # Fires when the thread really finishes, not when the awaiting request gives up
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(lease.done))
+    return await asyncio.wrap_future(future)
+
+
+class AdmissionLimiter:
+    def __init__(self, route: str, concurrency: int, queue: int, queue_timeout_s: float,
+                 deadline_s: float, retry_after_s: float):
+        self.route = route
+        self.concurrency = concurrency
+        self.queue = queue
+        self.queue_timeout_s = queue_timeout_s
+        self.deadline_s = deadline_s
+        self.retry_after_s = retry_after_s
+        self._slots = asyncio.Semaphore(concurrency)
+        self._waiting = 0
+
+    @classmethod
+    def from_env(cls, route: str) -> "AdmissionLimiter":
+        return cls(
+            route,
+            concurrency=int(_setting(route, "CONCURRENCY", "16")),
+            queue=int(_setting(route, "QUEUE", "32")),
+            queue_timeout_s=_setting(route, "QUEUE_TIMEOUT_S", "2"),
+            deadline_s=_setting(route, "DEADLINE_S", "30"),
+            retry_after_s=_setting(route, "RETRY_AFTER_S", "2"),
+        )
+
+    def _reject(self, reason: str) -> Overloaded:
+        REJECTED.inc(route=self.route, reason=reason)
+        return Overloaded(self.route, self.retry_after_s)
+
+    async def _acquire(self) -> None:
+        if self._slots.locked():
+            if self._waiting >= self.queue:
+                raise self._reject("queue_full")
+            self._waiting += 1
+            QUEUED.inc(route=self.route)
+            # Not wait_for: on 3.11 it can drop a permit acquired just as the timeout fires
+            acquire = asyncio.ensure_future(self._slots.acquire())
+            try:
+                done, _ = await asyncio.wait({acquire}, timeout=self.queue_timeout_s)
+            except asyncio.CancelledError:
+                self._abandon_acquire(acquire)
+                raise
+            finally:
+                self._waiting -= 1
+                QUEUED.dec(route=self.route)
+            if not done:
+                self._abandon_acquire(acquire)
+                raise self._reject("queue_timeout")
+        else:
+            await self._slots.acquire()
+        ADMITTED.inc(route=self.route)
+
+    def _abandon_acquire(self, acquire: asyncio.Future) -> None:
+        """Cancel a pending acquire; hand back the permit if it was granted anyway."""
+        acquire.cancel()
+
+        def give_back(task: asyncio.Future) -> None:
+            if not task.cancelled() and task.exception() is None:
+                self._slots.release()
+
+        acquire.add_done_callback(give_back)
+
+    def _release(self) -> None:
+        ADMITTED.dec(route=self.route)
+        self._slots.release()
+
+    async def run(self, fn: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+        """
+        Await fn(*args) once admitted, within the deadline; fn does its blocking work via
+        in_llm_pool (e.g. run(in_llm_pool, build_replay, ...)). Past the deadline the
+        request is rejected, and the slot is freed only when its pool threads finish.
+        """
+        await self._acquire()
+        lease = _Lease(self)
+        token = _lease.set(lease)
+        try:
+            return await asyncio.wait_for(fn(*args), self.deadline_s)
+        except asyncio.TimeoutError:
+            if lease.holders > 1:
+                lease.abandoned = True
+                ABANDONED.inc(route=self.route)
+            raise self._reject("deadline")
+        finally:
+            _lease.reset(token)
+            lease.done()
+
+
+_limiters: Dict[str, AdmissionLimiter] = {}
+
+
+def admission(route: str) -> AdmissionLimiter:
+    """The (lazily created) limiter for `route`: search, chat, mood_detect, replay."""
+    limiter = _limiters.get(route)
+    if limiter is None:
+        limiter = _limiters[route] = AdmissionLimiter.from_env(route)
+    return limiter
@@ -0,0 +1,138 @@
+# app/services/cooldown_store.py
+"""
+Cooldown stores for crisis_guard: "has this key fired within the last N seconds?"
+as one atomic check-and-set.
+
+CRISIS_COOLDOWN_STORE = memory  bounded in-process LRU with TTL eviction (default)
+                        mongo   shared across workers: one doc per key with a TTL
+                                index on expires_at, claimed with a conditional upsert
+
+try_acquire blocks (the mongo store does network I/O): call it from a worker
+thread, not the event loop. The mongo store gives up after
+CRISIS_COOLDOWN_TIMEOUT_MS and then stays on the in-process store for
+CRISIS_COOLDOWN_RETRY_S, so an outage never holds up a crisis reply.
+"""
+import os
+import threading
+from abc import ABC, abstractmethod
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from app.services.metrics import registry
+
+CRISIS_COOLDOWN_STORE = os.getenv("CRISIS_COOLDOWN_STORE", "memory").lower()
+CRISIS_COOLDOWN_MAX_ENTRIES = int(os.getenv("CRISIS_COOLDOWN_MAX_ENTRIES", "100000"))
+CRISIS_COOLDOWN_COLLECTION = os.getenv("CRISIS_COOLDOWN_COLLECTION", "crisis_cooldowns")
+CRISIS_COOLDOWN_TIMEOUT_MS = int(os.getenv("CRISIS_COOLDOWN_TIMEOUT_MS", "250"))
+CRISIS_COOLDOWN_RETRY_S = float(os.getenv("CRISIS_COOLDOWN_RETRY_S", "30"))
+
+COOLDOWN_ENTRIES = registry.gauge(
+    "rewind_crisis_cooldown_entries", "Keys held by the in-process crisis cooldown store")
+COOLDOWN_STORE_ERRORS = registry.counter(
+    "rewind_crisis_cooldown_store_errors_total", "Shared cooldown store failures (served from memory instead)")
+
+
+class CooldownStore(ABC):
+    @abstractmethod
+    def try_acquire(self, key: str, ttl_s: float) -> bool:
+        """True (and start the cooldown) if `key` is not cooling down; False otherwise."""
+
+
+class MemoryCooldownStore(CooldownStore):
+    """
+    key -> expiry, in expiry order (every key shares the same TTL in practice), so
+    expired entries are always at the front. Past max_entries the oldest live key is
+    dropped, which at worst lets that user see the prompt once more.
+    """
+
+    def __init__(self, max_entries: int = CRISIS_COOLDOWN_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._expiry: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, key: str, ttl_s: float) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            while self._expiry:
+                oldest_key, oldest_expiry = next(iter(self._expiry.items()))
+                if oldest_expiry > now:
+                    break
+                del self._expiry[oldest_key]
+
+            expiry = self._expiry.get(key)
+            if expiry is not None and expiry > now:
+                return False
+            self._expiry[key] = now + ttl_s
+            self._expiry.move_to_end(key)
+            while len(self._expiry) > self.max_entries:
+                self._expiry.popitem(last=False)
+            COOLDOWN_ENTRIES.set(len(self._expiry))
+        return True
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+
+class MongoCooldownStore(CooldownStore):
+    """
+    Shared store. The upsert only matches an *expired* doc for the key; if a live one
+    exists the filter misses, the upsert tries to insert a duplicate _id and Mongo
+    rejects it, so exactly one worker wins each cooldown window. The TTL index keeps
+    the collection to roughly the live keys.
+    """
+
+    def __init__(self, collection=None, fallback: Optional[CooldownStore] = None,
+                 retry_s: float = CRISIS_COOLDOWN_RETRY_S):
+        if collection is None:
+            from pymongo import MongoClient
+
+            from app.db.mongo_client import MONGO_DB_NAME, MONGO_URI
+
+            # Own client: the shared sync client's timeouts are sized for batch work
+            timeout_ms = CRISIS_COOLDOWN_TIMEOUT_MS
+            client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=timeout_ms,
+                                 connectTimeoutMS=timeout_ms, socketTimeoutMS=timeout_ms)
+            collection = client[MONGO_DB_NAME][CRISIS_COOLDOWN_COLLECTION]
+        self.collection = collection
+        self.fallback = fallback or MemoryCooldownStore()
+        self.retry_s = retry_s
+        self._indexed = False
+        self._down_until = 0.0
+
+    def _ensure_index(self) -> None:
+        if not self._indexed:
+            self.collection.create_index("expires_at", name="expires_at_ttl", expireAfterSeconds=0)
+            self._indexed = True
+
+    def try_acquire(self, key: str, ttl_s: float) -> bool:
+        from pymongo.errors import DuplicateKeyError
+
+        if time.monotonic() < self._down_until:
+            return self.fallback.try_acquire(key, ttl_s)
+        now = datetime.now(timezone.utc)
+        try:
+            self._ensure_index()
+            self.collection.update_one(
+                {"_id": key, "expires_at": {"$lte": now}},
+                {"$set": {"expires_at": now + timedelta(seconds=ttl_s)}},
+                upsert=True,
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+        except Exception as e:
+            # Never let a store outage suppress a crisis response; fall back to this worker's view
+            COOLDOWN_STORE_ERRORS.inc()
+            self._down_until = time.monotonic() + self.retry_s
+            print(f"⚠️ Crisis cooldown store unavailable, using in-process store for {self.retry_s:g}s: {e}")
+            return self.fallback.try_acquire(key, ttl_s)
+
+
+def build_cooldown_store(kind: str = CRISIS_COOLDOWN_STORE) -> CooldownStore:
+    if kind == "mongo":
+        return MongoCooldownStore()
+    if kind != "memory":
+        print(f"⚠️ Unknown CRISIS_COOLDOWN_STORE '{kind}', using memory")
+    return MemoryCooldownStore()
@@ -5,13 +5,15 @@ Antaratma Crisis & Prohibited Content Guard (English-only)
 - Detector (EN/Hinglish/Hindi + Devanagari)
 - Country-aware helpline resolver (remote-config first, fallback JSON)
 - Safe, short responses per category (English)
-- Cooldown to avoid spamming the user
+- Cooldown to avoid spamming the user (bounded / shared store)
 """
 from __future__ import annotations
 import re
 import time
 from dataclasses import dataclass
 from typing import Dict, List, Optional, Literal
+
+from app.services.cooldown_store import CooldownStore, build_cooldown_store
 # --------------------------- Types ---------------------------
 Lang = Literal["EN", "HI", "HINGLISH"]
 CrisisCategory = Literal[
@@ -192,17 +194,13 @@ def detect_category(text: str) -> Optional[CrisisCategory]:
         if any(p.search(t) for p in patterns):
             return cat
     return None
-_COOLDOWN: Dict[str, Dict[str, float]] = {}
+# Bounded in-process or shared across workers, see cooldown_store.py (CRISIS_COOLDOWN_STORE)
+_COOLDOWN: CooldownStore = build_cooldown_store()
 COOLDOWN_SECONDS = 90.0
 def _cooldown_ok(user_id: Optional[str], category: CrisisCategory) -> bool:
     if not user_id:
         return True
-    now = time.time()
-    last = _COOLDOWN.get(user_id, {}).get(category, 0.0)
-    if now - last >= COOLDOWN_SECONDS:
-        _COOLDOWN.setdefault(user_id, {})[category] = now
-        return True
-    return False
+    return _COOLDOWN.try_acquire(f"{user_id}:{category}", COOLDOWN_SECONDS)
 
 # --------------------------- Public API -----------------------
 def guard_message(user_message: str,
@@ -211,7 +209,7 @@ def guard_message(user_message: str,
                   remote_helplines: Optional[Dict[str, Dict[str, Dict[str, str]]]] = None
 ) -> DetectOutput:
     """
-    Run the guard:
+    Run the guard (blocking when the cooldown store is shared; async callers use a thread):
       - Detect category & (for logs) language
       - Enforce cooldown
       - Return safe English response + helplines dict (for UI)
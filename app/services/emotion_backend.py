@@ -0,0 +1,195 @@
+# app/services/emotion_backend.py
+"""
+Selectable inference backends for the emotion classifier.
+
+EMOTION_BACKEND = torch      PyTorch fp32 via transformers.pipeline (default)
+                  onnx       ONNX Runtime fp32 (exported once, cached on disk)
+                  onnx-int8  ONNX Runtime with dynamic int8 weight quantization
+
+All backends truncate at EMOTION_MAX_LENGTH tokens and honour EMOTION_THREADS
+(intra-op threads per worker). A non-torch backend is only enabled if its
+labels agree with the fp32 reference on the labeled parity sample at least
+EMOTION_PARITY_THRESHOLD of the time; otherwise we fall back to torch.
+"""
+import json
+import os
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+EMOTION_MODEL = os.getenv("EMOTION_MODEL", "nateraw/bert-base-uncased-emotion")
+EMOTION_BACKEND = os.getenv("EMOTION_BACKEND", "torch").lower()
+EMOTION_MAX_LENGTH = int(os.getenv("EMOTION_MAX_LENGTH", "512"))
+EMOTION_THREADS = int(os.getenv("EMOTION_THREADS", "0"))  # 0 = library default
+EMOTION_ONNX_DIR = os.getenv("EMOTION_ONNX_DIR", "./onnx_models")
+EMOTION_PARITY_CHECK = os.getenv("EMOTION_PARITY_CHECK", "true").lower() in ("1", "true", "yes")
+EMOTION_PARITY_THRESHOLD = float(os.getenv("EMOTION_PARITY_THRESHOLD", "0.97"))
+EMOTION_PARITY_SAMPLE = os.getenv(
+    "EMOTION_PARITY_SAMPLE", os.path.join(os.path.dirname(__file__), "..", "config", "emotion_parity_sample.json")
+)
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+Prediction = Dict[str, Union[str, float]]
+
+
+class TorchClassifier:
+    """transformers text-classification pipeline with explicit truncation."""
+
+    name = "torch"
+
+    def __init__(self, model_name: str = EMOTION_MODEL, max_length: int = EMOTION_MAX_LENGTH,
+                 threads: int = EMOTION_THREADS):
+        import torch
+        from transformers import pipeline
+
+        if threads > 0:
+            torch.set_num_threads(threads)
+        self.max_length = max_length
+        self.pipeline = pipeline("text-classification", model=model_name)
+
+    def __call__(self, texts: Union[str, List[str]], batch_size: int = 32, **kwargs) -> List[Prediction]:
+        batch = [texts] if isinstance(texts, str) else list(texts)
+        if not batch:
+            return []
+        return self.pipeline(batch, batch_size=batch_size, truncation=True, max_length=self.max_length)
+
+
+class OnnxClassifier:
+    """ONNX Runtime session over an exported (optionally int8-quantized) copy of the model."""
+
+    def __init__(self, model_name: str = EMOTION_MODEL, quantize: bool = False,
+                 max_length: int = EMOTION_MAX_LENGTH, threads: int = EMOTION_THREADS,
+                 cache_dir: str = EMOTION_ONNX_DIR):
+        import onnxruntime as ort
+        from transformers import AutoConfig, AutoTokenizer
+
+        self.name = "onnx-int8" if quantize else "onnx"
+        self.max_length = max_length
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.id2label = AutoConfig.from_pretrained(model_name).id2label
+
+        model_dir = os.path.join(cache_dir, model_name.replace("/", "__"))
+        fp32_path = os.path.join(model_dir, "model.onnx")
+        if not os.path.exists(fp32_path):
+            export_onnx(model_name, fp32_path)
+        path = fp32_path
+        if quantize:
+            path = os.path.join(model_dir, "model.int8.onnx")
+            if not os.path.exists(path):
+                quantize_onnx(fp32_path, path)
+
+        options = ort.SessionOptions()
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def __call__(self, texts: Union[str, List[str]], batch_size: int = 32, **kwargs) -> List[Prediction]:
+        batch = [texts] if isinstance(texts, str) else list(texts)
+        predictions: List[Prediction] = []
+        for start in range(0, len(batch), batch_size):
+            encoded = self.tokenizer(
+                batch[start:start + batch_size], padding=True, truncation=True,
+                max_length=self.max_length, return_tensors="np",
+            )
+            feeds = {k: v.astype(np.int64) for k, v in encoded.items() if k in self.input_names}
+            logits = self.session.run(None, feeds)[0]
+            probs = np.exp(logits - logits.max(axis=1, keepdims=True))
+            probs /= probs.sum(axis=1, keepdims=True)
+            for row in probs:
+                idx = int(row.argmax())
+                predictions.append({"label": self.id2label[idx], "score": float(row[idx])})
+        return predictions
+
+
+def export_onnx(model_name: str, path: str) -> None:
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    print(f"📦 Exporting {model_name} to ONNX at {path}")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name).eval()
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    names = list(sample.keys())
+    axes = {n: {0: "batch", 1: "sequence"} for n in names}
+    axes["logits"] = {0: "batch"}
+    with torch.no_grad():
+        torch.onnx.export(
+            model, tuple(sample[n] for n in names), path,
+            input_names=names, output_names=["logits"], dynamic_axes=axes,
+            opset_version=17, dynamo=False,
+        )
+
+
+def quantize_onnx(src: str, dst: str) -> None:
+    try:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+    except ImportError as e:
+        raise RuntimeError("int8 quantization needs the `onnx` package (pip install onnx)") from e
+    print(f"📦 Quantizing {src} to dynamic int8")
+    quantize_dynamic(src, dst, weight_type=QuantType.QInt8)
+
+
+# --------------------------- Parity gate ---------------------------
+def load_parity_sample(path: str = EMOTION_PARITY_SAMPLE) -> List[Dict[str, str]]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def parity_report(candidate, reference, sample: List[Dict[str, str]]) -> Dict[str, float]:
+    """Label agreement with the fp32 reference, plus each side's accuracy on the gold labels."""
+    texts = [row["text"] for row in sample]
+    gold = [row["label"] for row in sample]
+    cand = [p["label"] for p in candidate(texts)]
+    ref = [p["label"] for p in reference(texts)]
+    n = max(len(sample), 1)
+    return {
+        "agreement": sum(c == r for c, r in zip(cand, ref)) / n,
+        "candidate_accuracy": sum(c == g for c, g in zip(cand, gold)) / n,
+        "reference_accuracy": sum(r == g for r, g in zip(ref, gold)) / n,
+    }
+
+
+def load_emotion_classifier(backend: str = EMOTION_BACKEND, model_name: str = EMOTION_MODEL,
+                            threshold: float = EMOTION_PARITY_THRESHOLD,
+                            parity_check: bool = EMOTION_PARITY_CHECK):
+    """Build the configured backend; refuse (fall back to torch fp32) if it fails the parity gate."""
+    if backend not in BACKENDS:
+        print(f"⚠️ Unknown EMOTION_BACKEND '{backend}', using torch")
+        backend = "torch"
+
+    if backend == "torch":
+        print("✅ Emotion classifier: torch fp32")
+        return TorchClassifier(model_name)
+
+    # The fp32 reference is only built when the parity gate or a fallback needs it
+    try:
+        candidate = OnnxClassifier(model_name, quantize=(backend == "onnx-int8"))
+    except Exception as e:
+        print(f"❌ Could not load emotion backend {backend}: {e}; using torch fp32")
+        return TorchClassifier(model_name)
+
+    if parity_check:
+        reference = TorchClassifier(model_name)
+        try:
+            report = parity_report(candidate, reference, load_parity_sample())
+        except Exception as e:
+            print(f"❌ Parity check for {backend} failed to run: {e}; using torch fp32")
+            return reference
+        print(f"📊 Emotion parity {backend} vs torch: {report}")
+        if report["agreement"] < threshold:
+            print(f"❌ {backend} agreement {report['agreement']:.3f} < {threshold}; refusing, using torch fp32")
+            return reference
+        del reference  # only the candidate is served
+
+    print(f"✅ Emotion classifier: {backend}")
+    return candidate
+
+
+def model_version(classifier) -> str:
+    """Identifies model + backend, e.g. for cache keys."""
+    return f"{EMOTION_MODEL}:{getattr(classifier, 'name', 'torch')}:{EMOTION_MAX_LENGTH}"
@@ -1,10 +1,36 @@
-from transformers import pipeline
-import spacy
-from typing import List, Dict
+import json
+import os
+from typing import List, Dict, Optional
 
-# Load models
-emotion_pipeline = pipeline("text-classification", model="nateraw/bert-base-uncased-emotion")
-nlp = spacy.load("en_core_web_sm")
+from app.services.emotion_backend import EMOTION_BACKEND, EMOTION_MAX_LENGTH, load_emotion_classifier, model_version
+from app.services.inference_client import INFERENCE_SOCKET, RemoteClassifier, inference_client
+from app.services.result_cache import ResultCache, content_key
+
+# Load models (backend picked by EMOTION_BACKEND; see emotion_backend.py), or use the
+# inference sidecar when INFERENCE_SOCKET is set (see inference_server.py)
+if INFERENCE_SOCKET:
+    emotion_pipeline = RemoteClassifier(EMOTION_BACKEND)
+    nlp = None
+else:
+    import spacy
+
+    emotion_pipeline = load_emotion_classifier()
+    # Only sentence boundaries are needed, so a rule-based sentencizer replaces the full en_core_web_sm parse
+    nlp = spacy.blank("en")
+    nlp.add_pipe("sentencizer")
+EMOTION_MODEL_VERSION = model_version(emotion_pipeline)
+
+# Entries longer than this (in words) exceed the classifier's input and are scored sentence by sentence
+LONG_ENTRY_WORDS = EMOTION_MAX_LENGTH // 2
+
+# Result cache for repeated texts (client retries, re-analysis of drafts); 0 disables
+EMOTION_CACHE_SIZE = int(os.getenv("EMOTION_CACHE_SIZE", "4096"))
+EMOTION_CACHE_TTL_S = float(os.getenv("EMOTION_CACHE_TTL_S", "3600"))
+EMOTION_CACHE_WARMUP = os.getenv(
+    "EMOTION_CACHE_WARMUP", os.path.join(os.path.dirname(__file__), "..", "config", "emotion_cache_warmup.json")
+)
+analyze_cache = ResultCache("analyze_emotion", EMOTION_CACHE_SIZE, EMOTION_CACHE_TTL_S)
+detect_cache = ResultCache("detect_mood", EMOTION_CACHE_SIZE, EMOTION_CACHE_TTL_S)
 
 
 # Keywords for tag extraction
@@ -94,6 +120,12 @@ context_keywords = {
 # --------- MAIN FUNCTIONS --------- #
 
 def analyze_emotion(text: str) -> Dict:
+    return analyze_cache.get_or_compute(
+        content_key(text, EMOTION_MODEL_VERSION), lambda: _analyze_emotion(text)
+    )
+
+
+def _analyze_emotion(text: str) -> Dict:
     result = emotion_pipeline(text)[0]
     return {
         "label": result["label"],
@@ -101,6 +133,14 @@ def analyze_emotion(text: str) -> Dict:
     }
 
 
+def analyze_emotions(texts: List[str], batch_size: int = 32) -> List[Dict]:
+    """Batched analyze_emotion: one pipeline call for many texts."""
+    if not texts:
+        return []
+    results = emotion_pipeline(texts, batch_size=batch_size)
+    return [{"label": r["label"], "score": round(r["score"], 4)} for r in results]
+
+
 def detect_event_categories(text: str) -> List[str]:
     tags = []
     lowered = text.lower()
@@ -121,11 +161,36 @@ def extract_time(text: str) -> str:
     return "unknown"
 
 
-def extract_life_events(text: str) -> List[Dict]:
-    doc = nlp(text)
+def split_sentences(text: str) -> List[str]:
+    if nlp is None:
+        return inference_client().sentences(text)
+    return [s.text.strip() for s in nlp(text).sents if s.text.strip()]
+
+
+def emotion_timeline(sentences: List[str]) -> List[Dict]:
+    """Per-sentence emotion, classified in a single batched call."""
+    predictions = analyze_emotions(sentences)
+    return [
+        {"index": i, "sentence": sentence, "label": p["label"], "score": p["score"]}
+        for i, (sentence, p) in enumerate(zip(sentences, predictions))
+    ]
+
+
+def aggregate_timeline(timeline: List[Dict]) -> Dict:
+    """Overall mood = label with the most length-weighted confidence across sentences."""
+    weights: Dict[str, float] = {}
+    total = 0.0
+    for item in timeline:
+        weight = len(item["sentence"])
+        weights[item["label"]] = weights.get(item["label"], 0.0) + weight * item["score"]
+        total += weight
+    label = max(weights, key=weights.get)
+    return {"label": label, "score": round(weights[label] / total, 4) if total else 0.0}
+
+
+def extract_life_events(text: str, sentences: Optional[List[str]] = None) -> List[Dict]:
     events = []
-    for sent in doc.sents:
-        sentence_text = sent.text.strip()
+    for sentence_text in (sentences if sentences is not None else split_sentences(text)):
         categories = detect_event_categories(sentence_text)
         if categories:
             for category in categories:
@@ -172,29 +237,47 @@ def generate_summary(text: str) -> str:
     return "Reflecting on a personal memory."
 
 
+# Replay-opportunity rules (also applied, vectorized, by replay_candidates.score_moods)
+REPLAY_BASE_SCORE = 0.4
+REPLAY_MOOD_WEIGHTS = {"sadness": 0.2, "regret": 0.2, "nostalgic": 0.1, "reflective": 0.1}
+REPLAY_EVENT_WEIGHTS = {"missed_event": 0.2, "special_day": 0.1}
+REPLAY_RELATIONSHIP_TAGS = {"friend", "birthday", "daughter", "son", "wife", "partner", "mom", "dad"}
+REPLAY_RELATIONSHIP_WEIGHT = 0.1
+
+
 def generate_replay_opportunity_score(memory: dict) -> float:
-    score = 0.4
-    mood = memory.get("mood", "").lower()
-    if mood in ["sadness", "regret"]: score += 0.2
-    elif mood in ["nostalgic", "reflective"]: score += 0.1
+    score = REPLAY_BASE_SCORE
+    score += REPLAY_MOOD_WEIGHTS.get((memory.get("mood") or "").lower(), 0.0)
 
-    events = memory.get("events", [])
-    if "missed_event" in events: score += 0.2
-    if "special_day" in events: score += 0.1
+    events = memory.get("events") or []
+    score += sum(w for event, w in REPLAY_EVENT_WEIGHTS.items() if event in events)
 
-    tags = memory.get("context_tags", [])
-    relationship_tags = {"friend", "birthday", "daughter", "son", "wife", "partner", "mom", "dad"}
-    if any(tag in tags for tag in relationship_tags): score += 0.1
+    tags = memory.get("context_tags") or []
+    if any(tag in tags for tag in REPLAY_RELATIONSHIP_TAGS): score += REPLAY_RELATIONSHIP_WEIGHT
 
     return round(min(score, 1.0), 2)
 
 
-def detect_mood_and_events(text: str) -> Dict:
-    emotion_result = analyze_emotion(text)
+def detect_mood_and_events(text: str, include_timeline: bool = False) -> Dict:
+    return detect_cache.get_or_compute(
+        content_key(text, EMOTION_MODEL_VERSION, include_timeline),
+        lambda: _detect_mood_and_events(text, include_timeline),
+    )
+
+
+def _detect_mood_and_events(text: str, include_timeline: bool) -> Dict:
+    sentences = split_sentences(text)
+    timeline = None
+    if (include_timeline or len(text.split()) > LONG_ENTRY_WORDS) and len(sentences) > 1:
+        # Long entries are scored in full, sentence by sentence, instead of being truncated
+        timeline = emotion_timeline(sentences)
+        emotion_result = aggregate_timeline(timeline)
+    else:
+        emotion_result = analyze_emotion(text)
     mood = emotion_result["label"]
     confidence = emotion_result["score"]
 
-    events = extract_life_events(text)
+    events = extract_life_events(text, sentences)
     event_types = list({e["category"] for e in events})
 
     context_tags = extract_context_tags(text)
@@ -209,7 +292,7 @@ def detect_mood_and_events(text: str) -> Dict:
 
     replay_opportunity_score = generate_replay_opportunity_score(memory_data)
 
-    return {
+    result = {
         "emotion": mood,
         "confidence": confidence,
         "summary": summary,
@@ -217,3 +300,20 @@ def detect_mood_and_events(text: str) -> Dict:
         "replay_opportunity_score": replay_opportunity_score,
         "detectedEvents": events
     }
+    if include_timeline:
+        result["timeline"] = timeline if timeline is not None else [
+            {"index": 0, "sentence": text.strip(), "label": mood, "score": confidence}
+        ]
+    return result
+
+
+def warm_up_cache(path: str = EMOTION_CACHE_WARMUP) -> int:
+    """Pre-compute results for the most common phrases (a JSON list of strings)."""
+    if not path or EMOTION_CACHE_SIZE <= 0 or not os.path.exists(path):
+        return 0
+    with open(path, encoding="utf-8") as f:
+        phrases = [p for p in json.load(f) if isinstance(p, str) and p.strip()]
+    for phrase in phrases:
+        analyze_emotion(phrase)
+        detect_mood_and_events(phrase)
+    return len(phrases)
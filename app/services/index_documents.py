@@ -0,0 +1,101 @@
+# app/services/index_documents.py
+"""
+Mongo mood/replay documents -> LlamaIndex Documents.
+Kept free of model/vector-store imports so worker processes (reindex) can use it.
+"""
+from typing import Any, List, Optional
+from llama_index.core.schema import Document
+
+from datetime import datetime, timezone
+
+# Numeric copy of create_date for range filters (retention); kept out of embeddings and prompts
+CREATED_TS_KEY = "created_ts"
+
+
+def created_ts(create_date: Any) -> Optional[int]:
+    """Epoch seconds for a Mongo create_date (naive datetimes are UTC)."""
+    if not isinstance(create_date, datetime):
+        return None
+    if create_date.tzinfo is None:
+        create_date = create_date.replace(tzinfo=timezone.utc)
+    return int(create_date.timestamp())
+
+
+def _with_created_ts(doc: Document, create_date: Any) -> Document:
+    ts = created_ts(create_date)
+    if ts is not None:
+        doc.metadata[CREATED_TS_KEY] = ts
+        doc.excluded_embed_metadata_keys.append(CREATED_TS_KEY)
+        doc.excluded_llm_metadata_keys.append(CREATED_TS_KEY)
+    return doc
+
+
+def format_for_indexing(user_id: str, moods: list, replays: list) -> List[Document]:
+    """
+    Convert moods and replays into LlamaIndex-compatible Document objects.
+    """
+    documents = []
+
+    for mood in moods:
+        try:
+            location_str = None
+            if mood.get("latitude") and mood.get("longitude"):
+                location_str = f"{mood['latitude']},{mood['longitude']}"
+
+            # Safely format date
+            create_date = mood.get("create_date")
+            formatted_date = create_date.isoformat() if isinstance(create_date, datetime) else str(create_date)
+
+            # Flatten context_tags list to comma-separated string
+            context_tags = mood.get("context_tags", [])
+            context_tag_str = ", ".join(context_tags) if isinstance(context_tags, list) else str(context_tags)
+
+            doc = Document(
+                id_=f"mood-{mood.get('_id')}",
+                text=mood.get("user_text", ""),
+                metadata={
+                    "type": "mood",
+                    "user_id": user_id,
+                    "mood": mood.get("mood"),
+                    "ai_response": mood.get("ai_response", ""),
+                    "location": location_str,
+                    "date": formatted_date,
+                    "context_tags": context_tag_str,
+                    "replay_opportunity_score": mood.get("replay_opportunity_score"),
+                    "source_id": str(mood.get("_id")),
+                }
+            )
+            documents.append(_with_created_ts(doc, create_date))
+        except Exception as e:
+            print(f"⚠️ Failed to format mood document: {e}")
+
+    for replay in replays:
+        try:
+            # Safely format date
+            create_date = replay.get("create_date")
+            formatted_date = create_date.isoformat() if isinstance(create_date, datetime) else str(create_date)
+
+            # Flatten context_tags list to comma-separated string
+            context_tags = replay.get("context_tags", [])
+            context_tag_str = ", ".join(context_tags) if isinstance(context_tags, list) else str(context_tags)
+
+            doc = Document(
+                id_=f"replay-{replay.get('_id')}",
+                text=replay.get("gem_response", ""),
+                metadata={
+                    "type": "replay",
+                    "user_id": user_id,
+                    "user_response": replay.get("user_response", ""),
+                    "location": replay.get("location", None),
+                    "date": formatted_date,
+                    "context_tags": context_tag_str,
+                    "replay_opportunity_score": replay.get("replay_opportunity_score"),
+                    "mood_ref_id": str(replay.get("moods")),
+                    "source_id": str(replay.get("_id")),
+                }
+            )
+            documents.append(_with_created_ts(doc, create_date))
+        except Exception as e:
+            print(f"⚠️ Failed to format replay document: {e}")
+
+    return documents
@@ -1,81 +1,12 @@
 # app/services/indexing_service.py
 
+import asyncio
 from typing import List
+from llama_index.core.ingestion import run_transformations
 from llama_index.core.schema import Document
+from llama_index.core.settings import Settings
 from app.db.llama_index_client import index  # Ensure llama_index_client.py exports 'index'
-
-from datetime import datetime
-
-
-def format_for_indexing(user_id: str, moods: list, replays: list) -> List[Document]:
-    """
-    Convert moods and replays into LlamaIndex-compatible Document objects.
-    """
-    documents = []
-
-    for mood in moods:
-        try:
-            location_str = None
-            if mood.get("latitude") and mood.get("longitude"):
-                location_str = f"{mood['latitude']},{mood['longitude']}"
-
-            # Safely format date
-            create_date = mood.get("create_date")
-            formatted_date = create_date.isoformat() if isinstance(create_date, datetime) else str(create_date)
-
-            # Flatten context_tags list to comma-separated string
-            context_tags = mood.get("context_tags", [])
-            context_tag_str = ", ".join(context_tags) if isinstance(context_tags, list) else str(context_tags)
-
-            doc = Document(
-                text=mood.get("user_text", ""),
-                metadata={
-                    "type": "mood",
-                    "user_id": user_id,
-                    "mood": mood.get("mood"),
-                    "ai_response": mood.get("ai_response", ""),
-                    "location": location_str,
-                    "date": formatted_date,
-                    "context_tags": context_tag_str,
-                    "replay_opportunity_score": mood.get("replay_opportunity_score"),
-                    "source_id": str(mood.get("_id")),
-                }
-            )
-            documents.append(doc)
-        except Exception as e:
-            print(f"⚠️ Failed to format mood document: {e}")
-
-    for replay in replays:
-        try:
-            # Safely format date
-            create_date = replay.get("create_date")
-            formatted_date = create_date.isoformat() if isinstance(create_date, datetime) else str(create_date)
-
-            # Flatten context_tags list to comma-separated string
-            context_tags = replay.get("context_tags", [])
-            context_tag_str = ", ".join(context_tags) if isinstance(context_tags, list) else str(context_tags)
-
-            doc = Document(
-                text=replay.get("gem_response", ""),
-                metadata={
-                    "type": "replay",
-                    "user_id": user_id,
-                    "user_response": replay.get("user_response", ""),
-                    "location": replay.get("location", None),
-                    "date": formatted_date,
-                    "context_tags": context_tag_str,
-                    "replay_opportunity_score": replay.get("replay_opportunity_score"),
-                    "mood_ref_id": str(replay.get("moods")),
-                    "source_id": str(replay.get("_id")),
-                }
-            )
-            documents.append(doc)
-        except Exception as e:
-            print(f"⚠️ Failed to format replay document: {e}")
-
-    return documents
-
-
+from app.services.index_documents import format_for_indexing  # re-exported for existing callers
 
 
 async def index_user_data(user_id: str, moods: list, replays: list):
@@ -98,3 +29,28 @@ async def index_user_data(user_id: str, moods: list, replays: list):
     except Exception as e:
         print(f"❌ Failed to index user data: {e}")
         raise e
+
+
+def insert_documents_batched(docs: List[Document]) -> int:
+    """
+    Insert many new documents with one transformation pass, batched embedding
+    and a single vector-store add (instead of refresh_ref_docs' per-doc inserts).
+    """
+    nodes = run_transformations(docs, Settings.transformations)
+    index.insert_nodes(nodes)
+    for doc in docs:
+        index.docstore.set_document_hash(doc.get_doc_id(), doc.hash)
+    return len(nodes)
+
+
+async def bulk_index_user_data(user_id: str, moods: list, replays: list) -> int:
+    """
+    Bulk variant of index_user_data for freshly inserted documents.
+    Returns the number of documents indexed.
+    """
+    docs = format_for_indexing(user_id, moods, replays)
+    if not docs:
+        return 0
+    await asyncio.to_thread(insert_documents_batched, docs)
+    print(f"✅ Bulk indexed {len(docs)} documents for user {user_id}")
+    return len(docs)
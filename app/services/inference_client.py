@@ -0,0 +1,228 @@
+# app/services/inference_client.py
+"""
+Thin-client side of the inference sidecar (app.services.inference_server).
+
+With INFERENCE_SOCKET set, API workers load no models: the emotion classifier,
+the index embedder and the spaCy sentencizer run in the sidecar and are
+reached over a Unix socket. INFERENCE_SOCKET may list several sockets
+(comma-separated) for a pool of sidecars; each thread keeps one persistent
+connection, spread round-robin over the pool.
+
+Wire format, both directions: 4-byte big-endian length + orjson header.
+Embedding matrices don't travel over the socket: the server writes them into
+a per-connection shared-memory block and the header names the block, shape
+and dtype. The client copies them out before sending its next request.
+
+INFERENCE_SOCKET=/run/rewind/inference.sock  INFERENCE_TIMEOUT_S=30
+"""
+import itertools
+import os
+import socket
+import struct
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import orjson
+
+from app.services.metrics import registry
+
+INFERENCE_SOCKET = os.getenv("INFERENCE_SOCKET", "")
+INFERENCE_TIMEOUT_S = float(os.getenv("INFERENCE_TIMEOUT_S", "30"))
+
+RPC_LATENCY = registry.histogram(
+    "rewind_inference_rpc_seconds", "Inference sidecar round trips", ("op",))
+
+_HEADER = struct.Struct(">I")
+MAX_FRAME = 64 * 1024 * 1024
+
+
+class InferenceError(RuntimeError):
+    pass
+
+
+# ------------------------------ Framing ------------------------------
+def encode_frame(message: Dict) -> bytes:
+    body = orjson.dumps(message, option=orjson.OPT_SERIALIZE_NUMPY)
+    return _HEADER.pack(len(body)) + body
+
+
+def decode_length(prefix: bytes) -> int:
+    (length,) = _HEADER.unpack(prefix)
+    if length > MAX_FRAME:
+        raise InferenceError(f"Frame of {length} bytes exceeds the {MAX_FRAME} byte limit")
+    return length
+
+
+def _recv_exactly(sock: socket.socket, n: int) -> bytes:
+    chunks, remaining = [], n
+    while remaining:
+        chunk = sock.recv(min(remaining, 1 << 20))
+        if not chunk:
+            raise ConnectionError("inference sidecar closed the connection")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """Attach without registering with this process's resource tracker (the server owns the block)."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        return shm
+
+
+# ------------------------------ Client ------------------------------
+class _Connection:
+    def __init__(self, path: str, timeout_s: float):
+        self.path = path
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout_s)
+        self.sock.connect(path)
+        self.shm: Optional[shared_memory.SharedMemory] = None
+
+    def call(self, message: Dict) -> Tuple[Dict, Optional[np.ndarray]]:
+        self.sock.sendall(encode_frame(message))
+        reply = orjson.loads(_recv_exactly(self.sock, decode_length(_recv_exactly(self.sock, _HEADER.size))))
+        if "error" in reply:
+            raise InferenceError(reply["error"])
+        array = None
+        if "shm" in reply:
+            if self.shm is None or self.shm.name != reply["shm"]:
+                if self.shm is not None:
+                    self.shm.close()
+                self.shm = attach_shared_memory(reply["shm"])
+            shape, dtype = tuple(reply["shape"]), np.dtype(reply["dtype"])
+            # Copy out: the block is reused for this connection's next reply
+            array = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf).copy()
+        return reply, array
+
+    def close(self) -> None:
+        if self.shm is not None:
+            self.shm.close()
+            self.shm = None
+        self.sock.close()
+
+
+class InferenceClient:
+    def __init__(self, sockets: Union[str, List[str]] = INFERENCE_SOCKET, timeout_s: float = INFERENCE_TIMEOUT_S):
+        self.paths = [p.strip() for p in sockets.split(",") if p.strip()] if isinstance(sockets, str) else list(sockets)
+        if not self.paths:
+            raise InferenceError("No inference sidecar socket configured (INFERENCE_SOCKET)")
+        self.timeout_s = timeout_s
+        self._local = threading.local()
+        self._next = itertools.count()
+
+    def _connection(self) -> _Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            path = self.paths[next(self._next) % len(self.paths)]
+            conn = self._local.conn = _Connection(path, self.timeout_s)
+        return conn
+
+    def _drop(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def call(self, op: str, **payload: Any) -> Tuple[Dict, Optional[np.ndarray]]:
+        started = time.perf_counter()
+        try:
+            for attempt in (1, 2):
+                try:
+                    return self._connection().call({"op": op, **payload})
+                except socket.timeout as e:
+                    # The reply may still arrive later; never reuse this connection, never resend
+                    self._drop()
+                    raise InferenceError(f"inference sidecar timed out after {self.timeout_s:g}s") from e
+                except (ConnectionError, OSError) as e:
+                    # Stale connection (sidecar restarted): reconnect once
+                    self._drop()
+                    if attempt == 2:
+                        raise InferenceError(f"inference sidecar unreachable: {e}") from e
+                except InferenceError:
+                    raise
+                except Exception:
+                    self._drop()
+                    raise
+        finally:
+            RPC_LATENCY.observe(time.perf_counter() - started, op=op)
+
+    def classify(self, texts: List[str]) -> List[Dict]:
+        return self.call("classify", texts=texts)[0]["predictions"]
+
+    def embed(self, texts: List[str], kind: str = "text") -> np.ndarray:
+        return self.call("embed", texts=texts, kind=kind)[1]
+
+    def sentences(self, text: str) -> List[str]:
+        return self.call("sentences", text=text)[0]["sentences"]
+
+    def ping(self) -> Dict:
+        return self.call("ping")[0]
+
+
+_client: Optional[InferenceClient] = None
+_client_lock = threading.Lock()
+
+
+def inference_client() -> InferenceClient:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = InferenceClient()
+    return _client
+
+
+# ------------------------ Drop-in model adapters ------------------------
+class RemoteClassifier:
+    """Same call signature as emotion_backend's classifiers; runs in the sidecar."""
+
+    def __init__(self, backend: str):
+        self.name = backend  # the sidecar runs EMOTION_BACKEND from the shared environment
+
+    def __call__(self, texts: Union[str, List[str]], batch_size: int = 32, **kwargs) -> List[Dict]:
+        batch = [texts] if isinstance(texts, str) else list(texts)
+        if not batch:
+            return []
+        return inference_client().classify(batch)
+
+
+def remote_embedding(model_name: str):
+    """llama_index embedding model whose vectors come from the sidecar."""
+    from llama_index.core.base.embeddings.base import BaseEmbedding
+
+    class RemoteEmbedding(BaseEmbedding):
+        def _embed(self, texts: List[str], prompt_name: Optional[str] = None) -> List[List[float]]:
+            # Same entry point query_embedding's batcher uses on HuggingFaceEmbedding
+            kind = "query" if prompt_name == "query" else "text"
+            return inference_client().embed(list(texts), kind=kind).tolist()
+
+        def _get_query_embedding(self, query: str) -> List[float]:
+            return self._embed([query], prompt_name="query")[0]
+
+        def _get_text_embedding(self, text: str) -> List[float]:
+            return self._embed([text])[0]
+
+        def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+            return self._embed(texts) if texts else []
+
+        async def _aget_query_embedding(self, query: str) -> List[float]:
+            import asyncio
+            return await asyncio.to_thread(self._get_query_embedding, query)
+
+        async def _aget_text_embedding(self, text: str) -> List[float]:
+            import asyncio
+            return await asyncio.to_thread(self._get_text_embedding, text)
+
+    return RemoteEmbedding(model_name=model_name, embed_batch_size=64)
@@ -0,0 +1,208 @@
+# app/services/inference_server.py
+"""
+Inference sidecar: one process hosting the emotion classifier, the index
+embedder and the spaCy sentencizer for every API worker on the host.
+
+    python -m app.services.inference_server --socket /run/rewind/inference.sock
+    INFERENCE_SOCKET=/run/rewind/inference.sock uvicorn app.main:app --workers 8
+
+For a small pool, start several sidecars on different sockets and list them
+all in INFERENCE_SOCKET (comma-separated).
+
+Requests from all connections are micro-batched per model (up to
+INFERENCE_MAX_BATCH texts, waiting at most INFERENCE_MAX_WAIT_MS for more), and
+each model runs on its own inference thread. Embeddings are returned through
+a shared-memory block owned by the connection (see inference_client).
+
+INFERENCE_MAX_BATCH=64  INFERENCE_MAX_WAIT_MS=2
+"""
+import argparse
+import asyncio
+import os
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import orjson
+
+from app.services.inference_client import INFERENCE_SOCKET, _HEADER, InferenceError, decode_length, encode_frame
+
+INFERENCE_MAX_BATCH = int(os.getenv("INFERENCE_MAX_BATCH", "64"))
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "2"))
+
+
+class MicroBatcher:
+    """Coalesces concurrent requests (each a list of texts) into one model call."""
+
+    def __init__(self, fn: Callable[[List[str]], Any], max_batch: int = INFERENCE_MAX_BATCH,
+                 max_wait_ms: float = INFERENCE_MAX_WAIT_MS):
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait_s = max_wait_ms / 1000.0
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.queue: "asyncio.Queue[Tuple[List[str], asyncio.Future]]" = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    async def submit(self, texts: List[str]) -> List[Any]:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((texts, future))
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self.queue.get()]
+            size = len(items[0][0])
+            deadline = loop.time() + self.max_wait_s
+            while size < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                items.append(item)
+                size += len(item[0])
+
+            texts = [t for batch, _ in items for t in batch]
+            try:
+                results = await loop.run_in_executor(self.executor, self.fn, texts)
+            except Exception as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            offset = 0
+            for batch, future in items:
+                if not future.done():
+                    future.set_result(results[offset:offset + len(batch)])
+                offset += len(batch)
+
+
+class Models:
+    def __init__(self):
+        import spacy
+        from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+
+        from app.db.vector_store_config import INDEX_EMBED_MODEL
+        from app.services.emotion_backend import load_emotion_classifier, model_version
+
+        self.classifier = load_emotion_classifier()
+        self.emotion_model_version = model_version(self.classifier)
+        self.embed_model_name = INDEX_EMBED_MODEL
+        self.embedder = HuggingFaceEmbedding(model_name=INDEX_EMBED_MODEL)
+        self.nlp = spacy.blank("en")
+        self.nlp.add_pipe("sentencizer")
+
+        self.classify = MicroBatcher(lambda texts: self.classifier(texts, batch_size=INFERENCE_MAX_BATCH))
+        self.embed_query = MicroBatcher(lambda texts: np.asarray(
+            self.embedder._embed(texts, prompt_name="query"), dtype=np.float32))
+        self.embed_text = MicroBatcher(lambda texts: np.asarray(
+            self.embedder._get_text_embeddings(texts), dtype=np.float32))
+
+    def sentences(self, text: str) -> List[str]:
+        return [s.text.strip() for s in self.nlp(text).sents if s.text.strip()]
+
+
+class Connection:
+    """One client connection and the shared-memory block its embedding replies go through."""
+
+    def __init__(self, models: Models, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.models = models
+        self.reader = reader
+        self.writer = writer
+        self.shm: Optional[shared_memory.SharedMemory] = None
+
+    def _share(self, array: np.ndarray) -> Dict:
+        if self.shm is None or self.shm.size < array.nbytes:
+            self._release()
+            self.shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1 << 20))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=self.shm.buf)[...] = array
+        return {"shm": self.shm.name, "shape": list(array.shape), "dtype": str(array.dtype)}
+
+    def _release(self) -> None:
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    async def handle(self, request: Dict) -> Dict:
+        op = request.get("op")
+        if op == "classify":
+            return {"predictions": await self.models.classify.submit(list(request["texts"]))}
+        if op == "embed":
+            batcher = self.models.embed_query if request.get("kind") == "query" else self.models.embed_text
+            texts = list(request["texts"])
+            vectors = await batcher.submit(texts) if texts else np.zeros((0, 0), dtype=np.float32)
+            return self._share(np.ascontiguousarray(vectors, dtype=np.float32))
+        if op == "sentences":
+            return {"sentences": await asyncio.to_thread(self.models.sentences, request["text"])}
+        if op == "ping":
+            return {"pid": os.getpid(), "emotion_model": self.models.emotion_model_version,
+                    "embed_model": self.models.embed_model_name}
+        raise InferenceError(f"unknown op {op!r}")
+
+    async def serve(self) -> None:
+        try:
+            while True:
+                try:
+                    prefix = await self.reader.readexactly(_HEADER.size)
+                except asyncio.IncompleteReadError:
+                    return  # client went away
+                request = orjson.loads(await self.reader.readexactly(decode_length(prefix)))
+                try:
+                    reply = await self.handle(request)
+                except Exception as e:
+                    reply = {"error": f"{type(e).__name__}: {e}"}
+                self.writer.write(encode_frame(reply))
+                await self.writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            print(f"❌ Inference connection failed: {e}")
+        finally:
+            self._release()
+            self.writer.close()
+
+
+async def serve(path: str) -> None:
+    print("📦 Loading models for the inference sidecar...")
+    models = await asyncio.to_thread(Models)
+    if os.path.exists(path):
+        os.unlink(path)  # stale socket from a previous run
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    server = await asyncio.start_unix_server(
+        lambda r, w: Connection(models, r, w).serve(), path=path)
+    os.chmod(path, 0o660)
+    print(f"✅ Inference sidecar serving on {path} (pid {os.getpid()})")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    async with server:
+        await stop.wait()
+    if os.path.exists(path):
+        os.unlink(path)
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Serve the emotion classifier, embedder and sentencizer over a Unix socket")
+    p.add_argument("--socket", default=(INFERENCE_SOCKET.split(",")[0].strip() or "/tmp/rewind-inference.sock"))
+    return p.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    asyncio.run(serve(args.socket))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
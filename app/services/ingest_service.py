@@ -0,0 +1,224 @@
+# app/services/ingest_service.py
+"""
+Bulk NDJSON import of historical moods (migrations from other journaling apps).
+
+Per chunk of lines:
+  parse + validate -> batched emotion/tag enrichment -> insert_many
+  -> one batched embedding + vector-store insert.
+Replay generation (batched LLM calls, see build_replays_batched) is optional: inline per chunk,
+deferred to a background task after the import, or skipped.
+"""
+import asyncio
+import time
+from typing import AsyncIterator, Dict, List, Literal, Tuple
+
+import orjson
+from bson import ObjectId
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+
+from app.db.geo import with_geo
+from app.db.mongo_client import db
+from app.models.schemas import BulkMoodEntry
+from app.services.emotion_service import (
+    analyze_emotions, detect_event_categories, extract_context_tags, generate_replay_opportunity_score,
+)
+from app.services.indexing_service import bulk_index_user_data
+from app.services.metrics import stage
+from app.services.mood_analytics import record_moods, record_replays
+from app.services.replay_candidates import upsert_candidates
+from app.services.replay_service import REPLAY_BATCH_SIZE, build_replays_batched, replay_document_for
+
+ReplayMode = Literal["none", "inline", "deferred"]
+
+MAX_REPORTED_ERRORS = 20
+REPLAY_CONCURRENCY = 4
+
+
+async def iter_ndjson_chunks(stream: AsyncIterator[bytes], chunk_size: int) -> AsyncIterator[List[Tuple[int, bytes]]]:
+    """Yield lists of (line_no, raw_line) without buffering the whole body."""
+    buffer = b""
+    line_no = 0
+    chunk: List[Tuple[int, bytes]] = []
+    async for block in stream:
+        buffer += block
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_no += 1
+            if line.strip():
+                chunk.append((line_no, line))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if buffer.strip():
+        chunk.append((line_no + 1, buffer))
+    if chunk:
+        yield chunk
+
+
+def parse_chunk(lines: List[Tuple[int, bytes]]) -> Tuple[List[BulkMoodEntry], List[Dict]]:
+    entries: List[BulkMoodEntry] = []
+    errors: List[Dict] = []
+    for line_no, raw in lines:
+        try:
+            entries.append(BulkMoodEntry.model_validate(orjson.loads(raw)))
+        except (orjson.JSONDecodeError, ValidationError) as e:
+            errors.append({"line": line_no, "error": str(e).splitlines()[0]})
+    return entries, errors
+
+
+def enrich_chunk(entries: List[BulkMoodEntry], user_id: ObjectId) -> List[Dict]:
+    """Fill in mood/events/tags/score; the classifier runs once for the whole chunk."""
+    needs_mood = [i for i, e in enumerate(entries) if not e.mood]
+    emotions = analyze_emotions([entries[i].user_text for i in needs_mood])
+    moods_by_index = {i: emo["label"] for i, emo in zip(needs_mood, emotions)}
+
+    docs = []
+    for i, entry in enumerate(entries):
+        doc = entry.model_dump()
+        doc["user"] = user_id
+        doc["mood"] = entry.mood or moods_by_index[i]
+        if doc["events"] is None:
+            doc["events"] = detect_event_categories(entry.user_text)
+        if doc["context_tags"] is None:
+            doc["context_tags"] = extract_context_tags(entry.user_text)
+        if doc["replay_opportunity_score"] is None:
+            doc["replay_opportunity_score"] = str(generate_replay_opportunity_score(doc))
+        docs.append(with_geo(doc))
+    return docs
+
+
+async def insert_moods(moods: List[Dict]) -> Tuple[List[Dict], List[str]]:
+    """insert_many past bad rows; returns (persisted moods, one message per rejected row)."""
+    try:
+        result = await db.moods.insert_many(moods, ordered=False)
+    except BulkWriteError as e:
+        rejected = {err["index"]: err.get("errmsg", "write error") for err in e.details.get("writeErrors", [])}
+        # pymongo assigns _id client-side, so the persisted rows already carry theirs
+        return [m for i, m in enumerate(moods) if i not in rejected], list(rejected.values())
+    for mood, inserted_id in zip(moods, result.inserted_ids):
+        mood["_id"] = inserted_id
+    return moods, []
+
+
+async def generate_replays(moods: List[Dict]) -> List[Dict]:
+    """
+    Build and store replays for already inserted moods: REPLAY_BATCH_SIZE memories
+    per structured LLM call, REPLAY_CONCURRENCY calls in flight, cached prompts skipped.
+    """
+    if not moods:
+        return []
+    semaphore = asyncio.Semaphore(REPLAY_CONCURRENCY)
+
+    async def batch(group: List[Dict]) -> List[Dict]:
+        async with semaphore:
+            generated = await asyncio.to_thread(build_replays_batched, group)
+        return [replay_document_for(m, g) for m, g in zip(group, generated)]
+
+    groups = [moods[i:i + REPLAY_BATCH_SIZE] for i in range(0, len(moods), REPLAY_BATCH_SIZE)]
+    replays = [r for group in await asyncio.gather(*(batch(g) for g in groups)) for r in group]
+    result = await db.replays.insert_many(replays, ordered=False)
+    for replay, inserted_id in zip(replays, result.inserted_ids):
+        replay["_id"] = inserted_id
+    return replays
+
+
+async def generate_deferred_replays(user_id: str, moods: List[Dict], batch_size: int = 50) -> None:
+    """Background task: replays for an import that ran with replays=deferred."""
+    if not moods:
+        return
+    started = time.perf_counter()
+    done = 0
+    for i in range(0, len(moods), batch_size):
+        batch = moods[i:i + batch_size]
+        try:
+            replays = await generate_replays(batch)
+            await record_replays(replays)
+            await bulk_index_user_data(user_id, [], replays)
+            done += len(replays)
+        except Exception as e:
+            print(f"❌ Deferred replay generation failed for user {user_id}: {e}")
+    print(f"✅ Generated {done} deferred replays for user {user_id} in {time.perf_counter() - started:.1f}s")
+
+
+async def ingest_ndjson(stream: AsyncIterator[bytes], user_id: str, chunk_size: int,
+                        replay_mode: ReplayMode, deferred: List[Dict]) -> AsyncIterator[bytes]:
+    """
+    Run the import and yield one NDJSON progress line per chunk plus a final summary.
+    Moods needing deferred replays are appended to `deferred` for the caller to schedule.
+    """
+    user_object_id = ObjectId(user_id)
+    started = time.perf_counter()
+    # failed: lines not stored; unindexed: stored moods whose follow-up stages failed
+    # (re-run POST /index-user-data for the user to index them)
+    totals = {"received": 0, "inserted": 0, "indexed": 0, "replays": 0, "failed": 0, "unindexed": 0}
+    errors: List[Dict] = []
+    chunk_no = 0
+
+    async for lines in iter_ndjson_chunks(stream, chunk_size):
+        chunk_no += 1
+        totals["received"] += len(lines)
+        entries, parse_errors = parse_chunk(lines)
+        totals["failed"] += len(parse_errors)
+        errors.extend(parse_errors[:max(0, MAX_REPORTED_ERRORS - len(errors))])
+
+        if entries:
+            moods: List[Dict] = []
+            failing = "enrich"
+            try:
+                with stage("ingest.enrich"):
+                    moods = await asyncio.to_thread(enrich_chunk, entries, user_object_id)
+                failing = "insert"
+                with stage("ingest.insert"):
+                    moods, rejected = await insert_moods(moods)
+                totals["inserted"] += len(moods)
+                totals["failed"] += len(rejected)
+                for message in rejected[:max(0, MAX_REPORTED_ERRORS - len(errors))]:
+                    errors.append({"chunk": chunk_no, "stage": "insert", "error": message})
+
+                failing = "candidates"
+                with stage("ingest.candidates"):
+                    await upsert_candidates(moods)
+                failing = "analytics"
+                with stage("ingest.analytics"):
+                    await record_moods(moods)
+
+                replays: List[Dict] = []
+                if replay_mode == "inline":
+                    failing = "replays"
+                    with stage("ingest.replays"):
+                        replays = await generate_replays(moods)
+                    totals["replays"] += len(replays)
+                    failing = "analytics"
+                    with stage("ingest.analytics"):
+                        await record_replays(replays)
+                elif replay_mode == "deferred":
+                    deferred.extend(moods)
+
+                failing = "index"
+                with stage("ingest.index"):
+                    totals["indexed"] += await bulk_index_user_data(user_id, moods, replays)
+            except Exception as e:
+                if failing in ("enrich", "insert"):
+                    totals["failed"] += len(entries)
+                else:
+                    # The moods are stored; only what comes after the insert is missing
+                    totals["unindexed"] += len(moods)
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({"chunk": chunk_no, "stage": failing, "error": str(e)})
+                print(f"❌ Bulk import chunk {chunk_no} failed at {failing} for user {user_id}: {e}")
+
+        yield orjson.dumps({
+            "chunk": chunk_no,
+            **totals,
+            "elapsed_s": round(time.perf_counter() - started, 2),
+        }) + b"\n"
+
+    yield orjson.dumps({
+        "done": True,
+        "chunks": chunk_no,
+        **totals,
+        "replays_deferred": len(deferred),
+        "errors": errors,
+        "elapsed_s": round(time.perf_counter() - started, 2),
+    }) + b"\n"
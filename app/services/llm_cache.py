@@ -0,0 +1,106 @@
+# app/services/llm_cache.py
+"""
+Persistent LLM response cache: Mongo collection `llm_cache`, _id = sha256 of
+model + prompt, expired by a TTL index. Identical prompts (retries, re-imports,
+backfills) are answered from Mongo instead of the provider.
+
+LLM_CACHE_ENABLED=true  LLM_CACHE_TTL_S=2592000 (30 days)
+If Mongo is unreachable the cache steps aside for LLM_CACHE_BACKOFF_S and
+calls go straight to the LLM.
+"""
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from app.services.metrics import CACHE_EVENTS
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_CACHE_TTL_S = float(os.getenv("LLM_CACHE_TTL_S", str(30 * 86400)))
+LLM_CACHE_BACKOFF_S = float(os.getenv("LLM_CACHE_BACKOFF_S", "60"))
+LLM_CACHE_COLLECTION = os.getenv("LLM_CACHE_COLLECTION", "llm_cache")
+
+
+def model_name(llm) -> str:
+    names = getattr(llm, "model_names", None)
+    return names() if callable(names) else getattr(llm.metadata, "model_name", type(llm).__name__)
+
+
+def prompt_key(model: str, prompt: str) -> str:
+    return hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, collection=None, ttl_s: float = LLM_CACHE_TTL_S, enabled: bool = LLM_CACHE_ENABLED):
+        self._collection = collection
+        self.ttl_s = ttl_s
+        self.enabled = enabled
+        self._indexed = False
+        self._disabled_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def collection(self):
+        if self._collection is None:
+            from app.db.mongo_client import get_sync_db
+            self._collection = get_sync_db()[LLM_CACHE_COLLECTION]
+        return self._collection
+
+    def _available(self) -> bool:
+        return self.enabled and time.monotonic() >= self._disabled_until
+
+    def _failed(self, e: Exception) -> None:
+        self._disabled_until = time.monotonic() + LLM_CACHE_BACKOFF_S
+        print(f"⚠️ LLM cache unavailable for {LLM_CACHE_BACKOFF_S:.0f}s: {e}")
+
+    def _ensure_index(self) -> None:
+        if not self._indexed:
+            with self._lock:
+                if not self._indexed:
+                    self.collection.create_index("expires_at", name="expires_at_ttl", expireAfterSeconds=0)
+                    self._indexed = True
+
+    def get(self, key: str) -> Optional[str]:
+        if not self._available():
+            return None
+        try:
+            self._ensure_index()
+            doc = self.collection.find_one(
+                {"_id": key, "expires_at": {"$gt": datetime.now(timezone.utc)}}, {"response": 1}
+            )
+        except Exception as e:
+            self._failed(e)
+            return None
+        CACHE_EVENTS.inc(cache="llm", result="hit" if doc else "miss")
+        return doc["response"] if doc else None
+
+    def put(self, key: str, model: str, response: str) -> None:
+        if not self._available():
+            return
+        now = datetime.now(timezone.utc)
+        try:
+            self._ensure_index()
+            self.collection.replace_one(
+                {"_id": key},
+                {"response": response, "model": model, "created_at": now,
+                 "expires_at": now + timedelta(seconds=self.ttl_s)},
+                upsert=True,
+            )
+        except Exception as e:
+            self._failed(e)
+
+    def complete(self, llm, prompt: str) -> str:
+        """Cached llm.complete(prompt).text; errors are raised and never cached."""
+        model = model_name(llm)
+        key = prompt_key(model, prompt)
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        text = llm.complete(prompt).text
+        self.put(key, model, text)
+        return text
+
+
+llm_cache = LLMCache()
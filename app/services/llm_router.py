@@ -0,0 +1,269 @@
+# app/services/llm_router.py
+"""
+LLM routing layer: hedged requests, provider failover and circuit breaking.
+
+- Providers are tried in order; the primary gets a head start equal to its
+  own latency percentile (HEDGE_PERCENTILE). If it hasn't answered by then,
+  the same prompt is fired at the next healthy provider and whichever
+  returns first wins.
+- A provider whose recent error rate crosses BREAKER_ERROR_RATE is skipped
+  for BREAKER_COOLDOWN_S; after that it is half-open: a single trial call is
+  let through (others skip it) and its failure re-opens the breaker, its
+  success closes it. Only calls started while closed, and the trial itself,
+  count: a late result from before a trip (or during the cooldown) is ignored.
+- Per-provider latency, errors, hedges and breaker state go to /metrics.
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Deque, Dict, List, Optional, Sequence
+
+from llama_index.core.base.llms.types import CompletionResponse, CompletionResponseGen, LLMMetadata
+from llama_index.core.llms import LLM
+from llama_index.core.llms.callbacks import llm_completion_callback
+from llama_index.core.llms.custom import CustomLLM
+from pydantic import PrivateAttr
+
+from app.services.metrics import registry
+
+LLM_HEDGING = os.getenv("LLM_HEDGING", "true").lower() in ("1", "true", "yes")
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_DEFAULT_DELAY_S = float(os.getenv("HEDGE_DEFAULT_DELAY_S", "2.0"))
+HEDGE_MIN_DELAY_S = float(os.getenv("HEDGE_MIN_DELAY_S", "0.25"))
+HEDGE_MAX_DELAY_S = float(os.getenv("HEDGE_MAX_DELAY_S", "8.0"))
+BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", "20"))
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "5"))
+BREAKER_ERROR_RATE = float(os.getenv("BREAKER_ERROR_RATE", "0.5"))
+BREAKER_COOLDOWN_S = float(os.getenv("BREAKER_COOLDOWN_S", "30"))
+LLM_MAX_WORKERS = int(os.getenv("LLM_MAX_WORKERS", "32"))
+
+PROVIDER_LATENCY = registry.histogram(
+    "rewind_llm_provider_seconds", "LLM completion latency per provider", ("provider",),
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0))
+PROVIDER_ERRORS = registry.counter(
+    "rewind_llm_provider_errors_total", "Failed LLM completions per provider", ("provider",))
+HEDGES = registry.counter(
+    "rewind_llm_hedges_total", "Hedged requests fired, by provider that won", ("winner",))
+BREAKER_STATE = registry.gauge(
+    "rewind_llm_breaker_open", "1 while a provider's circuit breaker is open", ("provider",))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class BreakerOpen(RuntimeError):
+    """The provider is half-open and its one trial call is still in flight."""
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, window: int = BREAKER_WINDOW, min_calls: int = BREAKER_MIN_CALLS,
+                 error_rate: float = BREAKER_ERROR_RATE, cooldown_s: float = BREAKER_COOLDOWN_S):
+        self.name = name
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.cooldown_s = cooldown_s
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trial_started: Optional[float] = None
+        # Bumped on every state change and trial; a call's outcome counts only in its own generation
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def _refresh(self) -> str:
+        # Caller holds the lock
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.cooldown_s:
+            self._state = HALF_OPEN
+            self._trial_started = None
+            self._generation += 1
+        return self._state
+
+    def _trial_in_flight(self) -> bool:
+        # A trial that never reported (hung call) stops blocking after another cooldown
+        return self._trial_started is not None and time.monotonic() - self._trial_started < self.cooldown_s
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._refresh()
+
+    def allow(self) -> bool:
+        """Open providers, and half-open ones with a trial in flight, are skipped."""
+        with self._lock:
+            state = self._refresh()
+            return state == CLOSED or (state == HALF_OPEN and not self._trial_in_flight())
+
+    def acquire(self) -> int:
+        """
+        Called right before a call; claims the half-open trial or raises BreakerOpen.
+        Returns the token to hand back to record() with the call's outcome.
+        """
+        with self._lock:
+            if self._refresh() != HALF_OPEN:
+                return self._generation
+            if self._trial_in_flight():
+                raise BreakerOpen(f"{self.name} is half-open with a trial call in flight")
+            self._trial_started = time.monotonic()
+            self._generation += 1  # a stale trial's late result no longer decides
+            return self._generation
+
+    def record(self, ok: bool, token: int) -> None:
+        with self._lock:
+            state = self._refresh()
+            if token != self._generation or state == OPEN:
+                return  # started before a trip / trial, or while open: not evidence either way
+            if state == HALF_OPEN:
+                self._trial_started = None
+                self._generation += 1
+                if ok:
+                    self._state = CLOSED
+                    self._outcomes.clear()
+                else:
+                    self._trip()
+                return
+            self._outcomes.append(ok)
+            failures = self._outcomes.count(False)
+            if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.error_rate:
+                self._trip()
+
+    def _trip(self) -> None:
+        self._generation += 1
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        BREAKER_STATE.set(1, provider=self.name)
+        print(f"⚠️ LLM circuit breaker opened for {self.name}")
+
+    def closed_gauge(self) -> None:
+        if self.state != OPEN:
+            BREAKER_STATE.set(0, provider=self.name)
+
+
+class Provider:
+    """One upstream LLM plus its latency window and breaker."""
+
+    def __init__(self, name: str, llm: LLM, breaker: Optional[CircuitBreaker] = None, window: int = 200):
+        self.name = name
+        self.llm = llm
+        self.breaker = breaker or CircuitBreaker(name)
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def complete(self, prompt: str, **kwargs: Any) -> CompletionResponse:
+        token = self.breaker.acquire()
+        start = time.perf_counter()
+        try:
+            response = self.llm.complete(prompt, **kwargs)
+        except Exception:
+            PROVIDER_ERRORS.inc(provider=self.name)
+            self.breaker.record(False, token)
+            raise
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._latencies.append(elapsed)
+        PROVIDER_LATENCY.observe(elapsed, provider=self.name)
+        self.breaker.record(True, token)
+        self.breaker.closed_gauge()
+        return response
+
+    def percentile(self, pct: float, min_samples: int = HEDGE_MIN_SAMPLES) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._latencies)
+        if not samples or len(samples) < min_samples:
+            return None
+        idx = min(len(samples) - 1, int(round(pct / 100.0 * (len(samples) - 1))))
+        return samples[idx]
+
+    def hedge_delay(self) -> float:
+        observed = self.percentile(HEDGE_PERCENTILE)
+        delay = HEDGE_DEFAULT_DELAY_S if observed is None else observed
+        return min(max(delay, HEDGE_MIN_DELAY_S), HEDGE_MAX_DELAY_S)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "samples": len(self._latencies),
+            "p50_s": self.percentile(50, min_samples=1),
+            "p95_s": self.percentile(95, min_samples=1),
+            "p99_s": self.percentile(99, min_samples=1),
+            "breaker": self.breaker.state,
+        }
+
+
+class HedgedLLM(CustomLLM):
+    """llama_index LLM that fans a completion out across providers."""
+
+    hedging: bool = LLM_HEDGING
+    _providers: List[Provider] = PrivateAttr()
+    _pool: ThreadPoolExecutor = PrivateAttr()
+
+    def __init__(self, providers: Sequence[Provider], hedging: bool = LLM_HEDGING, **kwargs: Any):
+        if not providers:
+            raise ValueError("HedgedLLM needs at least one provider")
+        super().__init__(hedging=hedging, **kwargs)
+        self._providers = list(providers)
+        self._pool = ThreadPoolExecutor(max_workers=LLM_MAX_WORKERS, thread_name_prefix="llm-hedge")
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "HedgedLLM"
+
+    @property
+    def providers(self) -> List[Provider]:
+        return self._providers
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        primary = self._providers[0].llm.metadata
+        # Everything funnels through complete() so hedging covers chat-style calls too
+        return primary.model_copy(update={"is_chat_model": False, "model_name": self.model_names()})
+
+    def model_names(self) -> str:
+        return "+".join(p.name for p in self._providers)
+
+    def _available(self) -> List[Provider]:
+        healthy = [p for p in self._providers if p.breaker.allow()]
+        # All breakers open: fall back to plain failover over everything rather than failing fast
+        return healthy or list(self._providers)
+
+    @llm_completion_callback()
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        candidates = self._available()
+        primary = candidates[0]
+        pending: Dict[Future, Provider] = {self._pool.submit(primary.complete, prompt, **kwargs): primary}
+        backups = candidates[1:]
+        last_error: Optional[BaseException] = None
+        hedged = False
+
+        if self.hedging and backups:
+            done, _ = wait(pending, timeout=primary.hedge_delay())
+            if not done:
+                backup = backups.pop(0)
+                pending[self._pool.submit(backup.complete, prompt, **kwargs)] = backup
+                hedged = True
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                provider = pending.pop(future)
+                error = future.exception()
+                if error is None:
+                    if hedged:
+                        HEDGES.inc(winner=provider.name)
+                    return future.result()
+                last_error = error
+                print(f"⚠️ LLM provider {provider.name} failed: {error}")
+            # Failover: a provider errored and nothing else is racing, try the next one
+            if not pending and backups:
+                backup = backups.pop(0)
+                pending[self._pool.submit(backup.complete, prompt, **kwargs)] = backup
+
+        raise last_error or RuntimeError("No LLM provider produced a response")
+
+    @llm_completion_callback()
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponseGen:
+        return self._available()[0].llm.stream_complete(prompt, formatted=formatted, **kwargs)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {p.name: p.stats() for p in self._providers}
@@ -0,0 +1,210 @@
+# app/services/metrics.py
+"""
+Lightweight in-process metrics for the request pipeline.
+- Counters / gauges / histograms rendered in Prometheus text format (/metrics)
+- Per-request correlation ID carried in a contextvar
+- `stage()` timer that records a histogram sample and (optionally) a trace span
+"""
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.services.tracing import span
+
+# --------------------------- Correlation ID ---------------------------
+REQUEST_ID_HEADER = "X-Request-ID"
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+
+def new_request_id(incoming: Optional[str] = None) -> str:
+    """Reuse a sane client-supplied ID, otherwise mint a new one."""
+    if incoming and len(incoming) <= 128 and incoming.isprintable():
+        return incoming
+    return uuid.uuid4().hex
+
+
+def set_request_id(request_id: str):
+    return _request_id.set(request_id)
+
+
+def reset_request_id(token) -> None:
+    _request_id.reset(token)
+
+
+def get_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+# ----------------------------- Metric types ---------------------------
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_str(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, val in self._values.items():
+                lines.append(f"{self.name}{_label_str(self.labelnames, key)} {val}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [bucket counts..., sum, count]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, row in self._values.items():
+                for bound, cnt in zip(self.buckets, row):
+                    le = _label_str(self.labelnames, key, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{le} {cnt}")
+                inf = _label_str(self.labelnames, key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{inf} {row[-1]}")
+                lines.append(f"{self.name}_sum{_label_str(self.labelnames, key)} {row[-2]}")
+                lines.append(f"{self.name}_count{_label_str(self.labelnames, key)} {row[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# --------------------------- Pipeline metrics -------------------------
+HTTP_REQUESTS = registry.counter(
+    "rewind_http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+HTTP_LATENCY = registry.histogram(
+    "rewind_http_request_seconds", "End-to-end HTTP request latency", ("method", "route"))
+IN_FLIGHT = registry.gauge(
+    "rewind_http_in_flight_requests", "Requests currently being served", ("route",))
+STAGE_LATENCY = registry.histogram(
+    "rewind_stage_seconds", "Latency of individual pipeline stages", ("stage",))
+STAGE_ERRORS = registry.counter(
+    "rewind_stage_errors_total", "Pipeline stages that raised", ("stage",))
+CACHE_EVENTS = registry.counter(
+    "rewind_cache_events_total", "Cache lookups by cache and result (hit/miss/coalesced)", ("cache", "result"))
+CRISIS_MATCHES = registry.counter(
+    "rewind_crisis_matches_total", "Crisis guard matches by category", ("category",))
+LLM_FALLBACKS = registry.counter(
+    "rewind_llm_fallbacks_total", "Fallback responses served instead of the RAG answer", ("route", "reason"))
+
+
+@contextmanager
+def stage(name: str, **attributes):
+    """
+    Time a pipeline stage, e.g. `with stage("search.retrieval"): ...`.
+    Records into rewind_stage_seconds and opens a child span when tracing is on.
+    """
+    start = time.perf_counter()
+    with span(name, request_id=get_request_id(), **attributes) as s:
+        try:
+            yield s
+        except BaseException:
+            STAGE_ERRORS.inc(stage=name)
+            raise
+        finally:
+            STAGE_LATENCY.observe(time.perf_counter() - start, stage=name)
@@ -0,0 +1,198 @@
+# app/services/mood_analytics.py
+"""
+Per-user mood analytics rollups (collection `mood_rollups`).
+
+One document per (user, period, bucket start), period = day | week (UTC,
+weeks start on Monday):
+
+    {_id: "<user>:day:2026-10-19", user, period, start,
+     count, moods: {joy: 3, ...}, tags: {work: 2, ...}, score_sum, score_n}
+
+- record_moods: $inc upserts as moods are written (/mood-detect, bulk, ingest);
+  forget_moods applies the same increments negated on delete.
+- record_replays / forget_replays: the same for replays, which only add to
+  score_sum / score_n - wherever and whenever a replay is inserted or deleted.
+- rebuild_user_rollups (also behind app.scripts.rebuild_analytics): recompute
+  from the mood and replay history and replace the user's rollups.
+- read_rollups: the /analytics read, O(#buckets) regardless of history length.
+
+The average replay score is score_sum / score_n at read time, over the scores
+the replays were stored with (bucketed by the replay's create_date, which is
+its mood's for generated replays).
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from bson import ObjectId
+from pymongo import ReplaceOne, UpdateOne
+
+from app.db.mongo_client import db
+
+PERIODS = ("day", "week")
+ROLLUP_FIELDS = {"user": 1, "mood": 1, "context_tags": 1, "create_date": 1}
+REPLAY_ROLLUP_FIELDS = {"user": 1, "replay_opportunity_score": 1, "create_date": 1}
+WRITE_BATCH = 1000
+
+
+def bucket_start(when: datetime, period: str) -> datetime:
+    day = datetime(when.year, when.month, when.day)
+    return day - timedelta(days=day.weekday()) if period == "week" else day
+
+
+def rollup_id(user_id: ObjectId, period: str, start: datetime) -> str:
+    return f"{user_id}:{period}:{start:%Y-%m-%d}"
+
+
+def _field_key(value) -> Optional[str]:
+    """Counter key for a mood label / tag: '.' would be read as a path and '$' is reserved."""
+    key = str(value).strip().replace(".", "_").lstrip("$")
+    return key or None
+
+
+def _score(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _rollups_for(rollups: Dict[str, Dict], doc: Dict) -> List[Dict]:
+    """The day and week rollups `doc` falls in ([] if it has no user or date)."""
+    when = doc.get("create_date")
+    if not isinstance(when, datetime) or doc.get("user") is None:
+        return []
+    buckets = []
+    for period in PERIODS:
+        start = bucket_start(when, period)
+        buckets.append(rollups.setdefault(rollup_id(doc["user"], period, start), {
+            "user": doc["user"], "period": period, "start": start,
+            "count": 0, "moods": {}, "tags": {}, "score_sum": 0.0, "score_n": 0,
+        }))
+    return buckets
+
+
+def accumulate(moods: Iterable[Dict], replays: Iterable[Dict] = ()) -> Dict[str, Dict]:
+    """Rollup totals contributed by `moods` (counts, labels, tags) and `replays` (scores), keyed by rollup _id."""
+    rollups: Dict[str, Dict] = {}
+    for mood in moods:
+        label = _field_key(mood.get("mood") or "unknown")
+        tags = {_field_key(t) for t in mood.get("context_tags") or []} - {None}
+        for rollup in _rollups_for(rollups, mood):
+            rollup["count"] += 1
+            rollup["moods"][label] = rollup["moods"].get(label, 0) + 1
+            for tag in tags:
+                rollup["tags"][tag] = rollup["tags"].get(tag, 0) + 1
+    for replay in replays:
+        score = _score(replay.get("replay_opportunity_score"))
+        if score is None:
+            continue
+        for rollup in _rollups_for(rollups, replay):
+            rollup["score_sum"] += score
+            rollup["score_n"] += 1
+    return rollups
+
+
+def _increments(rollup: Dict, sign: int) -> Dict:
+    inc = {"count": sign * rollup["count"], "score_sum": sign * rollup["score_sum"], "score_n": sign * rollup["score_n"]}
+    inc.update({f"moods.{k}": sign * v for k, v in rollup["moods"].items()})
+    inc.update({f"tags.{k}": sign * v for k, v in rollup["tags"].items()})
+    return inc
+
+
+async def _apply(rollups: Dict[str, Dict], sign: int) -> None:
+    ops = [
+        UpdateOne(
+            {"_id": _id},
+            {"$inc": _increments(r, sign),
+             "$setOnInsert": {"user": r["user"], "period": r["period"], "start": r["start"]}},
+            upsert=True,
+        )
+        for _id, r in rollups.items()
+    ]
+    for i in range(0, len(ops), WRITE_BATCH):
+        await db.mood_rollups.bulk_write(ops[i:i + WRITE_BATCH], ordered=False)
+
+
+async def record_moods(moods: Iterable[Dict], replays: Iterable[Dict] = ()) -> int:
+    """Add newly written moods (and the replays inserted with them) to their day/week rollups."""
+    rollups = accumulate(moods, replays)
+    if rollups:
+        await _apply(rollups, 1)
+    return len(rollups)
+
+
+async def forget_moods(moods: Iterable[Dict], replays: Iterable[Dict] = ()) -> None:
+    """Take deleted moods (and the replays deleted with them) back out of their rollups."""
+    rollups = accumulate(moods, replays)
+    if rollups:
+        await _apply(rollups, -1)
+
+
+async def record_replays(replays: Iterable[Dict]) -> int:
+    """Add the scores of replays inserted on their own (deferred generation, POST /user-replay)."""
+    return await record_moods((), replays)
+
+
+async def forget_replays(replays: Iterable[Dict]) -> None:
+    await forget_moods((), replays)
+
+
+async def rebuild_user_rollups(user_id: ObjectId, batch_size: int = 5000, database=None) -> int:
+    """
+    Recompute a user's rollups from the full mood and replay history and replace the stored ones.
+    `database` is a Motor database handle (default: the API's).
+    """
+    database = db if database is None else database
+    moods = database.moods.find({"user": user_id}, ROLLUP_FIELDS).batch_size(batch_size)
+    replays = database.replays.find({"user": user_id}, REPLAY_ROLLUP_FIELDS).batch_size(batch_size)
+    rollups = accumulate([m async for m in moods], [r async for r in replays])
+    ops = [ReplaceOne({"_id": _id}, r, upsert=True) for _id, r in rollups.items()]
+    for i in range(0, len(ops), WRITE_BATCH):
+        await database.mood_rollups.bulk_write(ops[i:i + WRITE_BATCH], ordered=False)
+    await database.mood_rollups.delete_many({"user": user_id, "_id": {"$nin": list(rollups)}})
+    return len(rollups)
+
+
+def _summary(buckets: List[Dict], top_tags: int) -> Dict:
+    moods: Dict[str, int] = {}
+    tags: Dict[str, int] = {}
+    score_sum, score_n, count = 0.0, 0, 0
+    for bucket in buckets:
+        count += bucket.get("count", 0)
+        score_sum += bucket.get("score_sum", 0.0)
+        score_n += bucket.get("score_n", 0)
+        for k, v in (bucket.get("moods") or {}).items():
+            moods[k] = moods.get(k, 0) + v
+        for k, v in (bucket.get("tags") or {}).items():
+            tags[k] = tags.get(k, 0) + v
+    return {
+        "count": count,
+        "moods": {k: v for k, v in sorted(moods.items(), key=lambda kv: -kv[1]) if v > 0},
+        "top_tags": [{"tag": k, "count": v} for k, v in sorted(tags.items(), key=lambda kv: -kv[1])[:top_tags] if v > 0],
+        "avg_replay_score": round(score_sum / score_n, 3) if score_n else None,
+    }
+
+
+async def read_rollups(user_id: ObjectId, period: str, since: datetime, until: datetime, top_tags: int = 10) -> Dict:
+    """Buckets in [since, until) plus totals over them, from the {user, period, start} index."""
+    buckets = await (
+        db.mood_rollups.find(
+            {"user": user_id, "period": period, "start": {"$gte": bucket_start(since, period), "$lt": until}},
+            {"_id": 0, "user": 0, "period": 0},
+        )
+        .sort("start", 1)
+        .to_list(None)
+    )
+    return {
+        "period": period,
+        "since": bucket_start(since, period),
+        "until": until,
+        "totals": _summary(buckets, top_tags),
+        "buckets": [{
+            "start": b["start"],
+            "count": b.get("count", 0),
+            "moods": {k: v for k, v in (b.get("moods") or {}).items() if v > 0},
+            "tags": {k: v for k, v in (b.get("tags") or {}).items() if v > 0},
+            "avg_replay_score": round(b["score_sum"] / b["score_n"], 3) if b.get("score_n") else None,
+        } for b in buckets if b.get("count", 0) > 0 or b.get("score_n", 0) > 0],
+    }
@@ -0,0 +1,193 @@
+# app/services/profiling.py
+"""
+Opt-in request profiling and an event-loop lag watchdog.
+
+Request profiles (off unless PROFILE_DIR is set):
+- per request with header `X-Profile: <PROFILE_TOKEN>` (the header is ignored while no
+  token is set), or for a random PROFILE_SAMPLE_RATE fraction of requests;
+- PROFILE_MODE=sample (default): a background thread samples every thread's stack
+  each PROFILE_INTERVAL_MS and writes collapsed stacks (<id>.folded, flamegraph.pl /
+  speedscope format) - sees blocking calls on the loop and in worker threads. One
+  sampler at a time: it already sees every thread, so a second adds only overhead;
+- PROFILE_MODE=cprofile: deterministic cProfile of the event-loop thread
+  (<id>.pstats), one request at a time since it sees every coroutine on the loop.
+
+Watchdog (off unless LOOP_WATCHDOG_MS > 0): a heartbeat coroutine ticks every
+LOOP_WATCHDOG_MS / 4; a monitor thread that sees no tick for LOOP_WATCHDOG_MS
+logs the loop thread's current stack (the code blocking it) once per stall.
+
+Disabled, both cost one env check per request and nothing else.
+"""
+import asyncio
+import cProfile
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from app.services.metrics import registry
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "")
+PROFILE_MODE = os.getenv("PROFILE_MODE", "sample").lower()
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_HEADER = "X-Profile"
+LOOP_WATCHDOG_MS = float(os.getenv("LOOP_WATCHDOG_MS", "0"))
+
+PROFILES = registry.counter("rewind_profiles_total", "Request profiles written", ("mode",))
+LOOP_STALLS = registry.counter("rewind_event_loop_stalls_total", "Event-loop stalls longer than LOOP_WATCHDOG_MS")
+LOOP_LAG = registry.histogram(
+    "rewind_event_loop_lag_seconds", "Event-loop lag of watchdog heartbeats",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+
+_cprofile_lock = threading.Lock()
+_sampler_lock = threading.Lock()
+
+
+def _profile_path(request_id: str, route: str, suffix: str) -> str:
+    safe_route = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+    return os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{safe_route}-{request_id}.{suffix}")
+
+
+def should_profile(headers) -> bool:
+    if not PROFILE_DIR:
+        return False
+    requested = headers.get(PROFILE_HEADER)
+    if requested is not None and PROFILE_TOKEN and hmac.compare_digest(requested.encode(), PROFILE_TOKEN.encode()):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+class StackSampler(threading.Thread):
+    """Samples all threads' stacks into collapsed-stack counts until stop()."""
+
+    def __init__(self, path: str, interval_s: float):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.path = path
+        self.interval_s = interval_s
+        self.stacks: Counter = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        own = threading.get_ident()
+        names = {}
+        while not self._stop_event.wait(self.interval_s):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                if thread_id not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                if names.get(thread_id) == "loop-watchdog":
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(stack))] += 1
+        self._write()
+
+    def _write(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "w") as f:
+                for stack, count in self.stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            PROFILES.inc(mode="sample")
+        except OSError as e:
+            print(f"⚠️ Failed to write profile {self.path}: {e}")
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+
+@asynccontextmanager
+async def profile_request(request_id: str, route: str):
+    """Profile the enclosed request handling with PROFILE_MODE."""
+    if PROFILE_MODE == "cprofile":
+        if not _cprofile_lock.acquire(blocking=False):
+            yield  # another request is already under cProfile on this loop
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+            path = _profile_path(request_id, route, "pstats")
+            try:
+                os.makedirs(PROFILE_DIR, exist_ok=True)
+                await asyncio.to_thread(profiler.dump_stats, path)
+                PROFILES.inc(mode="cprofile")
+            except OSError as e:
+                print(f"⚠️ Failed to write profile {path}: {e}")
+        finally:
+            _cprofile_lock.release()
+        return
+
+    if not _sampler_lock.acquire(blocking=False):
+        yield  # the running sampler already sees this request's threads
+        return
+    try:
+        sampler = StackSampler(_profile_path(request_id, route, "folded"), PROFILE_INTERVAL_MS / 1000.0)
+        sampler.start()
+        try:
+            yield
+        finally:
+            sampler.stop()
+    finally:
+        _sampler_lock.release()
+
+
+# ----------------------------- Loop watchdog -----------------------------
+class LoopWatchdog:
+    def __init__(self, threshold_ms: float = LOOP_WATCHDOG_MS):
+        self.threshold_s = threshold_ms / 1000.0
+        self.tick_s = self.threshold_s / 4
+        self._last_beat = time.monotonic()
+        self._loop_thread: Optional[int] = None
+        self._stop = threading.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            expected = time.monotonic() + self.tick_s
+            await asyncio.sleep(self.tick_s)
+            now = time.monotonic()
+            LOOP_LAG.observe(max(0.0, now - expected))
+            self._last_beat = now
+
+    def _monitor(self) -> None:
+        reported = None  # heartbeat we already logged a stall for
+        while not self._stop.wait(self.tick_s):
+            last = self._last_beat
+            stalled = time.monotonic() - last
+            if stalled < self.threshold_s or reported == last:
+                continue
+            reported = last
+            LOOP_STALLS.inc()
+            frame = sys._current_frames().get(self._loop_thread)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "<unavailable>\n"
+            print(f"🐢 Event loop blocked for {stalled * 1000:.0f}ms+ (threshold {self.threshold_s * 1000:.0f}ms), "
+                  f"loop thread is at:\n{stack}")
+
+    def start(self) -> None:
+        self._loop_thread = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        threading.Thread(target=self._monitor, name="loop-watchdog", daemon=True).start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
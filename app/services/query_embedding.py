@@ -0,0 +1,118 @@
+# app/services/query_embedding.py
+"""
+Query-embedding service for retrieval.
+
+- LRU of normalized query -> vector: repeated phrasings never reach the model.
+- Concurrent misses are coalesced: identical queries share one future, and
+  distinct ones are embedded together in one batched forward pass. Only one
+  batch runs at a time; whatever arrives meanwhile forms the next batch, so
+  bursts batch up naturally and a lone query waits at most QUERY_EMBED_MAX_WAIT_MS.
+
+QUERY_EMBED_MAX_BATCH=32  QUERY_EMBED_MAX_WAIT_MS=5  QUERY_EMBED_CACHE_SIZE=2048
+"""
+import asyncio
+import os
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from app.services.metrics import CACHE_EVENTS, registry
+from app.services.result_cache import normalize_text
+
+QUERY_EMBED_MAX_BATCH = int(os.getenv("QUERY_EMBED_MAX_BATCH", "32"))
+QUERY_EMBED_MAX_WAIT_MS = float(os.getenv("QUERY_EMBED_MAX_WAIT_MS", "5"))
+QUERY_EMBED_CACHE_SIZE = int(os.getenv("QUERY_EMBED_CACHE_SIZE", "2048"))
+
+BATCH_SIZE = registry.histogram(
+    "rewind_query_embed_batch_size", "Queries per embedding forward pass",
+    buckets=(1, 2, 4, 8, 16, 32, 64))
+
+Embedding = List[float]
+
+
+class QueryEmbeddingService:
+    def __init__(self, embed_model, max_batch: int = QUERY_EMBED_MAX_BATCH,
+                 max_wait_ms: float = QUERY_EMBED_MAX_WAIT_MS, cache_size: int = QUERY_EMBED_CACHE_SIZE):
+        self.embed_model = embed_model
+        self.max_batch = max_batch
+        self.max_wait_s = max_wait_ms / 1000.0
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Embedding]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._pending: List[str] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running = False
+
+    async def embed(self, query: str) -> Embedding:
+        key = normalize_text(query)
+        vector = self._cache.get(key)
+        if vector is not None:
+            self._cache.move_to_end(key)
+            CACHE_EVENTS.inc(cache="query_embedding", result="hit")
+            return vector
+
+        future = self._inflight.get(key)
+        if future is not None:
+            CACHE_EVENTS.inc(cache="query_embedding", result="coalesced")
+        else:
+            CACHE_EVENTS.inc(cache="query_embedding", result="miss")
+            loop = asyncio.get_running_loop()
+            future = self._inflight[key] = loop.create_future()
+            self._pending.append(key)
+            if len(self._pending) >= self.max_batch:
+                self._flush()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.max_wait_s, self._flush)
+        return await asyncio.shield(future)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._running or not self._pending:
+            return  # the running batch flushes again when it finishes
+        batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+        self._running = True
+        asyncio.get_running_loop().create_task(self._run(batch))
+
+    async def _run(self, batch: List[str]) -> None:
+        BATCH_SIZE.observe(len(batch))
+        try:
+            vectors = await asyncio.to_thread(self._embed_batch, batch)
+        except Exception as e:
+            for key in batch:
+                self._inflight.pop(key).set_exception(e)
+        else:
+            for key, vector in zip(batch, vectors):
+                self._remember(key, vector)
+                self._inflight.pop(key).set_result(vector)
+        finally:
+            self._running = False
+            if self._pending:
+                self._flush()
+
+    def _embed_batch(self, queries: List[str]) -> List[Embedding]:
+        # HuggingFaceEmbedding applies the query prompt/instruction in _embed(prompt_name="query")
+        embed = getattr(self.embed_model, "_embed", None)
+        if embed is not None:
+            return [list(v) for v in embed(queries, prompt_name="query")]
+        return [self.embed_model.get_query_embedding(q) for q in queries]
+
+    def _remember(self, key: str, vector: Embedding) -> None:
+        if self.cache_size <= 0:
+            return
+        self._cache[key] = vector
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+
+_service: Optional[QueryEmbeddingService] = None
+
+
+def query_embedder() -> QueryEmbeddingService:
+    """Process-wide service around the index's embedding model."""
+    global _service
+    if _service is None:
+        from app.db.llama_index_client import embed_model
+        _service = QueryEmbeddingService(embed_model)
+    return _service
@@ -0,0 +1,113 @@
+# app/services/replay_candidates.py
+"""
+Materialized, ranked replay candidates per user (collection `replay_candidates`,
+one doc per mood, _id = mood _id).
+
+- rebuild_user_candidates: scores a user's whole mood history in one numpy pass
+  and upserts it (background job via POST /replay-candidates/rebuild).
+- upsert_candidates: incremental update as new moods are written.
+- top_candidates: the top-N read served from the {user, score, create_date} index.
+
+Scores use the same rules as emotion_service.generate_replay_opportunity_score.
+"""
+from datetime import datetime
+from typing import Dict, Iterable, List
+
+import numpy as np
+from bson import ObjectId
+from pymongo import ReplaceOne
+
+from app.db.mongo_client import db
+from app.services.emotion_service import (
+    REPLAY_BASE_SCORE, REPLAY_EVENT_WEIGHTS, REPLAY_MOOD_WEIGHTS, REPLAY_RELATIONSHIP_TAGS, REPLAY_RELATIONSHIP_WEIGHT,
+)
+
+CANDIDATE_FIELDS = {"user": 1, "user_text": 1, "mood": 1, "events": 1, "context_tags": 1, "create_date": 1}
+PREVIEW_CHARS = 280
+WRITE_BATCH = 1000
+
+
+def score_moods(moods: List[Dict]) -> np.ndarray:
+    """Replay-opportunity score for every mood at once."""
+    if not moods:
+        return np.zeros(0)
+    labels = np.array([(m.get("mood") or "").lower() for m in moods])
+    scores = np.full(len(moods), REPLAY_BASE_SCORE)
+    for label, weight in REPLAY_MOOD_WEIGHTS.items():
+        scores += (labels == label) * weight
+
+    events = [set(m.get("events") or []) & REPLAY_EVENT_WEIGHTS.keys() for m in moods]
+    for event, weight in REPLAY_EVENT_WEIGHTS.items():
+        scores += np.fromiter((event in e for e in events), dtype=bool, count=len(moods)) * weight
+
+    has_relationship = np.fromiter(
+        (bool(REPLAY_RELATIONSHIP_TAGS.intersection(m.get("context_tags") or [])) for m in moods),
+        dtype=bool, count=len(moods),
+    )
+    scores += has_relationship * REPLAY_RELATIONSHIP_WEIGHT
+    return np.round(np.minimum(scores, 1.0), 2)
+
+
+def _candidate_docs(moods: List[Dict], refreshed_at: datetime) -> List[Dict]:
+    return [{
+        "_id": mood["_id"],
+        "user": mood.get("user"),
+        "score": float(score),
+        "mood": mood.get("mood"),
+        "preview": (mood.get("user_text") or "")[:PREVIEW_CHARS],
+        "events": mood.get("events") or [],
+        "context_tags": mood.get("context_tags") or [],
+        "create_date": mood.get("create_date"),
+        "refreshed_at": refreshed_at,
+    } for mood, score in zip(moods, score_moods(moods))]
+
+
+async def _write(candidates: List[Dict]) -> None:
+    for i in range(0, len(candidates), WRITE_BATCH):
+        batch = candidates[i:i + WRITE_BATCH]
+        await db.replay_candidates.bulk_write(
+            [ReplaceOne({"_id": c["_id"]}, c, upsert=True) for c in batch], ordered=False
+        )
+
+
+async def upsert_candidates(moods: Iterable[Dict]) -> int:
+    """Incremental update for newly written moods."""
+    moods = [m for m in moods if m.get("_id") is not None]
+    if not moods:
+        return 0
+    await _write(_candidate_docs(moods, datetime.utcnow()))
+    return len(moods)
+
+
+async def delete_candidates(mood_ids: Iterable[ObjectId]) -> None:
+    ids = list(mood_ids)
+    if ids:
+        await db.replay_candidates.delete_many({"_id": {"$in": ids}})
+
+
+async def rebuild_user_candidates(user_id: ObjectId, batch_size: int = 5000) -> int:
+    """Re-score a user's full history and drop candidates whose mood no longer exists."""
+    refreshed_at = datetime.utcnow()
+    total = 0
+    batch: List[Dict] = []
+    async for mood in db.moods.find({"user": user_id}, CANDIDATE_FIELDS).batch_size(batch_size):
+        batch.append(mood)
+        if len(batch) >= batch_size:
+            await _write(_candidate_docs(batch, refreshed_at))
+            total += len(batch)
+            batch = []
+    if batch:
+        await _write(_candidate_docs(batch, refreshed_at))
+        total += len(batch)
+    await db.replay_candidates.delete_many({"user": user_id, "refreshed_at": {"$lt": refreshed_at}})
+    print(f"✅ Rebuilt {total} replay candidates for user {user_id}")
+    return total
+
+
+async def top_candidates(user_id: ObjectId, limit: int) -> List[Dict]:
+    return await (
+        db.replay_candidates.find({"user": user_id}, {"refreshed_at": 0})
+        .sort([("score", -1), ("create_date", -1)])
+        .limit(limit)
+        .to_list(limit)
+    )
@@ -0,0 +1,106 @@
+# app/services/replay_context.py
+"""
+Context for /chat-about-replay: the replay, its mood text and the username in
+one aggregation ($lookup + projection), assembled once and cached per
+(user, replay) for REPLAY_CONTEXT_TTL_S from the load (a fixed expiry: an
+active chat doesn't extend it).
+
+Updating or deleting a replay (or its mood) invalidates the entry in this
+process; other workers serve the old context for at most the TTL.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from bson import ObjectId
+
+from app.db.mongo_client import db
+from app.services.metrics import CACHE_EVENTS
+
+REPLAY_CONTEXT_TTL_S = float(os.getenv("REPLAY_CONTEXT_TTL_S", "300"))
+REPLAY_CONTEXT_MAX_ENTRIES = int(os.getenv("REPLAY_CONTEXT_MAX_ENTRIES", "10000"))
+
+Key = Tuple[str, str]
+_contexts: "OrderedDict[Key, Tuple[float, Dict]]" = OrderedDict()
+_lock = threading.Lock()
+_invalidations = 0  # bumped by every invalidate; a load that raced one isn't cached
+
+
+def _pipeline(user_id: ObjectId, replay_id: ObjectId) -> list:
+    return [
+        {"$match": {"_id": replay_id, "user": user_id}},
+        {"$limit": 1},
+        {"$lookup": {
+            "from": "moods",
+            "let": {"mood_id": "$moods"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$_id", "$$mood_id"]}}},
+                {"$project": {"_id": 0, "user_text": 1}},
+            ],
+            "as": "mood",
+        }},
+        {"$lookup": {
+            "from": "users",
+            "let": {"user_id": "$user"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$_id", "$$user_id"]}}},
+                {"$project": {"_id": 0, "username": 1}},
+            ],
+            "as": "owner",
+        }},
+        {"$project": {
+            "gem_response": 1,
+            "user_response": 1,
+            "create_date": 1,
+            "mood_text": {"$arrayElemAt": ["$mood.user_text", 0]},
+            "username": {"$arrayElemAt": ["$owner.username", 0]},
+        }},
+    ]
+
+
+def build_context(replay: Dict) -> str:
+    return f"""
+## Replay Details:
+- Date: {replay.get('create_date', 'Unknown date')}
+- Your original reflection: {replay.get('mood_text') or ''}
+- Your response to guidance: {replay.get('user_response', '')}
+- Previous guidance provided: {replay.get('gem_response', '')}
+"""
+
+
+async def load_replay_context(user_id: ObjectId, replay_id: ObjectId) -> Optional[Dict]:
+    """{"user_name", "context"} for the replay, or None if it doesn't exist / isn't the user's."""
+    key = (str(user_id), str(replay_id))
+    now = time.monotonic()
+    with _lock:
+        entry = _contexts.get(key)
+        if entry is not None and entry[0] > now:
+            _contexts.move_to_end(key)
+            CACHE_EVENTS.inc(cache="replay_context", result="hit")
+            return entry[1]
+        generation = _invalidations
+
+    CACHE_EVENTS.inc(cache="replay_context", result="miss")
+    rows = await db.replays.aggregate(_pipeline(user_id, replay_id)).to_list(1)
+    if not rows:
+        return None
+    replay = rows[0]
+    value = {"user_name": replay.get("username") or "friend", "context": build_context(replay)}
+
+    with _lock:
+        if generation != _invalidations:
+            return value  # fetched before a concurrent update/delete finished; don't cache it
+        _contexts[key] = (time.monotonic() + REPLAY_CONTEXT_TTL_S, value)
+        _contexts.move_to_end(key)
+        while len(_contexts) > REPLAY_CONTEXT_MAX_ENTRIES:
+            _contexts.popitem(last=False)
+    return value
+
+
+def invalidate_replay_context(user_id, replay_id) -> None:
+    global _invalidations
+    with _lock:
+        _invalidations += 1
+        _contexts.pop((str(user_id), str(replay_id)), None)
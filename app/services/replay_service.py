@@ -1,15 +1,19 @@
-import google.generativeai as genai
-from datetime import datetime
+import json
 import os
+from datetime import datetime
+from typing import Dict, List, Tuple
+
 import requests
 from dotenv import load_dotenv
 
+from app.services.llm_cache import llm_cache, model_name, prompt_key
+from app.services.metrics import LLM_FALLBACKS, registry, stage
+
 # Load environment variables
 load_dotenv()
 
-# Configure Gemini
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-model = genai.GenerativeModel("models/gemini-1.5-flash")
+# Replays go through the shared hedged router (Groq/Gemini with failover)
+from app.db.llama_index_client import llm
 
 # Tag categorization using keywords
 keyword_categories = {
@@ -25,6 +29,10 @@ keyword_categories = {
 }
 
 
+# Reverse geocoding is best effort: past this the replay just says "Unknown location"
+GEOCODE_TIMEOUT_S = float(os.getenv("GEOCODE_TIMEOUT_S", "3"))
+
+
 def get_location_name(latitude: float, longitude: float) -> str:
     try:
         response = requests.get(
@@ -35,7 +43,8 @@ def get_location_name(latitude: float, longitude: float) -> str:
                 "format": "json",
                 "zoom": 10
             },
-            headers={"User-Agent": "mood-reflection-app"}
+            headers={"User-Agent": "mood-reflection-app"},
+            timeout=GEOCODE_TIMEOUT_S,
         )
         if response.status_code == 200:
             data = response.json()
@@ -64,7 +73,55 @@ def score_replay_opportunity(text: str, mood: str) -> float:
     return min(base_score, 1.0)
 
 
-def build_replay(data: dict, context: dict) -> dict:
+def replay_document_for(mood: dict, replay_generated: dict) -> dict:
+    """Replay document stored alongside a mood (same shape /mood-detect writes)."""
+    return {
+        "user_response": mood.get("user_text", ""),
+        "mood": mood.get("mood"),
+        "gem_response": replay_generated.get("ai_response"),
+        "user": mood.get("user"),
+        "is_shown": mood.get("is_shown"),
+        "longitude": mood.get("longitude"),
+        "latitude": mood.get("latitude"),
+        "events": mood.get("events", []),
+        "context_tags": replay_generated.get("context_tags", []),
+        "replay_opportunity_score": str(replay_generated.get("replay_opportunity_score", "0")),
+        "moods": mood["_id"],
+        "location": replay_generated.get("location"),
+        "create_date": mood.get("create_date"),
+        **({"geo": mood["geo"]} if mood.get("geo") else {}),
+    }
+
+
+def replay_context_for(mood: dict) -> dict:
+    return {
+        "mood_today": mood.get("mood"),
+        "user_location": {
+            "lat": mood.get("latitude"),
+            "lng": mood.get("longitude"),
+        },
+        "today_date": mood.get("create_date"),
+    }
+
+
+REPLAY_BATCH_SIZE = int(os.getenv("REPLAY_BATCH_SIZE", "10"))
+
+REPLAY_BATCH_ITEMS = registry.counter(
+    "rewind_replay_batch_items_total", "Replays built by build_replays_batched, by source", ("source",))
+
+REPLAY_INSTRUCTIONS = (
+    "Instructions:\n"
+    "1. Acknowledge the significance of the moment emotionally (based on mood).\n"
+    "2. Mention the location or date if it adds personal or nostalgic weight.\n"
+    "3. Encourage the user to pause, reflect, or emotionally rewind that moment.\n"
+    "4. Keep it personal, thoughtful, and written in a warm and slightly poetic AI tone.\n"
+    "5. Do not repeat the exact user text. Rephrase meaningfully.\n\n"
+)
+FALLBACK_REPLAY_MESSAGE = "Failed to generate reflection due to an internal error."
+
+
+def _prepare_replay(data: dict) -> dict:
+    """Everything build_replay needs besides the LLM call (tags, score, location, prompt)."""
     user_text = data.get("user_text", "")
     mood = data.get("mood", "")
     latitude = data.get("latitude")
@@ -76,9 +133,10 @@ def build_replay(data: dict, context: dict) -> dict:
     replay_opportunity_score = score_replay_opportunity(user_text, mood)
 
     # Get location name
-    location_name = get_location_name(latitude, longitude) if latitude and longitude else "Unknown location"
+    with stage("replay.geocode"):
+        location_name = get_location_name(latitude, longitude) if latitude and longitude else "Unknown location"
 
-    # Prompt to Gemini model
+    # Prompt to the LLM
     prompt = (
         f"You are an emotional reflection assistant for a journaling and memory replay app called REWIND.\n"
         f"Your goal is to generate a warm, emotionally intelligent `replay_message` (1–2 sentences) that encourages the user to reflect on and emotionally reconnect with a specific past memory.\n\n"
@@ -88,24 +146,136 @@ def build_replay(data: dict, context: dict) -> dict:
         f"- Location: {location_name}\n"
         f"- Context tags: {context_tags}\n"
         f"- Date of event: {create_date}\n\n"
-        f"Instructions:\n"
-        f"1. Acknowledge the significance of the moment emotionally (based on mood).\n"
-        f"2. Mention the location or date if it adds personal or nostalgic weight.\n"
-        f"3. Encourage the user to pause, reflect, or emotionally rewind that moment.\n"
-        f"4. Keep it personal, thoughtful, and written in a warm and slightly poetic AI tone.\n"
-        f"5. Do not repeat the exact user text. Rephrase meaningfully.\n\n"
+        f"{REPLAY_INSTRUCTIONS}"
         f"Now generate the `replay_message`."
     )
+    return {
+        "user_text": user_text,
+        "mood": mood,
+        "create_date": create_date,
+        "prompt": prompt,
+        "replay_opportunity_score": replay_opportunity_score,
+        "context_tags": context_tags,
+        "location": location_name,
+    }
 
-    try:
-        response = model.generate_content(prompt)
-        ai_response = response.text.strip() if response else "Here's a reflection opportunity for you."
-    except Exception as e:
-        ai_response = "Failed to generate reflection due to an internal error."
 
+def _replay_result(prepared: dict, ai_response: str) -> dict:
     return {
         "ai_response": ai_response,
-        "replay_opportunity_score": replay_opportunity_score,
-        "context_tags": context_tags,
-        "location": location_name
+        "replay_opportunity_score": prepared["replay_opportunity_score"],
+        "context_tags": prepared["context_tags"],
+        "location": prepared["location"]
     }
+
+
+def _complete_single(prepared: dict) -> str:
+    try:
+        with stage("replay.llm"):
+            text = llm_cache.complete(llm, prepared["prompt"])
+        return text.strip() if text else "Here's a reflection opportunity for you."
+    except Exception as e:
+        LLM_FALLBACKS.inc(route="replay", reason="llm_error")
+        return FALLBACK_REPLAY_MESSAGE
+
+
+def build_replay(data: dict, context: dict) -> dict:
+    prepared = _prepare_replay(data)
+    return _replay_result(prepared, _complete_single(prepared))
+
+
+def template_replay(data: dict, reason: str) -> dict:
+    """
+    build_replay's error reply without the LLM or the geocoder (e.g. when admission control
+    sheds the call): tags and score only, location as already stored on the mood.
+    """
+    LLM_FALLBACKS.inc(route="replay", reason=reason)
+    user_text = data.get("user_text", "")
+    return _replay_result({
+        "replay_opportunity_score": score_replay_opportunity(user_text, data.get("mood", "")),
+        "context_tags": extract_tags(user_text),
+        "location": data.get("location") or "Unknown location",
+    }, FALLBACK_REPLAY_MESSAGE)
+
+
+def _batch_prompt(items: List[Tuple[int, dict]]) -> str:
+    memories = "\n".join(
+        f"[{i}] User memory: '{p['user_text']}' | Mood: {p['mood']} | Location: {p['location']} | "
+        f"Context tags: {p['context_tags']} | Date of event: {p['create_date']}"
+        for i, p in items
+    )
+    return (
+        f"You are an emotional reflection assistant for a journaling and memory replay app called REWIND.\n"
+        f"For EACH memory below, generate a warm, emotionally intelligent `replay_message` (1–2 sentences) that encourages the user to reflect on and emotionally reconnect with that past memory.\n\n"
+        f"Memories:\n{memories}\n\n"
+        f"{REPLAY_INSTRUCTIONS}"
+        f"Respond with ONLY a JSON array, one object per memory: "
+        f'[{{"id": <memory number>, "replay_message": "<text>"}}]'
+    )
+
+
+def _parse_batch(text: str) -> Dict[int, str]:
+    """id -> replay_message from a JSON array reply (tolerates code fences / surrounding prose)."""
+    start, end = text.find("["), text.rfind("]")
+    if start < 0 or end <= start:
+        return {}
+    try:
+        items = json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return {}
+    parsed: Dict[int, str] = {}
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict):
+            continue
+        message = item.get("replay_message")
+        try:
+            item_id = int(item.get("id"))
+        except (TypeError, ValueError):
+            continue
+        if isinstance(message, str) and message.strip():
+            parsed[item_id] = message.strip()
+    return parsed
+
+
+def build_replays_batched(memories: List[dict], batch_size: int = REPLAY_BATCH_SIZE) -> List[dict]:
+    """
+    build_replay for many memories: cached prompts are answered from the LLM cache,
+    the rest go out `batch_size` at a time in one structured call each. Items the
+    batch reply doesn't cover are retried one by one. Batched answers are cached under
+    each item's single-prompt key, so later retries of either path hit the cache.
+    """
+    prepared = [_prepare_replay(m) for m in memories]
+    model = model_name(llm)
+    keys = [prompt_key(model, p["prompt"]) for p in prepared]
+    messages: Dict[int, str] = {}
+
+    pending: List[int] = []
+    for i, key in enumerate(keys):
+        cached = llm_cache.get(key)
+        if cached is not None:
+            messages[i] = cached.strip()
+            REPLAY_BATCH_ITEMS.inc(source="cache")
+        else:
+            pending.append(i)
+
+    for start in range(0, len(pending), batch_size):
+        chunk = pending[start:start + batch_size]
+        try:
+            with stage("replay.llm_batch"):
+                reply = llm.complete(_batch_prompt([(i, prepared[i]) for i in chunk])).text
+            parsed = _parse_batch(reply or "")
+        except Exception as e:
+            print(f"⚠️ Batched replay generation failed, falling back per item: {e}")
+            parsed = {}
+        for i in chunk:
+            if i in parsed:
+                messages[i] = parsed[i]
+                llm_cache.put(keys[i], model, parsed[i])
+                REPLAY_BATCH_ITEMS.inc(source="batch")
+
+    for i in pending:
+        if i not in messages:
+            messages[i] = _complete_single(prepared[i])
+            REPLAY_BATCH_ITEMS.inc(source="single")
+
+    return [_replay_result(p, messages[i]) for i, p in enumerate(prepared)]
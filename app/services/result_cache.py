@@ -0,0 +1,95 @@
+# app/services/result_cache.py
+"""
+Bounded LRU + TTL cache for deterministic model results, with single-flight:
+concurrent callers asking for the same key while it is being computed wait
+for that one computation instead of starting their own.
+
+Keys are a sha256 of the normalized text plus a version string (model +
+backend), so swapping models never serves stale results.
+"""
+import copy
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from app.services.metrics import CACHE_EVENTS, registry
+
+CACHE_SIZE = registry.gauge("rewind_cache_entries", "Entries held per result cache", ("cache",))
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Unicode NFC, collapsed whitespace, trimmed; case is kept since outputs quote the text."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def content_key(text: str, *parts: Any) -> str:
+    h = hashlib.sha256(normalize_text(text).encode("utf-8"))
+    for part in parts:
+        h.update(b"\0" + str(part).encode("utf-8"))
+    return h.hexdigest()
+
+
+class ResultCache:
+    def __init__(self, name: str, maxsize: int = 2048, ttl_s: float = 3600.0):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl_s = ttl_s
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Cached value for `key`, computing it at most once across concurrent callers."""
+        if self.maxsize <= 0:
+            return compute()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                CACHE_EVENTS.inc(cache=self.name, result="hit")
+                return copy.deepcopy(entry[1])
+            if entry is not None:
+                del self._entries[key]
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+
+        if not leader:
+            CACHE_EVENTS.inc(cache=self.name, result="coalesced")
+            return copy.deepcopy(future.result())
+
+        CACHE_EVENTS.inc(cache=self.name, result="miss")
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_s, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            self._inflight.pop(key, None)
+            CACHE_SIZE.set(len(self._entries), cache=self.name)
+        future.set_result(value)
+        return copy.deepcopy(value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            CACHE_SIZE.set(0, cache=self.name)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,246 @@
+# app/services/speech_models.py
+"""
+Vosk model pool keyed by language.
+
+Models live in SPEECH_MODELS_DIR/<language> (e.g. hi, en-us) and are loaded on
+first use, then kept in LRU order. Their footprint is estimated from the model
+directory size; when loading one would exceed SPEECH_MODEL_BUDGET_MB the least
+recently used models are dropped (recognizers still decoding with an evicted
+model keep it alive until they finish). Loads in progress reserve their size up
+front, so concurrent loads of different languages can't overshoot the budget
+together; a load that can't fit next to them waits for them to finish. Every
+load is followed by a short silent decode so the first real request doesn't pay
+for page faults and lazy graph initialisation.
+
+Language: client hint (form field / X-Speech-Language header) if it names a configured
+model, otherwise a cheap first pass - the first SPEECH_DETECT_SECONDS are
+decoded with the model of every SPEECH_DETECT_LANGUAGES language (default: all
+configured ones) and the highest mean word confidence wins. A single candidate
+is scored too: below SPEECH_DETECT_MIN_CONF the clip goes to
+SPEECH_DEFAULT_LANGUAGE instead. Detection reads resident models without
+marking them used; candidates that aren't resident are loaded (list them in
+SPEECH_WARMUP_LANGUAGES, small models, to keep that off the request path).
+
+SPEECH_MODELS_DIR=app/models/speech  SPEECH_DEFAULT_LANGUAGE=hi  SPEECH_MODEL_BUDGET_MB=1024
+SPEECH_WARMUP_LANGUAGES=hi  SPEECH_DETECT_LANGUAGES=  SPEECH_DETECT_SECONDS=3  SPEECH_DETECT_MIN_CONF=0.5
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from vosk import KaldiRecognizer, Model
+
+from app.services.metrics import registry
+
+SAMPLE_RATE = 16000
+
+SPEECH_MODELS_DIR = os.getenv("SPEECH_MODELS_DIR", "app/models/speech")
+SPEECH_DEFAULT_LANGUAGE = os.getenv("SPEECH_DEFAULT_LANGUAGE", "hi")
+SPEECH_MODEL_BUDGET_MB = float(os.getenv("SPEECH_MODEL_BUDGET_MB", "1024"))
+SPEECH_WARMUP_LANGUAGES = [
+    l.strip() for l in os.getenv("SPEECH_WARMUP_LANGUAGES", SPEECH_DEFAULT_LANGUAGE).split(",") if l.strip()
+]
+SPEECH_DETECT_LANGUAGES = [l.strip() for l in os.getenv("SPEECH_DETECT_LANGUAGES", "").split(",") if l.strip()]
+SPEECH_DETECT_SECONDS = float(os.getenv("SPEECH_DETECT_SECONDS", "3"))
+SPEECH_DETECT_MIN_CONF = float(os.getenv("SPEECH_DETECT_MIN_CONF", "0.5"))
+
+MODEL_LOADS = registry.counter(
+    "rewind_speech_model_loads_total", "Vosk models loaded into the pool", ("language",))
+MODEL_EVICTIONS = registry.counter(
+    "rewind_speech_model_evictions_total", "Vosk models evicted to stay within the memory budget", ("language",))
+MODEL_LOAD_SECONDS = registry.histogram(
+    "rewind_speech_model_load_seconds", "Vosk model load + warm-up time", ("language",))
+RESIDENT_BYTES = registry.gauge(
+    "rewind_speech_models_resident_bytes", "Estimated memory held by loaded Vosk models")
+RESIDENT_MODELS = registry.gauge(
+    "rewind_speech_models_resident", "Vosk models currently loaded")
+DETECTIONS = registry.counter(
+    "rewind_speech_language_total", "Transcriptions by language and how it was chosen", ("language", "source"))
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def parse_result(text: str) -> Dict:
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return {}
+
+
+def warm_up(model: Model) -> None:
+    """Push half a second of silence through a throwaway recognizer."""
+    rec = KaldiRecognizer(model, SAMPLE_RATE)
+    rec.AcceptWaveform(b"\x00\x00" * (SAMPLE_RATE // 2))
+    rec.FinalResult()
+
+
+class SpeechModelPool:
+    def __init__(self, models_dir: str = SPEECH_MODELS_DIR, budget_mb: float = SPEECH_MODEL_BUDGET_MB,
+                 default_language: str = SPEECH_DEFAULT_LANGUAGE):
+        self.models_dir = models_dir
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self.default_language = default_language
+        self._models: "OrderedDict[str, Tuple[Model, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        self._loading: Dict[str, threading.Lock] = {}
+        self._reserved: Dict[str, int] = {}  # language -> bytes, loads in progress
+
+    def languages(self) -> List[str]:
+        try:
+            return sorted(d for d in os.listdir(self.models_dir) if os.path.isdir(os.path.join(self.models_dir, d)))
+        except FileNotFoundError:
+            return []
+
+    def resolve(self, hint: Optional[str]) -> Optional[str]:
+        """Configured language for a hint like 'en', 'en-US' or 'hi-IN;q=0.8', else None."""
+        if not hint:
+            return None
+        hint = hint.split(",")[0].split(";")[0].strip().lower().replace("_", "-")
+        available = self.languages()
+        if hint in available:
+            return hint
+        base = hint.split("-")[0]
+        return next((l for l in available if l == base or l.split("-")[0] == base), None)
+
+    def resident(self) -> List[str]:
+        with self._lock:
+            return list(self._models)
+
+    def _detection_model(self, language: str) -> Model:
+        """A resident model without marking it as used; loaded (like get) if it isn't resident."""
+        with self._lock:
+            entry = self._models.get(language)
+        return entry[0] if entry is not None else self.get(language)
+
+    def detection_languages(self) -> List[str]:
+        """Configured languages detection chooses among (SPEECH_DETECT_LANGUAGES, else all)."""
+        if not SPEECH_DETECT_LANGUAGES:
+            return self.languages()
+        return [l for l in dict.fromkeys(self.resolve(h) for h in SPEECH_DETECT_LANGUAGES) if l]
+
+    def get(self, language: str) -> Model:
+        """The model for `language`, loading (and evicting LRU models) if needed."""
+        with self._lock:
+            entry = self._models.get(language)
+            if entry is not None:
+                self._models.move_to_end(language)
+                return entry[0]
+            loading = self._loading.setdefault(language, threading.Lock())
+
+        with loading:  # one load per language; other languages stay available meanwhile
+            with self._lock:
+                entry = self._models.get(language)
+                if entry is not None:
+                    return entry[0]
+            return self._load(language)
+
+    def _load(self, language: str) -> Model:
+        path = os.path.join(self.models_dir, language)
+        if not os.path.isdir(path):
+            raise FileNotFoundError(f"No speech model for language '{language}' in {self.models_dir}")
+        size = _dir_size(path)
+        self._reserve(language, size)
+
+        started = time.perf_counter()
+        try:
+            model = Model(path)
+            warm_up(model)
+        except BaseException:
+            with self._lock:
+                self._release(language)
+            raise
+        MODEL_LOAD_SECONDS.observe(time.perf_counter() - started, language=language)
+        MODEL_LOADS.inc(language=language)
+
+        with self._lock:
+            self._release(language)
+            self._models[language] = (model, size)
+            self._update_gauges()
+        print(f"✅ Loaded speech model '{language}' ({size / 1e6:.0f} MB) in {time.perf_counter() - started:.1f}s")
+        return model
+
+    def _reserve(self, language: str, size: int) -> None:
+        """Make room for `size` bytes (evicting LRU models) and hold it until the load ends."""
+        with self._lock:
+            if size > self.budget_bytes:
+                print(f"⚠️ Speech model ({size / 1e6:.0f} MB) exceeds SPEECH_MODEL_BUDGET_MB on its own")
+            while True:
+                while self._models and self._committed_bytes() + size > self.budget_bytes:
+                    evicted, _ = self._models.popitem(last=False)
+                    MODEL_EVICTIONS.inc(language=evicted)
+                    print(f"♻️ Evicted speech model '{evicted}' to stay within the memory budget")
+                # Fits, or nothing else is loading (an oversized model still loads, alone)
+                if self._committed_bytes() + size <= self.budget_bytes or not self._reserved:
+                    break
+                self._released.wait()  # the rest of the budget is held by loads in progress
+            self._reserved[language] = size
+            self._update_gauges()
+
+    def _release(self, language: str) -> None:
+        """Drop a load's reservation (caller holds the lock)."""
+        self._reserved.pop(language, None)
+        self._released.notify_all()
+
+    def _resident_bytes(self) -> int:
+        return sum(size for _, size in self._models.values())
+
+    def _committed_bytes(self) -> int:
+        return self._resident_bytes() + sum(self._reserved.values())
+
+    def _update_gauges(self) -> None:
+        RESIDENT_BYTES.set(self._resident_bytes())
+        RESIDENT_MODELS.set(len(self._models))
+
+    def detect(self, pcm: bytes, sample_rate: int = SAMPLE_RATE) -> Tuple[Optional[str], float]:
+        """
+        Cheap first pass: decode the clip's first SPEECH_DETECT_SECONDS with each detection
+        language's model; (language with the highest mean word confidence, that confidence).
+        """
+        head = pcm[:int(SPEECH_DETECT_SECONDS * sample_rate) * 2]
+        best, best_conf = None, 0.0
+        for language in self.detection_languages():
+            rec = KaldiRecognizer(self._detection_model(language), sample_rate)
+            rec.SetWords(True)
+            rec.AcceptWaveform(head)
+            words = parse_result(rec.FinalResult()).get("result", [])
+            conf = sum(w.get("conf", 0.0) for w in words) / len(words) if words else 0.0
+            if conf > best_conf:
+                best, best_conf = language, conf
+        return best, best_conf
+
+    def choose(self, hint: Optional[str], pcm: bytes, sample_rate: int = SAMPLE_RATE) -> str:
+        language = self.resolve(hint)
+        source = "hint"
+        if language is None:
+            language, conf = self.detect(pcm, sample_rate)
+            source = "detected"
+            if language is None or conf < SPEECH_DETECT_MIN_CONF:
+                language, source = self.default_language, "default"
+        DETECTIONS.inc(language=language, source=source)
+        return language
+
+    def warm(self, languages: List[str] = SPEECH_WARMUP_LANGUAGES) -> List[str]:
+        """Preload models (startup); unknown languages are skipped."""
+        loaded = []
+        for language in languages:
+            resolved = self.resolve(language)
+            if resolved:
+                self.get(resolved)
+                loaded.append(resolved)
+        return loaded
+
+
+speech_models = SpeechModelPool()
@@ -0,0 +1,45 @@
+# app/services/tracing.py
+"""
+Optional OpenTelemetry span tracing.
+Disabled unless TRACING_ENABLED=true; spans are exported over OTLP/gRPC to a
+local collector (OTEL_EXPORTER_OTLP_ENDPOINT, default http://localhost:4317).
+When disabled, `span()` is a no-op.
+"""
+import os
+from contextlib import contextmanager
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() in ("1", "true", "yes")
+OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4317")
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "rewind-ai")
+
+tracer = None
+
+if TRACING_ENABLED:
+    try:
+        from opentelemetry import trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+
+        provider = TracerProvider(resource=Resource.create({"service.name": SERVICE_NAME}))
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=OTLP_ENDPOINT, insecure=True)))
+        trace.set_tracer_provider(provider)
+        tracer = trace.get_tracer("rewind")
+        print(f"✅ Tracing enabled, exporting spans to {OTLP_ENDPOINT}")
+    except Exception as e:
+        print(f"⚠️ Tracing requested but could not be initialized: {e}")
+        tracer = None
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Open a span as a child of the current one; yields None when tracing is off."""
+    if tracer is None:
+        yield None
+        return
+    with tracer.start_as_current_span(name) as s:
+        for key, value in attributes.items():
+            if value is not None:
+                s.set_attribute(key, value if isinstance(value, (str, bool, int, float)) else str(value))
+        yield s
@@ -0,0 +1,81 @@
+# app/services/vad.py
+"""
+Energy-based voice-activity detection for 16-bit mono PCM (numpy, no model).
+
+Frames of VAD_FRAME_MS are scored by RMS level in dBFS. A frame is speech when
+it is VAD_MARGIN_DB above the clip's noise floor (its quietest decile) and
+above VAD_MIN_DBFS. A clip with no pauses has no noise floor to measure - its
+quietest decile is speech too - so anything at VAD_SPEECH_DBFS or louder always
+counts as speech, whatever the margin says. Speech runs are padded by VAD_PAD_MS, and runs separated
+by less than VAD_MIN_SILENCE_MS are merged. What remains are the segments
+worth decoding. Leading, trailing and long internal silence are dropped, and
+each segment ends at a pause, so the segments can be decoded independently.
+Segments longer than VAD_MAX_SEGMENT_S are split so one long monologue still
+spreads over several decoders.
+
+VAD_ENABLED=true VAD_FRAME_MS=30 VAD_MARGIN_DB=12 VAD_MIN_DBFS=-50 VAD_SPEECH_DBFS=-40
+VAD_PAD_MS=200 VAD_MIN_SILENCE_MS=500 VAD_MAX_SEGMENT_S=15
+"""
+import os
+from typing import List, Tuple
+
+import numpy as np
+
+VAD_ENABLED = os.getenv("VAD_ENABLED", "true").lower() in ("1", "true", "yes")
+VAD_FRAME_MS = int(os.getenv("VAD_FRAME_MS", "30"))
+VAD_MARGIN_DB = float(os.getenv("VAD_MARGIN_DB", "12"))
+VAD_MIN_DBFS = float(os.getenv("VAD_MIN_DBFS", "-50"))
+VAD_SPEECH_DBFS = float(os.getenv("VAD_SPEECH_DBFS", "-40"))
+VAD_PAD_MS = int(os.getenv("VAD_PAD_MS", "200"))
+VAD_MIN_SILENCE_MS = int(os.getenv("VAD_MIN_SILENCE_MS", "500"))
+VAD_MAX_SEGMENT_S = float(os.getenv("VAD_MAX_SEGMENT_S", "15"))
+
+Segment = Tuple[int, int]  # [start, end) in samples
+
+
+def frame_levels(samples: np.ndarray, frame_len: int) -> np.ndarray:
+    """RMS level per frame in dBFS (the last partial frame is zero-padded)."""
+    n_frames = -(-len(samples) // frame_len)
+    frames = np.zeros(n_frames * frame_len, dtype=np.float32)
+    frames[:len(samples)] = samples
+    rms = np.sqrt(np.mean(np.square(frames.reshape(n_frames, frame_len) / 32768.0), axis=1))
+    return 20.0 * np.log10(np.maximum(rms, 1e-10))
+
+
+def speech_segments(pcm: bytes, sample_rate: int) -> List[Segment]:
+    """Sample ranges that contain speech, in order."""
+    samples = np.frombuffer(pcm[:len(pcm) // 2 * 2], dtype=np.int16)
+    if not len(samples):
+        return []
+    frame_len = max(1, sample_rate * VAD_FRAME_MS // 1000)
+    levels = frame_levels(samples, frame_len)
+    threshold = max(min(np.percentile(levels, 10) + VAD_MARGIN_DB, VAD_SPEECH_DBFS), VAD_MIN_DBFS)
+    voiced = levels >= threshold
+    if not voiced.any():
+        return []
+
+    # Runs of voiced frames -> [start, end) frame indices
+    edges = np.diff(np.concatenate(([0], voiced.astype(np.int8), [0])))
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+    pad = VAD_PAD_MS // VAD_FRAME_MS
+    min_gap = VAD_MIN_SILENCE_MS // VAD_FRAME_MS
+    merged: List[List[int]] = []
+    for start, end in zip(starts - pad, ends + pad):
+        start, end = max(0, int(start)), min(len(levels), int(end))
+        if merged and start - merged[-1][1] < min_gap:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+
+    max_frames = max(1, int(VAD_MAX_SEGMENT_S * 1000 // VAD_FRAME_MS))
+    segments: List[Segment] = []
+    for start, end in merged:
+        while end - start > max_frames:
+            # Split at the quietest frame in the back half of the window
+            window = levels[start + max_frames // 2:start + max_frames]
+            cut = start + max_frames // 2 + int(np.argmin(window))
+            segments.append((start * frame_len, cut * frame_len))
+            start = cut
+        segments.append((start * frame_len, min(end * frame_len, len(samples))))
+    return segments
@@ -0,0 +1,130 @@
+# app/services/vector_lifecycle.py
+"""
+Keeps the vector index in step with Mongo: vectors are deleted with their
+source documents (and tombstoned in vector_deletes for app.scripts.reindex's
+catch-up), expired per VECTOR_RETENTION_DAYS, and reported on by
+/index/stats. Compaction (rebuilding the HNSW graph without tombstones) is
+offline: python -m app.scripts.compact_index.
+"""
+import asyncio
+import os
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from app.db.llama_index_client import collection, collection_name, index
+from app.db.mongo_client import db
+from app.db.vector_maintenance import (
+    VECTOR_RETENTION_DAYS, delete_by_source_ids, directory_size, iter_collection, purge_expired,
+    retention_cutoff, vector_created_ts,
+)
+from app.db.vector_store_config import CHROMA_DB_DIR
+
+RETENTION_INTERVAL_S = float(os.getenv("VECTOR_RETENTION_INTERVAL_S", "21600"))
+MONGO_LOOKUP_BATCH = 1000
+
+
+async def delete_vectors(source_ids: Iterable[str]) -> int:
+    """Drop the vectors (and docstore entries) of deleted moods/replays."""
+    source_ids = [str(s) for s in source_ids]
+    if not source_ids:
+        return 0
+    try:
+        # Tombstones let a reindex running right now drop these from its new collection too
+        now = datetime.utcnow()
+        await db.vector_deletes.insert_many([{"source_id": s, "deleted_at": now} for s in source_ids])
+    except Exception as e:
+        print(f"⚠️ Failed to record vector deletes for reindex catch-up: {e}")
+    deleted = await asyncio.to_thread(delete_by_source_ids, collection, source_ids)
+    # The docstore only holds refresh_ref_docs hashes here (Chroma stores the text)
+    for source_id in source_ids:
+        for prefix in ("mood", "replay"):
+            index.docstore.delete_document(f"{prefix}-{source_id}", raise_error=False)
+    print(f"🗑️ Deleted {deleted} vectors for {len(source_ids)} source documents")
+    return deleted
+
+
+async def purge_expired_vectors() -> int:
+    deleted = await asyncio.to_thread(purge_expired, collection, retention_cutoff())
+    if deleted:
+        print(f"🗑️ Retention: deleted {deleted} vectors older than {VECTOR_RETENTION_DAYS:g} days")
+    return deleted
+
+
+async def retention_loop(interval_s: float = RETENTION_INTERVAL_S) -> None:
+    """Background task started at app startup when VECTOR_RETENTION_DAYS > 0."""
+    while True:
+        try:
+            await purge_expired_vectors()
+        except Exception as e:
+            print(f"❌ Vector retention pass failed: {e}")
+        await asyncio.sleep(interval_s)
+
+
+async def _existing_ids(collection_name_: str, source_ids: Set[str]) -> Set[str]:
+    """Which of `source_ids` still exist in Mongo collection `collection_name_`."""
+    object_ids: List[ObjectId] = []
+    for source_id in source_ids:
+        try:
+            object_ids.append(ObjectId(source_id))
+        except (InvalidId, TypeError):
+            pass
+    found: Set[str] = set()
+    for i in range(0, len(object_ids), MONGO_LOOKUP_BATCH):
+        batch = object_ids[i:i + MONGO_LOOKUP_BATCH]
+        async for doc in db[collection_name_].find({"_id": {"$in": batch}}, {"_id": 1}):
+            found.add(str(doc["_id"]))
+    return found
+
+
+def _scan(user_id: Optional[str]) -> Dict:
+    cutoff = retention_cutoff()
+    per_user: Counter = Counter()
+    per_source: Counter = Counter()
+    source_type: Dict[str, str] = {}
+    expired = 0
+    for page in iter_collection(collection, include=["metadatas"]):
+        for metadata in page["metadatas"]:
+            metadata = metadata or {}
+            owner = metadata.get("user_id") or "unknown"
+            if user_id and owner != user_id:
+                continue
+            per_user[owner] += 1
+            source_id = str(metadata.get("source_id"))
+            per_source[source_id] += 1
+            source_type[source_id] = metadata.get("type") or "mood"
+            if cutoff is not None:
+                ts = vector_created_ts(metadata)
+                if ts is not None and ts < cutoff:
+                    expired += 1
+    return {"per_user": per_user, "per_source": per_source, "source_type": source_type, "expired": expired}
+
+
+async def index_stats(user_id: Optional[str] = None, top: int = 50) -> Dict:
+    """Vector counts per user, orphans (source gone from Mongo), expired vectors and disk usage."""
+    scan = await asyncio.to_thread(_scan, user_id)
+    per_source: Counter = scan["per_source"]
+
+    orphan_sources: List[str] = []
+    for kind, mongo_collection in (("mood", "moods"), ("replay", "replays")):
+        ids = {s for s, t in scan["source_type"].items() if t == kind}
+        existing = await _existing_ids(mongo_collection, ids)
+        orphan_sources.extend(ids - existing)
+
+    return {
+        "collection": collection_name,
+        "vectors": sum(scan["per_user"].values()),
+        "documents": len(per_source),
+        "users": dict(scan["per_user"].most_common(top)),
+        "user_count": len(scan["per_user"]),
+        "orphans": {
+            "documents": len(orphan_sources),
+            "vectors": sum(per_source[s] for s in orphan_sources),
+        },
+        "retention_days": VECTOR_RETENTION_DAYS or None,
+        "expired_vectors": scan["expired"],
+        "disk_bytes": await asyncio.to_thread(directory_size, CHROMA_DB_DIR),
+    }
@@ -0,0 +1,284 @@
+# benchmarks/harness.py
+"""
+Boots the FastAPI app in-process against the local stand-ins and drives
+routes at a fixed concurrency, collecting latency percentiles.
+"""
+import asyncio
+import io
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+from benchmarks.standins import (
+    FakeLLM, FakeRequests, TemporaryMongod,
+    fake_llm_module, fake_translator, in_memory_motor_client, set_fake_credentials,
+)
+
+SAMPLE_TEXTS = [
+    "I missed my best friend's birthday party yesterday and I feel terrible about it.",
+    "We finally went on the Goa trip with my family, the beach at sunset was magical.",
+    "Got the promotion at work today! My boss said the project was a huge success.",
+    "Failed my exam again, I studied so hard and still couldn't pass.",
+    "Played cricket with my son in the park, he scored his first half century.",
+    "Feeling lonely tonight, the house is so quiet since mom moved back home.",
+    "Started yoga and meditation this week, my mental health feels a bit better.",
+    "Remember our college trek to the hill station? I was thinking about it all day.",
+]
+SAMPLE_QUERIES = [
+    "when was I last happy?",
+    "tell me about my trip to goa",
+    "did I ever feel proud about work",
+    "what made me sad last month",
+]
+
+
+@dataclass
+class BenchOptions:
+    mongo: str = "memory"            # "memory" | "mongod"
+    llm_latency: float = 0.05
+    llm_jitter: float = 0.0
+    llm_providers: int = 1           # 2 = a second, independently jittered provider to hedge against
+    geo_latency: float = 0.02
+    translate_latency: float = 0.02
+    seed_moods: int = 50
+    audio_path: Optional[str] = None
+
+
+@dataclass
+class BenchContext:
+    app: object
+    db: object
+    user_id: str
+    audio: bytes
+    cleanup: List[Callable[[], None]] = field(default_factory=list)
+
+
+# ----------------------------- Boot ---------------------------------
+async def boot(opts: BenchOptions) -> BenchContext:
+    """Import the app with every network dependency replaced by a stand-in."""
+    set_fake_credentials(opts.llm_providers)
+    os.environ.setdefault("HF_HUB_OFFLINE", "1")
+    os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+    os.environ["MONGO_DB_NAME"] = "rewind_bench"
+    chroma_dir = tempfile.mkdtemp(prefix="rewind-bench-chroma-")
+    os.environ["CHROMA_DB_DIR"] = chroma_dir
+
+    cleanup: List[Callable[[], None]] = []
+    if opts.mongo == "memory":
+        # The in-memory stand-in is motor-only; the blocking pymongo LLM cache has nothing to talk to
+        os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+    if opts.mongo == "mongod":
+        mongod = TemporaryMongod().start()
+        os.environ["MONGO_URI"] = mongod.uri
+        cleanup.append(mongod.stop)
+
+    primary = FakeLLM(latency_s=opts.llm_latency, jitter_s=opts.llm_jitter, seed=1)
+    secondary = FakeLLM(latency_s=opts.llm_latency, jitter_s=opts.llm_jitter, seed=2)
+    sys.modules["llama_index.llms.gemini"] = fake_llm_module("Gemini", primary)
+    sys.modules["llama_index.llms.groq"] = fake_llm_module("Groq", secondary)
+
+    from app.db import mongo_client
+    if opts.mongo == "memory":
+        mongo_client.client = in_memory_motor_client()
+        mongo_client.db = mongo_client.client[mongo_client.MONGO_DB_NAME]
+
+    from app.services import replay_service
+    replay_service.requests = FakeRequests(opts.geo_latency)
+
+    from app.api import routes_transcribe
+    routes_transcribe.GoogleTranslator = fake_translator(opts.translate_latency)
+
+    from app.main import app
+    await app.router.startup()
+
+    db = mongo_client.db
+    user_id = await seed(db, opts.seed_moods)
+    audio = open(opts.audio_path, "rb").read() if opts.audio_path else synth_wav()
+    return BenchContext(app=app, db=db, user_id=user_id, audio=audio, cleanup=cleanup)
+
+
+async def seed(db, n_moods: int) -> str:
+    user = await db.users.insert_one({"username": "bench", "country": "IN"})
+    now = datetime.utcnow()
+    moods = [{
+        "user_text": SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)],
+        "mood": ["joy", "sadness", "love", "anger", "fear", "surprise"][i % 6],
+        "user": user.inserted_id,
+        "latitude": 19.07 + i * 0.001,
+        "longitude": 72.87 + i * 0.001,
+        "events": [],
+        "context_tags": ["friend", "birthday"] if i % 2 else ["trip"],
+        "replay_opportunity_score": "0.5",
+        "create_date": now - timedelta(hours=i),
+    } for i in range(n_moods)]
+    if moods:
+        result = await db.moods.insert_many(moods)
+        await db.replays.insert_many([{
+            "gem_response": f"A gentle look back at: {m['user_text']}",
+            "user_response": m["user_text"],
+            "user": user.inserted_id,
+            "moods": mood_id,
+            "context_tags": m["context_tags"],
+            "replay_opportunity_score": "0.5",
+            "location": "Benchmark Town",
+            "create_date": m["create_date"],
+        } for m, mood_id in zip(moods, result.inserted_ids)])
+    return str(user.inserted_id)
+
+
+def synth_wav(seconds: float = 5.0, rate: int = 16000) -> bytes:
+    """Mono 16 kHz clip: 1 s silence, voiced-ish tone + noise, 1 s silence."""
+    t = np.arange(int(seconds * rate)) / rate
+    rng = np.random.default_rng(0)
+    signal = 0.3 * np.sin(2 * np.pi * 220 * t) + 0.05 * rng.standard_normal(t.size)
+    signal[(t < 1.0) | (t > seconds - 1.0)] = 0.0
+    pcm = (signal * 32767).astype("<i2").tobytes()
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(pcm)
+    return buf.getvalue()
+
+
+# ---------------------------- Scenarios -----------------------------
+Scenario = Callable[[object, int, BenchContext], Awaitable[object]]
+
+
+async def _analyze(client, i, ctx):
+    return await client.post("/api/analyze", json={"text": SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)]})
+
+
+async def _detect_mood(client, i, ctx):
+    return await client.post("/api/detect-mood/text", json={"text": SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)]})
+
+
+async def _mood_detect(client, i, ctx):
+    return await client.post("/api/mood-detect", json={
+        "user_text": SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)],
+        "audio_file": None,
+        "mood": "joy",
+        "ai_response": None,
+        "user": ctx.user_id,
+        "latitude": 19.07,
+        "longitude": 72.87,
+    })
+
+
+async def _mood_detect_bulk(client, i, ctx, size: int = 10):
+    return await client.post("/api/mood-detect/bulk", json=[{
+        "user_text": SAMPLE_TEXTS[(i + k) % len(SAMPLE_TEXTS)],
+        "audio_file": None,
+        "mood": "joy",
+        "ai_response": None,
+        "user": ctx.user_id,
+        "latitude": 19.07,
+        "longitude": 72.87,
+    } for k in range(size)])
+
+
+async def _user_replay(client, i, ctx):
+    return await client.post("/api/user-replay", json={
+        "gem_response": f"A gentle look back at: {SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)]}",
+        "user_response": SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)],
+        "location": "Benchmark Town",
+        "user": ctx.user_id,
+        "moods": "0" * 24,
+    })
+
+
+async def _search(client, i, ctx):
+    return await client.post("/api/search-memories", json={
+        "user_id": ctx.user_id, "query": SAMPLE_QUERIES[i % len(SAMPLE_QUERIES)],
+    })
+
+
+async def _index(client, i, ctx):
+    return await client.post("/api/index-user-data", json={"user_id": ctx.user_id})
+
+
+async def _transcribe(client, i, ctx):
+    files = {"file": ("clip.wav", ctx.audio, "audio/wav")}
+    return await client.post("/api/transcribe/", files=files)
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "analyze": _analyze,
+    "detect_mood": _detect_mood,
+    "mood_detect": _mood_detect,
+    "mood_detect_bulk": _mood_detect_bulk,
+    "user_replay": _user_replay,
+    "search_memories": _search,
+    "index_user_data": _index,
+    "transcribe": _transcribe,
+}
+
+
+# ---------------------------- Load driver ---------------------------
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile on an already sorted list."""
+    if not sorted_values:
+        return float("nan")
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: List[float], errors: int, wall: float) -> Dict[str, float]:
+    lat = sorted(latencies)
+    ms = lambda v: round(v * 1000.0, 2)
+    return {
+        "requests": len(lat) + errors,
+        "errors": errors,
+        "throughput_rps": round(len(lat) / wall, 2) if wall > 0 else 0.0,
+        "mean_ms": ms(sum(lat) / len(lat)) if lat else float("nan"),
+        "p50_ms": ms(percentile(lat, 50)),
+        "p95_ms": ms(percentile(lat, 95)),
+        "p99_ms": ms(percentile(lat, 99)),
+    }
+
+
+async def run_scenario(client, scenario: Scenario, ctx: BenchContext,
+                       total: int, concurrency: int, warmup: int = 2) -> Dict[str, float]:
+    for i in range(warmup):
+        await scenario(client, i, ctx)
+
+    latencies: List[float] = []
+    errors = 0
+    next_i = 0
+
+    async def worker():
+        nonlocal next_i, errors
+        while next_i < total:
+            i = next_i
+            next_i += 1
+            start = time.perf_counter()
+            try:
+                response = await scenario(client, i, ctx)
+                ok = response.status_code < 400
+            except Exception:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return "unknown"
@@ -0,0 +1,159 @@
+# benchmarks/hnsw_sweep.py
+"""
+HNSW recall / latency sweep for the vector collection.
+
+    python -m benchmarks.hnsw_sweep --synthetic 50000 --dim 384 --m 8,16,32 --search-ef 10,50,100,200
+    python -m benchmarks.hnsw_sweep --export --queries 500 --k 3,10 --save hnsw.json   # active collection's vectors
+
+For every (space, M, construction ef) an in-memory Chroma collection is built
+from the corpus; then for every search ef each query is run one at a time and
+compared with exact (brute-force numpy) search in the same space. Reports
+recall@k, p50/p95 query latency and build time, so HNSW_* / SEARCH_TOP_K can
+be chosen from data. With --export the queries are held out of the corpus.
+"""
+import argparse
+import json
+import time
+import uuid
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+def _ints(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Sweep HNSW settings for recall@k vs query latency")
+    src = p.add_mutually_exclusive_group()
+    src.add_argument("--synthetic", type=int, default=20000, help="synthetic clustered corpus of N vectors")
+    src.add_argument("--export", action="store_true", help="use the active collection's stored embeddings")
+    p.add_argument("--limit", type=int, default=100000, help="max vectors taken from --export")
+    p.add_argument("--dim", type=int, default=384, help="synthetic vector dimension (bge-small: 384)")
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--k", default="3,10", help="comma list of k for recall@k")
+    p.add_argument("--space", default="l2", help="comma list of l2,cosine,ip")
+    p.add_argument("--m", default="16", help="comma list of HNSW M (max_neighbors)")
+    p.add_argument("--construction-ef", default="100")
+    p.add_argument("--search-ef", default="10,25,50,100,200")
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--save", help="write results JSON here")
+    return p.parse_args(argv)
+
+
+def synthetic_corpus(n: int, dim: int, n_queries: int, seed: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Normalized vectors around a few hundred topic centroids (sentence embeddings cluster)."""
+    rng = np.random.default_rng(seed)
+    centroids = rng.normal(size=(max(1, n // 200), dim))
+    def sample(count: int) -> np.ndarray:
+        picks = centroids[rng.integers(len(centroids), size=count)]
+        vectors = picks + rng.normal(scale=0.6, size=(count, dim))
+        return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+    return sample(n), sample(n_queries)
+
+
+def exported_corpus(limit: int, n_queries: int, seed: int) -> Tuple[np.ndarray, np.ndarray]:
+    from chromadb import PersistentClient
+
+    from app.db.vector_maintenance import iter_collection
+    from app.db.vector_store_config import CHROMA_DB_DIR, active_collection_name
+
+    collection = PersistentClient(path=CHROMA_DB_DIR).get_collection(active_collection_name())
+    chunks = []
+    for page in iter_collection(collection, include=["embeddings"]):
+        chunks.append(np.asarray(page["embeddings"], dtype=np.float32))
+        if sum(len(c) for c in chunks) >= limit:
+            break
+    vectors = np.concatenate(chunks)[:limit]
+    if len(vectors) <= n_queries:
+        raise SystemExit(f"Only {len(vectors)} vectors in '{collection.name}'; need more than --queries")
+    order = np.random.default_rng(seed).permutation(len(vectors))
+    return vectors[order[n_queries:]], vectors[order[:n_queries]]
+
+
+def exact_neighbors(corpus: np.ndarray, queries: np.ndarray, space: str, k: int) -> np.ndarray:
+    """Indices of the true top-k under Chroma's distance for `space`."""
+    if space == "cosine":
+        c = corpus / np.linalg.norm(corpus, axis=1, keepdims=True)
+        q = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+        distances = -(q @ c.T)
+    elif space == "ip":
+        distances = -(queries @ corpus.T)
+    else:
+        distances = (queries ** 2).sum(1)[:, None] - 2 * queries @ corpus.T + (corpus ** 2).sum(1)[None, :]
+    top = np.argpartition(distances, k, axis=1)[:, :k]
+    return np.take_along_axis(top, np.argsort(np.take_along_axis(distances, top, axis=1), axis=1), axis=1)
+
+
+def build(client, corpus: np.ndarray, space: str, m: int, construction_ef: int, search_ef: int):
+    from app.db.vector_store_config import hnsw_configuration
+
+    collection = client.create_collection(
+        f"sweep-{uuid.uuid4().hex[:8]}", configuration=hnsw_configuration(space, m, construction_ef, search_ef))
+    batch = 5000
+    for start in range(0, len(corpus), batch):
+        chunk = corpus[start:start + batch]
+        collection.add(ids=[str(i) for i in range(start, start + len(chunk))], embeddings=chunk)
+    return collection
+
+
+def measure(collection, queries: np.ndarray, truth: Dict[int, np.ndarray], k_max: int) -> Dict:
+    latencies, hits = [], {k: 0.0 for k in truth}
+    for i, query in enumerate(queries):
+        started = time.perf_counter()
+        result = collection.query(query_embeddings=[query], n_results=k_max, include=[])
+        latencies.append(time.perf_counter() - started)
+        found = [int(x) for x in result["ids"][0]]
+        for k, expected in truth.items():
+            hits[k] += len(set(found[:k]) & set(expected[i].tolist())) / k
+    ms = np.asarray(latencies) * 1000
+    return {
+        **{f"recall@{k}": round(h / len(queries), 4) for k, h in hits.items()},
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+    }
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    import chromadb
+
+    ks = _ints(args.k)
+    if args.export:
+        corpus, queries = exported_corpus(args.limit, args.queries, args.seed)
+    else:
+        corpus, queries = synthetic_corpus(args.synthetic, args.dim, args.queries, args.seed)
+    print(f"📐 corpus {corpus.shape}, {len(queries)} queries, k={ks}")
+
+    client = chromadb.EphemeralClient()
+    results = []
+    print(f"{'space':7} {'M':>4} {'c_ef':>5} {'s_ef':>5} " + " ".join(f"{'R@' + str(k):>7}" for k in ks)
+          + f" {'p50 ms':>8} {'p95 ms':>8} {'build s':>8}")
+    for space in [s.strip() for s in args.space.split(",") if s.strip()]:
+        truth = {k: exact_neighbors(corpus, queries, space, k) for k in ks}
+        for m in _ints(args.m):
+            for construction_ef in _ints(args.construction_ef):
+                search_efs = _ints(args.search_ef)
+                started = time.perf_counter()
+                collection = build(client, corpus, space, m, construction_ef, search_efs[0])
+                build_s = round(time.perf_counter() - started, 2)
+                for search_ef in search_efs:
+                    collection.modify(configuration={"hnsw": {"ef_search": search_ef}})
+                    row = {"space": space, "m": m, "construction_ef": construction_ef, "search_ef": search_ef,
+                           "build_s": build_s, **measure(collection, queries, truth, max(ks))}
+                    results.append(row)
+                    print(f"{space:7} {m:>4} {construction_ef:>5} {search_ef:>5} "
+                          + " ".join(f"{row[f'recall@{k}']:>7.3f}" for k in ks)
+                          + f" {row['p50_ms']:>8} {row['p95_ms']:>8} {build_s:>8}")
+                client.delete_collection(collection.name)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"corpus": list(corpus.shape), "queries": len(queries), "results": results}, f, indent=2)
+        print(f"💾 Saved {args.save}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,51 @@
+# benchmarks/micro.py
+"""
+Micro-benchmarks for the hot pure-Python helpers on the request path.
+Must run after harness.boot() since the helpers live in modules that load the app.
+"""
+import timeit
+from datetime import datetime, timedelta
+from typing import Callable, Dict
+
+from bson import ObjectId
+
+from benchmarks.harness import SAMPLE_QUERIES, SAMPLE_TEXTS
+
+
+def _time(fn: Callable[[], object], number: int, repeat: int = 5) -> Dict[str, float]:
+    runs = timeit.Timer(fn).repeat(repeat=repeat, number=number)
+    per_call = [r / number * 1e6 for r in runs]
+    return {
+        "calls": number * repeat,
+        "best_us": round(min(per_call), 3),
+        "median_us": round(sorted(per_call)[len(per_call) // 2], 3),
+    }
+
+
+def run_micro(number: int = 2000) -> Dict[str, Dict[str, float]]:
+    from app.services.crisis_guard import guard_message
+    from app.api.routes_index import classify_intent
+    from app.services.indexing_service import format_for_indexing
+
+    benign = SAMPLE_TEXTS[0]
+    crisis = "I want to kill myself, I can't go on"
+    user_id = str(ObjectId())
+    now = datetime.utcnow()
+    moods = [{
+        "_id": ObjectId(), "user_text": SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)], "mood": "joy",
+        "latitude": 19.07, "longitude": 72.87, "context_tags": ["friend", "trip"],
+        "replay_opportunity_score": "0.5", "create_date": now - timedelta(days=i),
+    } for i in range(50)]
+    replays = [{
+        "_id": ObjectId(), "gem_response": "A gentle look back.", "user_response": m["user_text"],
+        "moods": m["_id"], "context_tags": m["context_tags"], "location": "Benchmark Town",
+        "replay_opportunity_score": "0.5", "create_date": m["create_date"],
+    } for m in moods]
+
+    return {
+        "guard_message.benign": _time(lambda: guard_message(benign, user_id=None), number),
+        "guard_message.crisis": _time(lambda: guard_message(crisis, user_id=None), number),
+        "classify_intent.greeting": _time(lambda: classify_intent("hello there"), number),
+        "classify_intent.other": _time(lambda: classify_intent(SAMPLE_QUERIES[0]), number),
+        "format_for_indexing.100_docs": _time(lambda: format_for_indexing(user_id, moods, replays), max(1, number // 20)),
+    }
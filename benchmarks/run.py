@@ -0,0 +1,128 @@
+# benchmarks/run.py
+"""
+Offline benchmark / load-test runner.
+
+    python -m benchmarks.run --scenarios analyze,search_memories --concurrency 1,8 --requests 200 \
+        --save benchmarks/baselines/$(git rev-parse --short HEAD).json --compare benchmarks/baselines/main.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from benchmarks.standins import default_mongo_mode
+
+
+def parse_args(argv=None):
+    from benchmarks.harness import SCENARIOS
+    p = argparse.ArgumentParser(description="Rewind API offline benchmarks")
+    p.add_argument("--scenarios", default="all", help=f"comma list of {','.join(SCENARIOS)} or 'all'/'none'")
+    p.add_argument("--concurrency", default="1,8", help="comma list of concurrency levels")
+    p.add_argument("--requests", type=int, default=100, help="requests per scenario and concurrency level")
+    p.add_argument("--warmup", type=int, default=2)
+    p.add_argument("--mongo", choices=["memory", "mongod"], default=default_mongo_mode())
+    p.add_argument("--llm-latency", type=float, default=0.05, help="fake LLM latency (s)")
+    p.add_argument("--llm-jitter", type=float, default=0.0, help="extra deterministic LLM latency, up to N s")
+    p.add_argument("--llm-providers", type=int, choices=[1, 2], default=1,
+                   help="2 adds a second fake provider so hedging/failover can be measured")
+    p.add_argument("--geo-latency", type=float, default=0.02, help="fake Nominatim latency (s)")
+    p.add_argument("--translate-latency", type=float, default=0.02, help="fake translator latency (s)")
+    p.add_argument("--seed-moods", type=int, default=50)
+    p.add_argument("--audio", help="audio clip for /transcribe (default: synthetic 5 s wav)")
+    p.add_argument("--micro", action="store_true", help="also run micro-benchmarks")
+    p.add_argument("--micro-number", type=int, default=2000)
+    p.add_argument("--save", help="write results JSON here")
+    p.add_argument("--compare", help="baseline JSON to compare against")
+    p.add_argument("--max-regression", type=float, default=0.10,
+                   help="fail if p95 or throughput regresses by more than this fraction (with --compare)")
+    return p.parse_args(argv)
+
+
+def compare(current: Dict, baseline: Dict, max_regression: float) -> bool:
+    """Print a delta table; return False if any scenario regressed past the threshold."""
+    ok = True
+    print(f"\nComparison vs {baseline.get('meta', {}).get('commit', '?')}:")
+    print(f"{'scenario':32} {'metric':16} {'baseline':>10} {'current':>10} {'delta':>8}")
+    for section in ("scenarios", "micro"):
+        for name, cur in current.get(section, {}).items():
+            base = baseline.get(section, {}).get(name)
+            if not base:
+                continue
+            metrics = ("throughput_rps", "p50_ms", "p95_ms", "p99_ms") if section == "scenarios" else ("median_us",)
+            for metric in metrics:
+                b, c = base.get(metric), cur.get(metric)
+                if not b or c is None:
+                    continue
+                delta = (c - b) / b
+                higher_is_better = metric == "throughput_rps"
+                regressed = (-delta if higher_is_better else delta) > max_regression
+                if regressed and metric in ("throughput_rps", "p95_ms", "median_us"):
+                    ok = False
+                flag = "  ⚠️" if regressed else ""
+                print(f"{name:32} {metric:16} {b:>10} {c:>10} {delta:>+8.1%}{flag}")
+    return ok
+
+
+async def main(argv=None) -> int:
+    args = parse_args(argv)
+    from benchmarks.harness import SCENARIOS, BenchOptions, boot, git_commit, run_scenario
+    import httpx
+
+    opts = BenchOptions(
+        mongo=args.mongo, llm_latency=args.llm_latency, llm_jitter=args.llm_jitter,
+        llm_providers=args.llm_providers,
+        geo_latency=args.geo_latency, translate_latency=args.translate_latency,
+        seed_moods=args.seed_moods, audio_path=args.audio,
+    )
+    ctx = await boot(opts)
+    names = {"all": list(SCENARIOS), "none": []}.get(args.scenarios, [s for s in args.scenarios.split(",") if s])
+    levels = [int(c) for c in args.concurrency.split(",") if c]
+
+    results: Dict = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "cpu_count": os.cpu_count(),
+            "options": vars(args),
+        },
+        "scenarios": {},
+    }
+    try:
+        transport = httpx.ASGITransport(app=ctx.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+            for name in names:
+                for level in levels:
+                    key = f"{name}@c{level}"
+                    stats = await run_scenario(client, SCENARIOS[name], ctx, args.requests, level, args.warmup)
+                    results["scenarios"][key] = stats
+                    print(f"{key:28} {stats['throughput_rps']:>8} rps  p50 {stats['p50_ms']:>8} ms  "
+                          f"p95 {stats['p95_ms']:>8} ms  p99 {stats['p99_ms']:>8} ms  errors {stats['errors']}")
+        if args.micro:
+            from benchmarks.micro import run_micro
+            results["micro"] = run_micro(args.micro_number)
+            for name, stats in results["micro"].items():
+                print(f"{name:32} median {stats['median_us']:>10} µs  best {stats['best_us']:>10} µs")
+    finally:
+        for fn in ctx.cleanup:
+            fn()
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2, default=str)
+        print(f"💾 Saved results to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if not compare(results, baseline, args.max_regression):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
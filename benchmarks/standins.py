@@ -0,0 +1,163 @@
+# benchmarks/standins.py
+"""
+Local stand-ins for every network dependency the API talks to, so the
+benchmark suite can run fully offline:
+- Mongo       -> temporary `mongod` (if on PATH) or in-memory mongomock-motor
+- LLM         -> deterministic FakeLLM providers with configurable latency
+- Nominatim   -> FakeRequests returning a fixed reverse-geocode payload
+- Translation -> FakeTranslator (identity translation after a delay)
+Local models (BERT, spaCy, bge embeddings, Vosk) are the real ones; run with
+HF_HUB_OFFLINE=1 once they are cached.
+"""
+import hashlib
+import os
+import random
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Any, Optional
+
+from llama_index.core.base.llms.types import CompletionResponse
+from llama_index.core.llms.callbacks import llm_completion_callback
+from llama_index.core.llms.mock import MockLLM
+
+
+# ------------------------------ LLM ---------------------------------
+class FakeLLM(MockLLM):
+    """Deterministic llama_index LLM: the reply depends only on the prompt."""
+    latency_s: float = 0.0
+    jitter_s: float = 0.0
+    seed: int = 0
+
+    def __init__(self, latency_s: float = 0.0, jitter_s: float = 0.0, seed: int = 0, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+        self.seed = seed
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "FakeLLM"
+
+    def _sleep(self, prompt: str) -> None:
+        delay = self.latency_s
+        if self.jitter_s:
+            digest = int(hashlib.sha1(f"{self.seed}:{prompt}".encode()).hexdigest()[:8], 16)
+            delay += random.Random(digest).uniform(0, self.jitter_s)
+        if delay > 0:
+            time.sleep(delay)
+
+    def reply_for(self, prompt: str) -> str:
+        digest = hashlib.sha1(prompt.encode()).hexdigest()[:8]
+        return f"I remember that moment with you 🌼 (ref {digest})"
+
+    @llm_completion_callback()
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        self._sleep(prompt)
+        return CompletionResponse(text=self.reply_for(prompt))
+
+
+def fake_llm_module(class_name: str, llm: FakeLLM):
+    """Drop-in for `llama_index.llms.<provider>` so no network call happens at import."""
+    return SimpleNamespace(**{class_name: lambda *args, **kwargs: llm})
+
+
+# --------------------------- Nominatim ------------------------------
+class FakeRequests:
+    """Only implements requests.get() as used by replay_service.get_location_name."""
+
+    def __init__(self, latency_s: float = 0.0):
+        self.latency_s = latency_s
+
+    def get(self, url: str, params: Optional[dict] = None, headers: Optional[dict] = None, **kwargs):
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        params = params or {}
+        payload = {"display_name": f"Benchmark Town ({params.get('lat')}, {params.get('lon')})"}
+        return SimpleNamespace(status_code=200, json=lambda: payload)
+
+
+# --------------------------- Translation ----------------------------
+def fake_translator(latency_s: float = 0.0):
+    class FakeTranslator:
+        def __init__(self, source: str = "auto", target: str = "en"):
+            self.source = source
+            self.target = target
+
+        def translate(self, text: str) -> str:
+            if latency_s:
+                time.sleep(latency_s)
+            return text
+
+    return FakeTranslator
+
+
+# ------------------------------ Mongo --------------------------------
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class TemporaryMongod:
+    """Throwaway mongod on a random port with a temp dbpath."""
+
+    def __init__(self, binary: str = "mongod"):
+        self.binary = shutil.which(binary)
+        if not self.binary:
+            raise RuntimeError(f"{binary} not found on PATH")
+        self.dbpath = tempfile.mkdtemp(prefix="rewind-bench-mongo-")
+        self.port = _free_port()
+        self.proc: Optional[subprocess.Popen] = None
+
+    @property
+    def uri(self) -> str:
+        return f"mongodb://127.0.0.1:{self.port}"
+
+    def start(self, timeout: float = 20.0) -> "TemporaryMongod":
+        self.proc = subprocess.Popen(
+            [self.binary, "--dbpath", self.dbpath, "--port", str(self.port), "--bind_ip", "127.0.0.1", "--quiet"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            try:
+                with socket.create_connection(("127.0.0.1", self.port), timeout=0.5):
+                    return self
+            except OSError:
+                time.sleep(0.2)
+        self.stop()
+        raise RuntimeError("mongod did not start in time")
+
+    def stop(self) -> None:
+        if self.proc and self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+        shutil.rmtree(self.dbpath, ignore_errors=True)
+
+
+def in_memory_motor_client():
+    """mongomock-motor client (optional: pip install mongomock-motor)."""
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError as e:
+        raise RuntimeError("In-memory Mongo needs `pip install mongomock-motor` (or use --mongo mongod)") from e
+    return AsyncMongoMockClient()
+
+
+def default_mongo_mode() -> str:
+    return "mongod" if shutil.which("mongod") else "memory"
+
+
+def set_fake_credentials(providers: int = 1) -> None:
+    """The app refuses to start without an LLM key; the stand-ins never use it."""
+    os.environ["GEMINI_API_KEY"] = "benchmark-offline"
+    # Empty rather than unset so load_dotenv() can't bring a real key back
+    os.environ["GROQ_API_KEY"] = "benchmark-offline" if providers > 1 else ""
+    os.environ["LLM_PROVIDER_ORDER"] = "gemini,groq"
@@ -0,0 +1,157 @@
+import threading
+import time
+
+import pytest
+from llama_index.core.base.llms.types import CompletionResponse, LLMMetadata
+from llama_index.core.llms.custom import CustomLLM
+
+from app.services import llm_router
+from app.services.llm_router import CLOSED, HALF_OPEN, OPEN, BreakerOpen, CircuitBreaker, HedgedLLM, Provider
+
+
+class FakeLLM(CustomLLM):
+    """Answers `text` after `delay` seconds (or raises if fail=True); records when each call started."""
+
+    text: str = ""
+    delay: float = 0.0
+    fail: bool = False
+    started: list = []
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(model_name=self.text)
+
+    def complete(self, prompt, formatted=False, **kwargs):
+        self.started.append(time.perf_counter())
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.text} failed")
+        return CompletionResponse(text=self.text)
+
+    def stream_complete(self, prompt, formatted=False, **kwargs):
+        raise NotImplementedError
+
+
+@pytest.fixture(autouse=True)
+def fixed_hedge_delay(monkeypatch):
+    # No latency history yet, so every provider hedges after the default delay
+    monkeypatch.setattr(llm_router, "HEDGE_DEFAULT_DELAY_S", 0.1)
+    monkeypatch.setattr(llm_router, "HEDGE_MIN_DELAY_S", 0.01)
+
+
+def _router(*llms):
+    return HedgedLLM([Provider(llm.text, llm) for llm in llms], hedging=True)
+
+
+def test_fast_primary_is_not_hedged():
+    primary, backup = FakeLLM(text="primary", delay=0.01, started=[]), FakeLLM(text="backup", started=[])
+    assert _router(primary, backup).complete("hi").text == "primary"
+    time.sleep(0.15)
+    assert backup.started == []
+
+
+def test_hedge_fires_after_hedge_delay_and_fastest_answer_wins():
+    primary, backup = FakeLLM(text="primary", delay=1.0, started=[]), FakeLLM(text="backup", delay=0.01, started=[])
+    started = time.perf_counter()
+    assert _router(primary, backup).complete("hi").text == "backup"
+    assert time.perf_counter() - started < 0.5
+    assert backup.started[0] - primary.started[0] >= 0.09
+
+
+def test_primary_still_wins_if_it_answers_first_after_the_hedge():
+    primary, backup = FakeLLM(text="primary", delay=0.2, started=[]), FakeLLM(text="backup", delay=1.0, started=[])
+    started = time.perf_counter()
+    assert _router(primary, backup).complete("hi").text == "primary"
+    assert len(backup.started) == 1
+    assert time.perf_counter() - started < 0.5
+
+
+def test_failed_primary_fails_over():
+    primary, backup = FakeLLM(text="primary", fail=True, started=[]), FakeLLM(text="backup", started=[])
+    assert _router(primary, backup).complete("hi").text == "backup"
+
+
+def _breaker():
+    return CircuitBreaker("fake", window=4, min_calls=2, error_rate=0.5, cooldown_s=0.05)
+
+
+def _fail(breaker, n):
+    for _ in range(n):
+        breaker.record(False, breaker.acquire())
+
+
+def test_breaker_opens_half_opens_and_closes():
+    breaker = _breaker()
+    _fail(breaker, 2)
+    assert breaker.state == OPEN and not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.state == HALF_OPEN and breaker.allow()
+    trial = breaker.acquire()
+    assert not breaker.allow()
+    with pytest.raises(BreakerOpen):
+        breaker.acquire()
+
+    breaker.record(True, trial)
+    assert breaker.state == CLOSED and breaker.allow()
+
+
+def test_failed_trial_reopens_breaker():
+    breaker = _breaker()
+    _fail(breaker, 2)
+    time.sleep(0.06)
+    breaker.record(False, breaker.acquire())
+    assert breaker.state == OPEN
+
+
+def test_late_results_do_not_extend_cooldown_or_decide_the_trial():
+    breaker = _breaker()
+    in_flight = [breaker.acquire() for _ in range(4)]  # calls started while closed
+    _fail(breaker, 2)
+    assert breaker.state == OPEN
+    opened_at = breaker._opened_at
+
+    # Stragglers failing during the cooldown don't re-trip (and push the cooldown out)
+    for token in in_flight[:2]:
+        breaker.record(False, token)
+    assert breaker._opened_at == opened_at
+
+    time.sleep(0.06)
+    trial = breaker.acquire()
+    # A pre-trip call finishing now neither closes nor reopens the breaker
+    breaker.record(True, in_flight[2])
+    breaker.record(False, in_flight[3])
+    assert breaker.state == HALF_OPEN and not breaker.allow()
+
+    breaker.record(True, trial)
+    assert breaker.state == CLOSED
+
+
+def test_router_skips_open_provider():
+    primary, backup = FakeLLM(text="primary", started=[]), FakeLLM(text="backup", started=[])
+    router = _router(primary, backup)
+    breaker = router.providers[0].breaker
+    breaker.min_calls, breaker.cooldown_s = 1, 60
+    breaker.record(False, breaker.acquire())
+    assert router.complete("hi").text == "backup"
+    assert primary.started == []
+
+
+def test_concurrent_half_open_callers_get_one_trial():
+    breaker = _breaker()
+    _fail(breaker, 2)
+    time.sleep(0.06)
+    results = []
+
+    def call():
+        try:
+            results.append(breaker.acquire())
+        except BreakerOpen:
+            results.append(None)
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sum(r is not None for r in results) == 1
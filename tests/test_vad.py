@@ -0,0 +1,45 @@
+import numpy as np
+
+from app.services.vad import speech_segments
+
+RATE = 16000
+
+
+def _speech(seconds: float, seed: int = 0) -> np.ndarray:
+    """Continuous 'speech': a 180 Hz tone whose loudness drifts slowly between about -33 and -13 dBFS."""
+    t = np.arange(int(seconds * RATE)) / RATE
+    envelope = 0.03 + 0.27 * (0.5 + 0.5 * np.sin(2 * np.pi * 0.5 * t + seed))
+    return envelope * np.sin(2 * np.pi * 180 * t) * 32767
+
+
+def _noise(seconds: float, seed: int = 0) -> np.ndarray:
+    """Room noise around -65 dBFS."""
+    return np.random.default_rng(seed).normal(scale=18, size=int(seconds * RATE))
+
+
+def _pcm(*parts: np.ndarray) -> bytes:
+    return np.concatenate(parts).astype(np.int16).tobytes()
+
+
+def _uncovered(segments, start: int, end: int) -> int:
+    """Samples of [start, end) that no segment covers."""
+    covered = np.zeros(end - start, dtype=bool)
+    for s, e in segments:
+        covered[max(s, start) - start:max(min(e, end) - start, 0)] = True
+    return int((~covered).sum())
+
+
+def test_fully_voiced_clip_is_kept_whole():
+    speech = _speech(4.0)
+    segments = speech_segments(_pcm(speech), RATE)
+    assert _uncovered(segments, 0, len(speech)) == 0
+
+
+def test_silence_padding_is_dropped_and_speech_kept():
+    lead, speech, trail = _noise(1.5, seed=1), _speech(3.0), _noise(1.5, seed=2)
+    segments = speech_segments(_pcm(lead, speech, trail), RATE)
+    start, end = len(lead), len(lead) + len(speech)
+    assert _uncovered(segments, start, end) == 0
+    # Only the VAD_PAD_MS padding around the speech survives
+    assert segments[0][0] > RATE
+    assert segments[-1][1] < end + RATE // 2